@@ -0,0 +1,33 @@
+"""Add pipeline_state watermarks for incremental extraction
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pipeline_state",
+        sa.Column("extractor", sa.String(100), primary_key=True),
+        sa.Column("dataset_id", sa.String(20), nullable=False),
+        sa.Column("watermark_column", sa.String(100), nullable=False),
+        sa.Column("watermark", sa.String(64)),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("pipeline_state")
@@ -0,0 +1,39 @@
+"""Add pipeline_checkpoints for resuming interrupted extractions
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pipeline_checkpoints",
+        sa.Column("extractor", sa.String(100), primary_key=True),
+        sa.Column("dataset_id", sa.String(20), nullable=False),
+        sa.Column("run_id", sa.String(32), nullable=False),
+        sa.Column("full_refresh", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("incremental", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("resume_offset", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("resume_cursor", sa.String(64)),
+        sa.Column("rows_loaded", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("started_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("completed_at", sa.DateTime()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("pipeline_checkpoints")
@@ -0,0 +1,39 @@
+"""Add content_hash to loaded tables to skip unchanged rows on upsert
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = [
+    "buildings",
+    "hpd_registrations",
+    "registration_contacts",
+    "hpd_violations",
+    "dob_violations",
+    "complaints_311",
+    "evictions",
+]
+
+
+def upgrade() -> None:
+    # Nullable with no default, so adding it doesn't rewrite the tables
+    for table in TABLES:
+        op.add_column(table, sa.Column("content_hash", sa.BigInteger()))
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_column(table, "content_hash")
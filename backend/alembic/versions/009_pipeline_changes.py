@@ -0,0 +1,34 @@
+"""Add pipeline_changes to record the BBLs each run changed
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pipeline_changes",
+        sa.Column("run_id", sa.String(32), primary_key=True),
+        sa.Column("extractor", sa.String(100), primary_key=True),
+        sa.Column("bbl", sa.String(10), primary_key=True),
+        sa.Column("changed_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    op.create_index("idx_pipeline_changes_changed_at", "pipeline_changes", ["changed_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_pipeline_changes_changed_at", table_name="pipeline_changes")
+    op.drop_table("pipeline_changes")
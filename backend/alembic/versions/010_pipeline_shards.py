@@ -0,0 +1,46 @@
+"""Add pipeline_shards work queue for distributed extraction workers
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pipeline_shards",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("job_id", sa.String(32), nullable=False),
+        sa.Column("stage", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("datasets", sa.String(200), nullable=False),
+        sa.Column("shard_where", sa.Text()),
+        sa.Column("status", sa.String(20), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("worker", sa.String(100)),
+        sa.Column("rows_loaded", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("error", sa.Text()),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("claimed_at", sa.DateTime()),
+        sa.Column("heartbeat_at", sa.DateTime()),
+        sa.Column("finished_at", sa.DateTime()),
+    )
+    op.create_index("idx_pipeline_shards_status", "pipeline_shards", ["status", "id"])
+    op.create_index("idx_pipeline_shards_job_id", "pipeline_shards", ["job_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_pipeline_shards_job_id", table_name="pipeline_shards")
+    op.drop_index("idx_pipeline_shards_status", table_name="pipeline_shards")
+    op.drop_table("pipeline_shards")
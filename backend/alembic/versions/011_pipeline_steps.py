@@ -0,0 +1,37 @@
+"""Add pipeline_steps for timings of post-load maintenance steps
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "011"
+down_revision: Union[str, None] = "010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pipeline_steps",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("run_id", sa.String(32), nullable=False),
+        sa.Column("extractor", sa.String(100), nullable=False),
+        sa.Column("table_name", sa.String(100), nullable=False),
+        sa.Column("step", sa.String(30), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("seconds", sa.Float(), nullable=False),
+    )
+    op.create_index("idx_pipeline_steps_run_id", "pipeline_steps", ["run_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_pipeline_steps_run_id", table_name="pipeline_steps")
+    op.drop_table("pipeline_steps")
@@ -0,0 +1,51 @@
+"""Add pipeline_runs ledger with live progress
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "012"
+down_revision: Union[str, None] = "011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pipeline_runs",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("parent_id", sa.Integer()),
+        sa.Column("run_id", sa.String(32)),
+        sa.Column("dataset", sa.String(200), nullable=False),
+        sa.Column("full_refresh", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("status", sa.String(20), nullable=False, server_default="running"),
+        sa.Column("started_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("finished_at", sa.DateTime()),
+        sa.Column("rows_loaded", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("rows_per_second", sa.Float()),
+        sa.Column("bytes_downloaded", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("pages_fetched", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("fetched_rows", sa.BigInteger()),
+        sa.Column("expected_rows", sa.BigInteger()),
+        sa.Column("estimated_finish_at", sa.DateTime()),
+        sa.Column("raw_queued", sa.Integer()),
+        sa.Column("load_queued", sa.Integer()),
+        sa.Column("error", sa.Text()),
+    )
+    op.create_index("idx_pipeline_runs_started_at", "pipeline_runs", ["started_at"])
+    op.create_index("idx_pipeline_runs_status", "pipeline_runs", ["status"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_pipeline_runs_status", table_name="pipeline_runs")
+    op.drop_index("idx_pipeline_runs_started_at", table_name="pipeline_runs")
+    op.drop_table("pipeline_runs")
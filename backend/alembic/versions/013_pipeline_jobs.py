@@ -0,0 +1,42 @@
+"""Add pipeline_jobs queue for admin-triggered jobs run by pipeline workers
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "013"
+down_revision: Union[str, None] = "012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pipeline_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("kind", sa.String(30), nullable=False),
+        sa.Column("dataset", sa.String(100)),
+        sa.Column("full_refresh", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("status", sa.String(20), nullable=False, server_default="queued"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("worker", sa.String(100)),
+        sa.Column("error", sa.Text()),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("started_at", sa.DateTime()),
+        sa.Column("heartbeat_at", sa.DateTime()),
+        sa.Column("finished_at", sa.DateTime()),
+    )
+    op.create_index("idx_pipeline_jobs_status", "pipeline_jobs", ["status", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_pipeline_jobs_status", table_name="pipeline_jobs")
+    op.drop_table("pipeline_jobs")
@@ -0,0 +1,26 @@
+"""Record the table a full refresh is replacing on its checkpoint
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "014"
+down_revision: Union[str, None] = "013"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("pipeline_checkpoints", sa.Column("replacing_table", sa.String(100)))
+
+
+def downgrade() -> None:
+    op.drop_column("pipeline_checkpoints", "replacing_table")
@@ -21,8 +21,8 @@ print(f"DEBUG: Using database_url: {database_url}", file=sys.stderr, flush=True)
 engine = create_async_engine(
     database_url,
     echo=False,
-    pool_size=5,
-    max_overflow=5,
+    pool_size=settings.database_pool_size,
+    max_overflow=settings.database_max_overflow,
     pool_recycle=300,
     pool_pre_ping=True,
 )
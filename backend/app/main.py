@@ -1,6 +1,6 @@
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Depends, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -11,7 +11,10 @@ from app.database import engine, Base, get_db
 from app.logging_config import setup_logging, get_logger
 from app.middleware import RequestLoggingMiddleware, ErrorHandlingMiddleware
 from app.cache import close_cache
-from pipeline.runner import run_all, run_extractor, run_scoring, run_entity_resolution, EXTRACTORS
+from app.models.pipeline import PipelineJob
+from pipeline.jobs import queue
+from pipeline.ledger import pipeline_status
+from pipeline.runner import EXTRACTORS
 
 # Set up logging first
 setup_logging()
@@ -98,46 +101,82 @@ async def health_check(db: AsyncSession = Depends(get_db)):
     return health_status
 
 
+def queued_response(job: PipelineJob, created: bool, message: str) -> dict:
+    """Response to an admin trigger: the queued (or already pending) job."""
+    if not created:
+        message = f"Already {job.status}: {queue.describe_job(job)}"
+    return {"message": message, **queue.job_status(job)}
+
+
 @app.post("/admin/pipeline/trigger")
 async def trigger_pipeline(
-    background_tasks: BackgroundTasks,
     dataset: str | None = None,
-    full_refresh: bool = False
+    full_refresh: bool = False,
+    db: AsyncSession = Depends(get_db),
 ):
     """
-    Trigger the data pipeline as a background task.
+    Queue the data pipeline for a pipeline worker (python -m pipeline.runner --worker).
+
+    The API process never runs the pipeline itself; follow the job and its
+    loads at GET /admin/pipeline/status.
 
     Args:
         dataset: Specific dataset to run (e.g., 'pluto', 'hpd_violations').
                  If None, runs all datasets.
-        full_refresh: If True, truncate and reload instead of upsert.
+        full_refresh: If True, reload and swap in whole tables instead of upsert.
     """
     if dataset:
         if dataset not in EXTRACTORS:
             return {"error": f"Unknown dataset: {dataset}. Available: {list(EXTRACTORS.keys())}"}
         logger.info(f"Received pipeline trigger for dataset: {dataset}. Full refresh: {full_refresh}")
-        background_tasks.add_task(run_extractor, dataset, full_refresh)
-        return {"message": f"Pipeline triggered for {dataset}", "dataset": dataset, "full_refresh": full_refresh}
+        job, created = await queue.submit_job(db, queue.EXTRACT, dataset, full_refresh)
+        return queued_response(job, created, f"Pipeline queued for {dataset}")
     else:
         logger.info(f"Received full pipeline trigger request. Full refresh: {full_refresh}")
-        background_tasks.add_task(run_all, full_refresh=full_refresh)
-        return {"message": "Full pipeline triggered in background", "full_refresh": full_refresh}
+        job, created = await queue.submit_job(db, queue.EXTRACT, full_refresh=full_refresh)
+        return queued_response(job, created, "Full pipeline queued")
 
 
 @app.post("/admin/pipeline/scoring")
-async def trigger_scoring(background_tasks: BackgroundTasks):
-    """Trigger scoring recalculation as a background task."""
+async def trigger_scoring(db: AsyncSession = Depends(get_db)):
+    """Queue scoring recalculation for a pipeline worker."""
     logger.info("Received scoring trigger request")
-    background_tasks.add_task(run_scoring)
-    return {"message": "Scoring triggered in background"}
+    job, created = await queue.submit_job(db, queue.SCORING)
+    return queued_response(job, created, "Scoring queued")
 
 
 @app.post("/admin/pipeline/entity-resolution")
-async def trigger_entity_resolution(background_tasks: BackgroundTasks):
-    """Trigger entity resolution as a background task."""
+async def trigger_entity_resolution(db: AsyncSession = Depends(get_db)):
+    """Queue entity resolution for a pipeline worker."""
     logger.info("Received entity resolution trigger request")
-    background_tasks.add_task(run_entity_resolution)
-    return {"message": "Entity resolution triggered in background"}
+    job, created = await queue.submit_job(db, queue.ENTITY_RESOLUTION)
+    return queued_response(job, created, "Entity resolution queued")
+
+
+@app.get("/admin/pipeline/jobs/{job_id}")
+async def get_pipeline_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    """Get the status of a queued pipeline job."""
+    job = await db.get(PipelineJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Pipeline job {job_id} not found")
+    return queue.job_status(job)
+
+
+@app.get("/admin/pipeline/status")
+async def get_pipeline_status(limit: int = 20, db: AsyncSession = Depends(get_db)):
+    """
+    Get pipeline runs in progress, the most recent runs and queued jobs.
+
+    Running loads report rows loaded per second, pages fetched, batches
+    queued between stages, how much of the dataset has been fetched and
+    an ETA. Finished runs keep their rows, bytes, duration and any error,
+    for comparing throughput across nights. Runs whose process died
+    without recording an outcome are reported as abandoned.
+    """
+    limit = min(max(limit, 1), 200)
+    status = await pipeline_status(db, limit=limit)
+    status["jobs"] = await queue.recent_jobs(db, limit=limit)
+    return status
 
 
 @app.get("/admin/entity-resolution/stats")
@@ -5,6 +5,15 @@ from app.models.dob import DOBViolation
 from app.models.eviction import Eviction
 from app.models.owner import OwnerPortfolio
 from app.models.score import BuildingScore
+from app.models.pipeline import (
+    PipelineState,
+    PipelineCheckpoint,
+    PipelineChange,
+    PipelineShard,
+    PipelineStep,
+    PipelineRun,
+    PipelineJob,
+)
 
 __all__ = [
     "Building",
@@ -16,4 +25,11 @@ __all__ = [
     "Eviction",
     "OwnerPortfolio",
     "BuildingScore",
+    "PipelineState",
+    "PipelineCheckpoint",
+    "PipelineChange",
+    "PipelineShard",
+    "PipelineStep",
+    "PipelineRun",
+    "PipelineJob",
 ]
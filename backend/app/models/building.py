@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, Index
+from sqlalchemy import BigInteger, Column, String, Integer, Float, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -22,6 +22,7 @@ class Building(Base):
     latitude = Column(Float)
     longitude = Column(Float)
     # Note: geom column omitted - using lat/long instead
+    content_hash = Column(BigInteger)  # Hash of the loaded fields; unchanged rows aren't rewritten
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
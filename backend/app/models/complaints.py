@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Date, ForeignKey, Text, Index
+from sqlalchemy import BigInteger, Column, String, Integer, DateTime, Date, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -30,6 +30,7 @@ class Complaint311(Base):
     # Computed fields
     days_to_resolve = Column(Integer)
 
+    content_hash = Column(BigInteger)  # Hash of the loaded fields; unchanged rows aren't rewritten
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # No ORM relationships - BBL field used for explicit joins
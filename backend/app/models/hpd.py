@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Date, ForeignKey, Text, Index, UniqueConstraint
+from sqlalchemy import BigInteger, Column, String, Integer, DateTime, Date, ForeignKey, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -19,6 +19,7 @@ class HPDRegistration(Base):
     lot = Column(Integer)
     last_registration_date = Column(Date)
     registration_end_date = Column(Date)
+    content_hash = Column(BigInteger)  # Hash of the loaded fields; unchanged rows aren't rewritten
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -52,6 +53,7 @@ class RegistrationContact(Base):
     name_hash = Column(String(32), index=True)
     owner_portfolio_id = Column(Integer, ForeignKey("owner_portfolios.id"))
 
+    content_hash = Column(BigInteger)  # Hash of the loaded fields; unchanged rows aren't rewritten
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -92,6 +94,7 @@ class HPDViolation(Base):
     violation_status = Column(String(50))
     violation_class = Column(String(5))  # A, B, C
 
+    content_hash = Column(BigInteger)  # Hash of the loaded fields; unchanged rows aren't rewritten
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # No ORM relationships - BBL field used for explicit joins
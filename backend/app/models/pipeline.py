@@ -0,0 +1,213 @@
+from sqlalchemy import Column, String, DateTime, BigInteger, Boolean, Float, Index, Integer, Text
+from datetime import datetime
+from app.database import Base
+
+
+class PipelineState(Base):
+    """Per-extractor high-water mark for incremental extraction."""
+
+    __tablename__ = "pipeline_state"
+
+    extractor = Column(String(100), primary_key=True)
+    dataset_id = Column(String(20), nullable=False)
+    watermark_column = Column(String(100), nullable=False)
+    watermark = Column(String(64))  # Raw Socrata value, e.g. "2024-01-15T12:34:56.789Z"
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<PipelineState(extractor={self.extractor}, watermark={self.watermark})>"
+
+
+class PipelineCheckpoint(Base):
+    """
+    Progress of an extractor's current (or last) run.
+
+    Updated in the same transaction as every data commit, so after a crash
+    it records exactly what was loaded. A run that never finished
+    (completed_at is NULL) is resumed from here.
+    """
+
+    __tablename__ = "pipeline_checkpoints"
+
+    extractor = Column(String(100), primary_key=True)
+    dataset_id = Column(String(20), nullable=False)
+    run_id = Column(String(32), nullable=False)
+    full_refresh = Column(Boolean, nullable=False, default=False)
+    incremental = Column(Boolean, nullable=False, default=False)
+    replacing_table = Column(String(100))  # Table a full refresh reloads through its shadow, if any
+    resume_offset = Column(BigInteger, nullable=False, default=0)  # Raw records fetched before the cursor
+    resume_cursor = Column(String(64))  # Last keyset value committed (keyset-paged extractors)
+    rows_loaded = Column(BigInteger, nullable=False, default=0)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = Column(DateTime)
+
+    def __repr__(self):
+        return (
+            f"<PipelineCheckpoint(extractor={self.extractor}, run_id={self.run_id}, "
+            f"offset={self.resume_offset}, cursor={self.resume_cursor})>"
+        )
+
+
+class PipelineChange(Base):
+    """
+    A building (BBL) whose data an extractor's run changed.
+
+    Every load records the BBLs of the rows it inserted or updated; a full
+    refresh records those of the rows that differ from the table it
+    replaced. Later stages (scoring, portfolio stats, cache invalidation)
+    read them through `pipeline.changes` to work on what changed.
+    """
+
+    __tablename__ = "pipeline_changes"
+
+    run_id = Column(String(32), primary_key=True)
+    extractor = Column(String(100), primary_key=True)
+    bbl = Column(String(10), primary_key=True)
+    changed_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("idx_pipeline_changes_changed_at", "changed_at"),
+    )
+
+    def __repr__(self):
+        return f"<PipelineChange(run_id={self.run_id}, extractor={self.extractor}, bbl={self.bbl})>"
+
+
+class PipelineShard(Base):
+    """
+    One shard of a distributed extraction job (see `pipeline.shards`).
+
+    A shard loads the rows of a dataset matching `shard_where` through the
+    extractors in `datasets`. Workers claim pending shards with
+    SELECT ... FOR UPDATE SKIP LOCKED and keep `heartbeat_at` fresh while
+    loading; failed shards and shards whose worker stopped heartbeating
+    are claimed again, up to a maximum number of attempts. A shard is only
+    claimed once every shard of its job at an earlier `stage` is done.
+    """
+
+    __tablename__ = "pipeline_shards"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(String(32), nullable=False)
+    stage = Column(Integer, nullable=False, default=0)  # Dependency level within the job
+    datasets = Column(String(200), nullable=False)  # Comma-separated runner dataset names
+    shard_where = Column(Text)  # SoQL filter selecting the shard's rows (NULL: all rows)
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    worker = Column(String(100))  # Worker that claimed it last
+    rows_loaded = Column(BigInteger, nullable=False, default=0)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    claimed_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("idx_pipeline_shards_status", "status", "id"),
+        Index("idx_pipeline_shards_job_id", "job_id"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<PipelineShard(id={self.id}, job_id={self.job_id}, datasets={self.datasets}, "
+            f"status={self.status})>"
+        )
+
+
+class PipelineStep(Base):
+    """
+    Timing of a post-load maintenance step of an extractor's run.
+
+    Steps such as building a reloaded table's indexes, swapping it in and
+    ANALYZE are recorded per run, so their cost can be followed across runs.
+    """
+
+    __tablename__ = "pipeline_steps"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(String(32), nullable=False)
+    extractor = Column(String(100), nullable=False)
+    table_name = Column(String(100), nullable=False)
+    step = Column(String(30), nullable=False)  # build_indexes, record_changes, analyze, swap
+    started_at = Column(DateTime, nullable=False)
+    seconds = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("idx_pipeline_steps_run_id", "run_id"),
+    )
+
+    def __repr__(self):
+        return f"<PipelineStep(run_id={self.run_id}, table={self.table_name}, step={self.step})>"
+
+
+class PipelineRun(Base):
+    """
+    A run of the pipeline runner: one dataset (or group sharing a fetch), or all of them.
+
+    Written by `pipeline.ledger` when the run starts and ends, and refreshed
+    with live progress while it loads, so any process can report on it.
+    Runs started by `run_all` point at its row through `parent_id`.
+    """
+
+    __tablename__ = "pipeline_runs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    parent_id = Column(Integer)  # The run_all run this run is part of
+    run_id = Column(String(32))  # Extractor run (see PipelineCheckpoint), once known
+    dataset = Column(String(200), nullable=False)  # Runner dataset name(s), or "all"
+    full_refresh = Column(Boolean, nullable=False, default=False)
+    status = Column(String(20), nullable=False, default="running")  # running, succeeded, failed
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+    rows_loaded = Column(BigInteger, nullable=False, default=0)
+    rows_per_second = Column(Float)
+    bytes_downloaded = Column(BigInteger, nullable=False, default=0)
+    pages_fetched = Column(Integer, nullable=False, default=0)
+    fetched_rows = Column(BigInteger)  # Raw records fetched, counting a resumed-from offset
+    expected_rows = Column(BigInteger)  # Records the fetch will return (Socrata count)
+    estimated_finish_at = Column(DateTime)  # Extrapolated from the recent fetch rate
+    raw_queued = Column(Integer)  # Batches waiting to be transformed
+    load_queued = Column(Integer)  # Batches waiting to be written
+    error = Column(Text)
+
+    __table_args__ = (
+        Index("idx_pipeline_runs_started_at", "started_at"),
+        Index("idx_pipeline_runs_status", "status"),
+    )
+
+    def __repr__(self):
+        return f"<PipelineRun(id={self.id}, dataset={self.dataset}, status={self.status})>"
+
+
+class PipelineJob(Base):
+    """
+    A pipeline job requested through the admin API (see `pipeline.jobs.queue`).
+
+    The API only queues jobs and reports on them; `python -m pipeline.runner
+    --worker` processes claim and run them with their own database engine,
+    keeping multi-hour loads off the API's event loop and connection pool.
+    """
+
+    __tablename__ = "pipeline_jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String(30), nullable=False)  # extract, entity_resolution, scoring
+    dataset = Column(String(100))  # Runner dataset name for extract jobs (NULL: all)
+    full_refresh = Column(Boolean, nullable=False, default=False)
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, succeeded, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    worker = Column(String(100))  # Worker that claimed it last
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("idx_pipeline_jobs_status", "status", "id"),
+    )
+
+    def __repr__(self):
+        return f"<PipelineJob(id={self.id}, kind={self.kind}, dataset={self.dataset}, status={self.status})>"
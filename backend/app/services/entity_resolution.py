@@ -9,6 +9,7 @@ from rapidfuzz import fuzz
 from app.database import AsyncSessionLocal
 from app.models.hpd import RegistrationContact
 from app.models.owner import OwnerPortfolio
+from app.utils.normalize import is_corporate_name
 
 logger = logging.getLogger(__name__)
 
@@ -225,11 +226,7 @@ class EntityResolutionService:
     @staticmethod
     def _is_llc_name(name: str | None) -> bool:
         """Check if name appears to be an LLC or corporate entity."""
-        if not name:
-            return False
-        name_upper = name.upper()
-        indicators = ["LLC", "L.L.C.", "INC", "CORP", "LP", "L.P.", "LTD", "PLLC"]
-        return any(ind in name_upper for ind in indicators)
+        return is_corporate_name(name)
 
     async def update_portfolio_stats(self):
         """Update portfolio statistics after scoring is complete."""
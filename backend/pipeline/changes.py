@@ -0,0 +1,62 @@
+"""
+Buildings changed by pipeline runs.
+
+Every extractor's load records the BBLs it inserted, updated or (in a full
+refresh) replaced in `pipeline_changes`, keyed by run. Later stages read
+them here to work on deltas instead of the whole city:
+
+    since = datetime.utcnow()
+    await run_all()
+    bbls = await changed_bbls(since=since)
+"""
+
+import logging
+from datetime import datetime
+
+from sqlalchemy import delete, select
+
+from app.database import AsyncSessionLocal
+from app.models.pipeline import PipelineChange
+
+logger = logging.getLogger(__name__)
+
+
+async def changed_bbls(
+    run_ids: list[str] | None = None,
+    extractors: list[str] | None = None,
+    since: datetime | None = None,
+) -> set[str]:
+    """
+    BBLs changed by pipeline runs.
+
+    Args:
+        run_ids: Only changes from these runs (see BaseExtractor.run_id).
+        extractors: Only changes from these extractors, by state_key
+            (e.g. "HPDViolationsExtractor").
+        since: Only changes recorded at or after this UTC time.
+
+    Returns:
+        The distinct BBLs matching every filter given.
+    """
+    query = select(PipelineChange.bbl).distinct()
+    if run_ids is not None:
+        query = query.where(PipelineChange.run_id.in_(run_ids))
+    if extractors is not None:
+        query = query.where(PipelineChange.extractor.in_(extractors))
+    if since is not None:
+        query = query.where(PipelineChange.changed_at >= since)
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(query)
+        return set(result.scalars())
+
+
+async def prune_changes(before: datetime) -> int:
+    """Delete changes recorded before `before` (UTC). Returns the number deleted."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            delete(PipelineChange).where(PipelineChange.changed_at < before)
+        )
+        await session.commit()
+    logger.info(f"Pruned {result.rowcount} pipeline changes recorded before {before}")
+    return result.rowcount
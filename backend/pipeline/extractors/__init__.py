@@ -1,5 +1,5 @@
 from pipeline.extractors.socrata import SocrataClient
-from pipeline.extractors.base import BaseExtractor
+from pipeline.extractors.base import BaseExtractor, extract_and_load_shared
 from pipeline.extractors.hpd_violations import HPDViolationsExtractor
 from pipeline.extractors.hpd_registrations import HPDRegistrationsExtractor
 from pipeline.extractors.complaints_311 import Complaints311Extractor
@@ -10,6 +10,7 @@ from pipeline.extractors.pluto import PLUTOExtractor
 __all__ = [
     "SocrataClient",
     "BaseExtractor",
+    "extract_and_load_shared",
     "HPDViolationsExtractor",
     "HPDRegistrationsExtractor",
     "Complaints311Extractor",
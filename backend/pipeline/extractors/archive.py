@@ -0,0 +1,140 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveMiss(LookupError):
+    """A page requested in replay mode is not in the archive."""
+
+
+class PageArchive:
+    """
+    Local, content-addressed archive of raw Socrata responses.
+
+    Each response body is gzip-compressed and stored once under its SHA-256
+    (`objects/ab/abcdef....json.gz`). A per-dataset JSONL index maps a query
+    (the request parameters other than `$offset`) and offset to the body
+    hash, with later entries replacing earlier ones. CSV export pages are
+    kept apart from JSON ones (`fmt="csv"`), in their own index. Replaying the same
+    queries against the archive reproduces a load without the network,
+    which also makes an archive a deterministic fixture for benchmarks.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self._indexes: dict[tuple[str, str], dict[tuple[str, int], str]] = {}
+
+    @staticmethod
+    def query_key(params: dict[str, Any]) -> str:
+        """Canonical form of the request parameters, excluding the offset."""
+        query = {k: v for k, v in params.items() if k != "$offset"}
+        return json.dumps(query, sort_keys=True, separators=(",", ":"))
+
+    def save_page(
+        self, dataset_id: str, params: dict[str, Any], body: bytes, records: int | None, fmt: str = "json"
+    ):
+        """Store a response body and index it by dataset, query and offset (`records` is None if not decoded)."""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest, fmt)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+            tmp_path.write_bytes(gzip.compress(body, compresslevel=6))
+            tmp_path.replace(path)
+
+        entry = {
+            "query": self.query_key(params),
+            "offset": params.get("$offset", 0),
+            "sha256": digest,
+            "records": records,
+            "bytes": len(body),
+            "fetched_at": datetime.utcnow().isoformat(),
+        }
+        index_path = self._index_path(dataset_id, fmt)
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        with index_path.open("a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+        if (dataset_id, fmt) in self._indexes:
+            self._indexes[(dataset_id, fmt)][(entry["query"], entry["offset"])] = digest
+
+    def load_page(self, dataset_id: str, params: dict[str, Any], fmt: str = "json") -> bytes:
+        """Get the archived response body for a request, or raise ArchiveMiss."""
+        index = self._load_index(dataset_id, fmt)
+        key = (self.query_key(params), params.get("$offset", 0))
+        digest = index.get(key)
+        if digest is None:
+            raise ArchiveMiss(
+                f"No archived {fmt.upper()} page for {dataset_id} at offset {key[1]} with query {key[0]}"
+            )
+        return gzip.decompress(self._object_path(digest, fmt).read_bytes())
+
+    def save_fields(self, dataset_id: str, field_names: set[str]):
+        """Store a dataset's column field names for offline projection."""
+        path = self.root / "fields" / f"{dataset_id}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(sorted(field_names)))
+
+    def load_fields(self, dataset_id: str) -> set[str] | None:
+        """Get archived column field names, if they were recorded."""
+        path = self.root / "fields" / f"{dataset_id}.json"
+        if not path.exists():
+            return None
+        return set(json.loads(path.read_text()))
+
+    def _load_index(self, dataset_id: str, fmt: str) -> dict[tuple[str, int], str]:
+        if (dataset_id, fmt) not in self._indexes:
+            index = {}
+            index_path = self._index_path(dataset_id, fmt)
+            if index_path.exists():
+                with index_path.open() as f:
+                    for line in f:
+                        entry = json.loads(line)
+                        index[(entry["query"], entry["offset"])] = entry["sha256"]
+            self._indexes[(dataset_id, fmt)] = index
+        return self._indexes[(dataset_id, fmt)]
+
+    def _object_path(self, digest: str, fmt: str) -> Path:
+        return self.root / "objects" / digest[:2] / f"{digest}.{fmt}.gz"
+
+    def _index_path(self, dataset_id: str, fmt: str) -> Path:
+        # JSON pages keep the original index name
+        name = dataset_id if fmt == "json" else f"{dataset_id}.{fmt}"
+        return self.root / "index" / f"{name}.jsonl"
+
+
+_archive: PageArchive | None = None
+_replay = False
+
+
+def configure_archive(root: str | None, replay: bool = False):
+    """
+    Set the process-wide page archive used by every SocrataClient.
+
+    With `replay`, clients serve pages only from the archive and never
+    touch the network.
+    """
+    global _archive, _replay
+    if replay and not root:
+        raise ValueError("Replay needs an archive directory")
+    _archive = PageArchive(root) if root else None
+    _replay = replay
+    if _archive:
+        logger.info(f"{'Replaying from' if replay else 'Archiving pages to'} {root}")
+
+
+def get_archive() -> tuple[PageArchive | None, bool]:
+    """Get the configured archive (default: `socrata_archive_dir`) and whether to replay."""
+    global _archive
+    if _archive is None and not _replay and get_settings().socrata_archive_dir:
+        _archive = PageArchive(get_settings().socrata_archive_dir)
+    return _archive, _replay
@@ -1,13 +1,30 @@
+import asyncio
 import logging
+import multiprocessing
+import time
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from uuid import uuid4
 from typing import Any
-from datetime import datetime
+from datetime import datetime, timedelta
 
+import httpx
+from sqlalchemy import literal_column, select, text, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.dialects.postgresql import insert
 
+from app.config import get_settings
 from app.database import AsyncSessionLocal
-from pipeline.extractors.socrata import SocrataClient
+from app.models.pipeline import PipelineCheckpoint, PipelineRun, PipelineState, PipelineStep
+from pipeline.extractors.columns import ColumnBatch
+from pipeline.extractors.copy_loader import CopyLoader, CsvCopyLoader, hashed_insert
+from pipeline.extractors.shadow import ShadowTable
+from pipeline.extractors.socrata import SocrataClient, is_retryable
+from pipeline.extractors.stages import StageStats, WriteCounts, run_stages
+from pipeline.extractors.tuning import BatchTuner
 
 logger = logging.getLogger(__name__)
 
@@ -15,9 +32,35 @@ logger = logging.getLogger(__name__)
 class BaseExtractor(ABC):
     """Base class for data extractors from NYC Open Data."""
 
+    STAGING_RUN_CHARS = 12  # Characters of the run_id in staging table names (identifiers max 63)
+
     def __init__(self):
         self.client = SocrataClient()
         self.batch_size = 1000
+        self.commit_interval = 10  # Commit every 10 batches to avoid data loss
+        self.queue_size = 8  # Batches buffered between pipeline stages
+        self.writer_count = 1  # Concurrent DB writers (each with its own session)
+        self.transform_workers = 0  # Transform processes (0 = transform on the event loop)
+        # Adapt batch_size and commit_interval to measured write latency (see BatchTuner)
+        self.auto_tune = get_settings().pipeline_auto_tune
+
+        # Progress of the current load, reset when a load starts
+        self.run_id: str | None = None  # Checkpointed run (see PipelineCheckpoint)
+        self.shadow: ShadowTable | None = None  # Table a full refresh is loading into
+        self.shard_id: int | None = None  # Shard being loaded by a worker (see pipeline.shards)
+        self.shard_clause: str | None = None  # SoQL filter selecting the shard's rows
+        self.records_loaded = 0
+        # Position of the current load, for progress reports (see pipeline.ledger)
+        self.records_fetched = 0  # Raw records fetched, counting a resumed-from offset
+        self.fetching_where: str | None = None  # SoQL filter being fetched, watermark included
+        self.raw_queue: asyncio.Queue | None = None
+        self.load_queue: asyncio.Queue | None = None
+        self.fetch_stats = StageStats("fetch")
+        self.transform_stats = StageStats("transform")
+        self.write_stats = StageStats("write")
+        self.write_counts = WriteCounts()
+        self.tuner: BatchTuner | None = None
+        self.step_timings: list[tuple[str, str, datetime, float]] = []  # Post-load steps (see _timed)
 
     @property
     @abstractmethod
@@ -36,6 +79,18 @@ class BaseExtractor(ABC):
         """Transform a Socrata record to model fields. Return None to skip."""
         pass
 
+    def transform_batch(self, records: list[dict[str, Any]]) -> ColumnBatch | None:
+        """
+        Optional column-oriented transform of a whole batch of Socrata records.
+
+        Override to transform column by column with the bulk helpers
+        (`parse_dates`, `safe_ints`, `make_bbls`) instead of calling
+        transform_record per record. Must produce the same values as
+        transform_record, dropping the records it would skip. Return None
+        (the default) to use transform_record.
+        """
+        return None
+
     @property
     def where_clause(self) -> str | None:
         """Optional SoQL WHERE clause for filtering."""
@@ -43,7 +98,12 @@ class BaseExtractor(ABC):
 
     @property
     def select_clause(self) -> str | None:
-        """Optional SoQL SELECT clause for field selection."""
+        """
+        Optional SoQL SELECT clause listing the fields transform_record consumes.
+
+        Plain comma-separated field names only. Fields the dataset doesn't
+        have are dropped before fetching, so alternate names can be listed.
+        """
         return None
 
     @property
@@ -51,79 +111,813 @@ class BaseExtractor(ABC):
         """Optional SoQL ORDER clause."""
         return None
 
+    @property
+    def load_mode(self) -> str:
+        """
+        How batches are written to the database.
+
+        "upsert" sends a multi-row INSERT ... ON CONFLICT per batch.
+        "copy" streams batches into an unlogged staging table with binary
+        COPY and merges them once per commit interval (see CopyLoader).
+        """
+        return "upsert"
+
+    @property
+    def keyset_column(self) -> str | None:
+        """
+        Optional monotonic column for keyset pagination (e.g. Socrata's ":id").
+
+        When set, pages are fetched with `$where <column> > last_seen` ordered
+        by the column instead of `$offset`, and `order_clause` is ignored.
+        """
+        return None
+
+    @property
+    def csv_columns(self) -> dict[str, str] | None:
+        """
+        Optional mapping of model columns to Socrata fields for CSV full refreshes.
+
+        When set (along with `select_clause`), full refreshes stream the
+        dataset's CSV export straight into Postgres with COPY instead of
+        paging JSON through transform_record (see CsvCopyLoader). Mapped
+        fields need no cleaning: empty strings become NULL and values are
+        cast to the column type. Columns that do need cleaning are computed
+        by `csv_expressions`.
+        """
+        return None
+
+    @property
+    def csv_expressions(self) -> dict[str, str]:
+        """
+        SQL expressions over the raw CSV fields for columns that need cleaning.
+
+        Expressions must not raise on bad input, since one failure aborts
+        the whole page; return NULL instead.
+        """
+        return {}
+
+    @property
+    def watermark_column(self) -> str | None:
+        """
+        Column whose maximum is recorded as the high-water mark after each load.
+
+        Incremental runs only fetch rows at or above the stored watermark.
+        Defaults to Socrata's row-level ":updated_at" system field; return
+        None to always fetch the full dataset.
+        """
+        return ":updated_at"
+
+    @property
+    def state_key(self) -> str:
+        """Key for this extractor's row in pipeline_state."""
+        return type(self).__name__
+
+    @property
+    def checkpoint_key(self) -> str:
+        """Key for this extractor's row in pipeline_checkpoints (one per shard)."""
+        if self.shard_id is None:
+            return self.state_key
+        return f"{self.state_key}#shard{self.shard_id}"
+
+    @property
+    def fetch_where(self) -> str | None:
+        """The SoQL filter to fetch with: `where_clause`, narrowed to the shard if any."""
+        if not self.shard_clause:
+            return self.where_clause
+        if not self.where_clause:
+            return self.shard_clause
+        return f"({self.where_clause}) AND ({self.shard_clause})"
+
+    @property
+    def replaces_table(self) -> bool:
+        """
+        Whether a full refresh rebuilds the table from this dataset.
+
+        Such a full refresh loads into a shadow table and swaps it in once
+        complete (see ShadowTable). Extractors that only update rows other
+        extractors created return False; their full refresh re-applies
+        every record to the live table.
+        """
+        return True
+
+    @property
+    def hash_content(self) -> bool:
+        """
+        Whether loaded rows get a `content_hash` of their fields.
+
+        Loads then skip rows whose stored hash matches, instead of
+        rewriting every unchanged row. On by default for tables with a
+        content_hash column. Every load path computes the hash in SQL over
+        the loaded columns not in `derived_columns` (see
+        `content_hash_sql`), so all agree on every row they load.
+        """
+        return "content_hash" in self.model_class.__table__.columns
+
+    @property
+    def change_column(self) -> str | None:
+        """
+        Column identifying the building of a loaded row, for recording changed BBLs.
+
+        The BBL itself by default (see `_record_changes`); None if the
+        table has no such column.
+        """
+        return "bbl" if "bbl" in self.model_class.__table__.columns else None
+
+    @property
+    def derived_columns(self) -> set[str]:
+        """
+        Columns not loaded from this dataset (ids, timestamps, hashes).
+
+        A full refresh ignores them when diffing the reloaded table against
+        the one it replaces, to find the BBLs that changed.
+        """
+        return {"id", "created_at", "updated_at", "content_hash"}
+
+    @property
+    def preserved_columns(self) -> set[str]:
+        """
+        Columns another extractor fills in, which loads of this one never overwrite.
+
+        New rows get whatever this extractor (or the column default) gives
+        them; existing rows keep their values, also through a full refresh,
+        which copies them over from the table it replaces.
+        """
+        return set()
+
+    @property
+    def load_table(self):
+        """Table the current load writes to: the shadow table during a full refresh."""
+        return self.shadow.target if self.shadow else self.model_class.__table__
+
     def get_primary_key_columns(self) -> list[str]:
         """Get primary key column names for upsert conflict resolution."""
         return [col.name for col in self.model_class.__table__.primary_key.columns]
 
-    async def extract_and_load(self, full_refresh: bool = False, start_offset: int = 0) -> int:
+    async def extract_and_load(
+        self,
+        full_refresh: bool = False,
+        start_offset: int = 0,
+        start_after: str | None = None,
+        incremental: bool = False,
+        resume: bool = False,
+    ) -> int:
         """
         Extract data from Socrata and load into database.
 
+        The load runs as a pipeline of stages connected by bounded queues:
+        a fetch producer, a transform stage and `writer_count` DB writers,
+        so the HTTP client keeps fetching while Postgres is writing.
+        `queue_size` caps how many batches wait between stages. With more
+        than one writer batches may be written out of order, so only raise
+        `writer_count` for extractors whose keys are unique across the dataset.
+        CPU-heavy transforms can run in `transform_workers` processes.
+
+        Args:
+            full_refresh: If True, reload the whole dataset into a shadow table
+                and swap it in at the end. If False, upsert.
+            start_offset: Offset to resume from (for interrupted loads). A full
+                refresh continues loading into the shadow table it left.
+            start_after: Keyset cursor to resume from (extractors with a keyset_column).
+            incremental: If True (and not a full refresh), only fetch rows at or
+                above the stored watermark. The watermark is advanced once
+                all fetched data has been committed.
+            resume: If True and no start position is given, continue the last
+                run if it never finished, from its checkpoint and with its
+                full_refresh and incremental settings.
+
+        Full refreshes of extractors with `csv_columns` load the CSV export
+        instead (see `extract_and_load_csv`).
+
+        Every commit also records a checkpoint of the run's progress in the
+        same transaction (see PipelineCheckpoint).
+
+        Returns:
+            Number of records processed (including any loaded before a resume).
+        """
+        resume_cursor = None
+        if resume and not (start_offset or start_after):
+            checkpoints = await load_unfinished_checkpoints([self])
+            if checkpoints:
+                full_refresh = checkpoints[0].full_refresh
+                resume_cursor = checkpoints[0].resume_cursor
+
+        if (
+            full_refresh
+            and self.csv_columns
+            and self.select_clause
+            and self.client.settings.socrata_csv_full_refresh
+            and not (start_after or resume_cursor)
+        ):
+            return await self.extract_and_load_csv(start_offset=start_offset, resume=resume)
+
+        counts = await extract_and_load_shared(
+            [self],
+            full_refresh=full_refresh,
+            start_offset=start_offset,
+            start_after=start_after,
+            incremental=incremental,
+            resume=resume,
+        )
+        return counts[0]
+
+    async def extract_and_load_csv(self, start_offset: int = 0, resume: bool = False) -> int:
+        """
+        Fully reload the table from the dataset's CSV export.
+
+        Each page of `csv_page_size` rows is streamed from Socrata straight
+        into a COPY, then cast and cleaned in SQL by a single INSERT ...
+        SELECT and committed, so no Python object is built per record. A
+        page that fails part-way is rolled back and fetched again.
+
         Args:
-            full_refresh: If True, truncate and reload. If False, upsert.
             start_offset: Offset to resume from (for interrupted loads).
+            resume: If True and no start_offset is given, continue the last
+                run from its checkpoint if it never finished.
 
         Returns:
-            Number of records processed.
+            Number of records loaded.
         """
-        logger.info(f"Starting extraction for {self.dataset_id}" + (f" from offset {start_offset}" if start_offset else ""))
+        await check_no_running_full_refresh([self])
+        checkpoints = None
+        if resume and not start_offset:
+            checkpoints = await load_unfinished_checkpoints([self])
+        if checkpoints and await _missing_shadows([self]):
+            logger.warning(f"Shadow table of run {checkpoints[0].run_id} is gone; starting over")
+            checkpoints = None
+        if start_offset and (missing := await _missing_shadows([self])):
+            raise ValueError(f"No interrupted full refresh of {missing[0]} to continue from --offset")
+        if checkpoints:
+            start_offset = checkpoints[0].resume_offset
+            self.run_id = checkpoints[0].run_id
+            self.records_loaded = checkpoints[0].rows_loaded
+        else:
+            self.run_id = uuid4().hex
+            self.records_loaded = 0
+
+        logger.info(
+            f"Starting CSV extraction for {self.dataset_id}"
+            + (f" from offset {start_offset}" if start_offset else "")
+            + (f" (resuming run {self.run_id})" if checkpoints else "")
+        )
         start_time = datetime.now()
-        total_processed = 0
-        batch_count = 0
-        commit_interval = 10  # Commit every 10 batches to avoid data loss
+        self.fetch_stats = StageStats("copy")
+        self.write_stats = StageStats("merge")
+        self.step_timings = []
+        self.records_fetched = start_offset
+        self.fetching_where = self.fetch_where
+
+        fields = [f.strip() for f in self.select_clause.split(",")]
+        if self.watermark_column:
+            fields = self.client.include_fields(",".join(fields), self.watermark_column).split(",")
+        # Missing fields are dropped from the request but kept (all NULL) in staging
+        select_clause = await self.client.project_select(self.dataset_id, ",".join(fields))
+        if select_clause is None:
+            select_clause = ",".join(fields)
+        selected = select_clause.split(",")
+
+        self.shadow = ShadowTable(self.model_class.__table__) if self.replaces_table else None
+        loader = CsvCopyLoader(
+            self.load_table,
+            self.get_primary_key_columns(),
+            fields,
+            self.csv_columns,
+            self.csv_expressions,
+            staging_table=f"{self.model_class.__tablename__}_csv_staging_{self.run_id[:self.STAGING_RUN_CHARS]}",
+            hash_exclude=self.derived_columns if self.hash_content else None,
+            preserve=self.preserved_columns,
+        )
+        page_size = self.client.csv_page_size
+        offset = start_offset
+        high_water = None
 
         async with AsyncSessionLocal() as session:
-            if full_refresh:
-                await self._truncate_table(session)
-
-            async for batch in self.client.fetch_batch(
-                self.dataset_id,
-                batch_size=self.batch_size,
-                where=self.where_clause,
-                select=self.select_clause,
-                order=self.order_clause,
-                start_offset=start_offset,
-            ):
-                transformed = []
-                for record in batch:
-                    try:
-                        result = self.transform_record(record)
-                        if result:
-                            transformed.append(result)
-                    except Exception as e:
-                        logger.warning(f"Error transforming record: {e}")
-                        continue
+            if not checkpoints:
+                if self.shadow and not start_offset:
+                    await self.shadow.create(session)
+                await self._start_checkpoint(session, True, False, start_offset, None)
+            await loader.create(session)
+            await session.commit()
+
+            async with httpx.AsyncClient(timeout=300.0) as client:
+                while True:
+                    logger.info(f"Fetching {self.dataset_id} CSV: offset={offset}, page_size={page_size}")
+                    for attempt in range(1, self.client.STREAM_ATTEMPTS + 1):
+                        started = time.perf_counter()
+                        try:
+                            staged = await loader.stage(
+                                session,
+                                self.client.stream_csv(
+                                    client,
+                                    self.dataset_id,
+                                    offset,
+                                    page_size,
+                                    where=self.fetch_where,
+                                    select=select_clause,
+                                    order=":id",  # Stable order across pages
+                                ),
+                                selected,
+                            )
+                            break
+                        except (httpx.HTTPStatusError, httpx.RequestError) as e:
+                            await session.rollback()
+                            if attempt == self.client.STREAM_ATTEMPTS or not is_retryable(e):
+                                raise
+                            wait = self.client.retry_delay(e, attempt)
+                            logger.warning(
+                                f"CSV page of {self.dataset_id} at offset={offset} failed ({e}); "
+                                f"retrying in {wait}s"
+                            )
+                            await asyncio.sleep(wait)
+                    self.fetch_stats.record(staged, time.perf_counter() - started)
+
+                    started = time.perf_counter()
+                    merged = await loader.merge(session)
+                    if self.watermark_column:
+                        page_max = await loader.max_value(session, self.watermark_column)
+                        if page_max and page_max > (high_water or ""):
+                            high_water = page_max
+                    self.records_loaded += merged
+                    offset += staged
+                    self.records_fetched = offset
+                    await self._save_checkpoint(session, offset, None)
+                    await session.commit()
+                    self.write_stats.record(merged, time.perf_counter() - started)
+
+                    logger.info(
+                        f"Committed {self.records_loaded} records (resume with --offset {offset})"
+                    )
+                    if staged < page_size:
+                        break
+
+            await loader.drop(session)
+
+            if self.shadow:
+                await self._finish_shadow(session)
+                await session.commit()
+                with self._timed("swap", self.model_class.__tablename__):
+                    await self.shadow.swap(session)
+            if high_water:
+                await self._save_watermark(session, high_water)
+            await self._finish_checkpoint(session)
+            await session.commit()
 
+            if not self.shadow and self.records_loaded:
+                await self._analyze(session, self.model_class.__tablename__)
+            await self._save_steps(session)
+            await session.commit()
+        self.shadow = None
+
+        elapsed = (datetime.now() - start_time).total_seconds()
+        logger.info(
+            f"Completed {self.dataset_id} CSV load in {elapsed:.1f}s: "
+            f"{self.records_loaded} records; {self.fetch_stats}; {self.write_stats}; "
+            f"{self.client.bytes_downloaded / 1_000_000:.1f} MB downloaded"
+        )
+        return self.records_loaded
+
+    def can_share_fetch(self, other: "BaseExtractor") -> bool:
+        """
+        Whether `other` can be fed from the same Socrata fetch stream as this extractor.
+
+        Their `order_clause`s must match unless one of them needs no order;
+        the shared fetch then uses the other's (see `shared_order`).
+        """
+        return (
+            self.dataset_id == other.dataset_id
+            and self.fetch_where == other.fetch_where
+            and self.keyset_column == other.keyset_column
+            and self.watermark_column == other.watermark_column
+            and (self.order_clause == other.order_clause or not (self.order_clause and other.order_clause))
+        )
+
+    async def _transform_stage(self, raw_queue: asyncio.Queue, load_queue: asyncio.Queue):
+        """Transform raw batches from `raw_queue` and pass them on to the writers."""
+        if self.transform_workers > 0:
+            await self._transform_in_processes(raw_queue, load_queue)
+        else:
+            while (item := await raw_queue.get()) is not None:
+                batch, offset, cursor = item
+                started = time.perf_counter()
+                transformed = self._transform_batch(batch)
+                self.transform_stats.record(len(batch), time.perf_counter() - started)
                 if transformed:
-                    await self._upsert_batch(session, transformed)
-                    total_processed += len(transformed)
-                    batch_count += 1
-                    logger.info(f"Processed {total_processed} records...")
+                    await load_queue.put((transformed, offset, cursor))
+        for _ in range(self.writer_count):
+            await load_queue.put(None)
+
+    async def _transform_in_processes(self, raw_queue: asyncio.Queue, load_queue: asyncio.Queue):
+        """
+        Transform raw batches in a pool of `transform_workers` processes.
+
+        Keeps the event loop free for the fetch and write stages while a
+        CPU-bound transform runs. Up to two batches per worker are in
+        flight; results are passed on in the order the batches arrived, so
+        resume cursors stay valid. Transform time is recorded as the time
+        spent waiting on the pool.
+        """
+        loop = asyncio.get_running_loop()
+        in_flight: deque[tuple[asyncio.Future, int, int, str | None]] = deque()
 
-                    # Commit incrementally to avoid losing all data on failure
-                    if batch_count % commit_interval == 0:
-                        await session.commit()
-                        logger.info(f"Committed {total_processed} records")
+        async def pass_on_oldest():
+            future, size, offset, cursor = in_flight.popleft()
+            started = time.perf_counter()
+            transformed = await future
+            self.transform_stats.record(size, time.perf_counter() - started)
+            if transformed:
+                await load_queue.put((transformed, offset, cursor))
+
+        # Spawn rather than fork, so workers don't inherit the event loop or DB connections
+        pool = ProcessPoolExecutor(
+            max_workers=self.transform_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        logger.info(f"Transforming {self.model_class.__tablename__} in {self.transform_workers} processes")
+        try:
+            while (item := await raw_queue.get()) is not None:
+                batch, offset, cursor = item
+                future = loop.run_in_executor(pool, _transform_in_worker, type(self), batch)
+                in_flight.append((future, len(batch), offset, cursor))
+                if len(in_flight) >= 2 * self.transform_workers:
+                    await pass_on_oldest()
+            while in_flight:
+                await pass_on_oldest()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _write_stage(self, writer_id: int, raw_queue: asyncio.Queue, load_queue: asyncio.Queue):
+        """
+        Write transformed batches from `load_queue`, committing every commit_interval batches.
+
+        Each commit checkpoints the position after its last batch. With
+        several writers batches commit out of order, so no position is safe
+        to resume from and checkpoints are not advanced. With a `tuner`,
+        every write and commit is timed to adapt the batch size and commit
+        interval.
+
+        In "copy" mode each writer stages into its own table, named after
+        the run (see `staging_table`), so concurrent loads of the same
+        table (e.g. shards on several workers) never share one.
+        """
+        batch_count = 0
+        offset, cursor = None, None
+        checkpoint = self.writer_count == 1
+
+        copy_loader = None
+        if self.load_mode == "copy":
+            copy_loader = CopyLoader(
+                self.load_table,
+                self.get_primary_key_columns(),
+                self.staging_table(writer_id),
+                key_column=None if self.shadow else self.change_column,
+                hash_exclude=self.derived_columns if self.hash_content else None,
+                preserve=self.preserved_columns,
+            )
+
+        async with AsyncSessionLocal() as session:
+            if copy_loader and writer_id == 0:
+                await self._drop_orphaned_staging(session)
+                await session.commit()
+            while (item := await load_queue.get()) is not None:
+                transformed, offset, cursor = item
+                started = time.perf_counter()
+                counts = None
+                if copy_loader:
+                    await copy_loader.stage(session, transformed)
+                else:
+                    counts = await self._upsert_batch(session, transformed)
+                self.records_loaded += len(transformed)
+                batch_count += 1
+                self._log_write(counts)
+                if self.tuner:
+                    self._tune(len(transformed), time.perf_counter() - started)
+
+                # Commit incrementally to avoid losing all data on failure
+                if batch_count >= self.commit_interval:
+                    batch_count = 0
+                    committing = time.perf_counter()
+                    if copy_loader:
+                        await self._merge_staged(session, copy_loader)
+                    if checkpoint:
+                        await self._save_checkpoint(session, offset, cursor)
+                    await session.commit()
+                    if self.tuner:
+                        self.tuner.observe_commit(time.perf_counter() - committing)
+                        self.commit_interval = self.tuner.commit_interval
+                    logger.info(
+                        f"Committed {self.records_loaded} records"
+                        + (f" (at --after {cursor})" if cursor else f" (at --offset {offset})")
+                        + f" [queued: {raw_queue.qsize()} raw, {load_queue.qsize()} transformed]"
+                    )
+                self.write_stats.record(len(transformed), time.perf_counter() - started)
 
             # Final commit for any remaining uncommitted data
+            if copy_loader:
+                await self._merge_staged(session, copy_loader)
+            if checkpoint and offset is not None:
+                await self._save_checkpoint(session, offset, cursor)
             await session.commit()
 
-        elapsed = (datetime.now() - start_time).total_seconds()
+            if copy_loader:
+                await copy_loader.drop(session)
+
+    def staging_table(self, writer_id: int = 0) -> str:
+        """
+        Staging table of one of the current run's writers.
+
+        Named after the run, so loads running at the same time (say two
+        shards of a dataset) each stage into their own table. A resumed run
+        keeps its run_id, and so its staging tables.
+        """
+        name = f"{self.model_class.__tablename__}_staging_{self.run_id[:self.STAGING_RUN_CHARS]}"
+        if self.writer_count > 1:
+            name += f"_{writer_id}"
+        return name
+
+    async def _drop_orphaned_staging(self, session: AsyncSession):
+        """
+        Drop staging tables of this table left behind by runs that can no longer resume.
+
+        Covers the staging tables of CSV loads too. Those of runs with an
+        unfinished checkpoint are kept, since the run may still be loading
+        or be resumed.
+        """
+        prefixes = [
+            f"{self.model_class.__tablename__}_staging_",
+            f"{self.model_class.__tablename__}_csv_staging_",
+        ]
+        result = await session.execute(
+            text(
+                "SELECT tablename FROM pg_tables WHERE schemaname = current_schema() "
+                "AND (starts_with(tablename, :prefix) OR starts_with(tablename, :csv_prefix))"
+            ),
+            {"prefix": prefixes[0], "csv_prefix": prefixes[1]},
+        )
+        tables = list(result.scalars())
+        if not tables:
+            return
+        result = await session.execute(
+            select(PipelineCheckpoint.run_id).where(PipelineCheckpoint.completed_at.is_(None))
+        )
+        unfinished = {run_id[:self.STAGING_RUN_CHARS] for run_id in result.scalars()}
+        for table in tables:
+            prefix = next(prefix for prefix in prefixes if table.startswith(prefix))
+            if table[len(prefix):len(prefix) + self.STAGING_RUN_CHARS] not in unfinished:
+                await session.execute(text(f"DROP TABLE IF EXISTS {table}"))
+                logger.info(f"Dropped staging table {table} of an abandoned run")
+
+    def _start_tuning(self):
+        """Start adapting `batch_size` and `commit_interval` from their current values."""
+        settings = get_settings()
+        self.tuner = BatchTuner(
+            self.batch_size,
+            self.commit_interval,
+            target_seconds=settings.pipeline_target_batch_seconds,
+            max_batch_size=settings.pipeline_max_batch_size,
+            # Each queued batch and the one being written are held in memory
+            max_batch_bytes=settings.pipeline_batch_memory_mb * 1_000_000 // (2 * self.queue_size + 1),
+            max_uncommitted_seconds=settings.pipeline_max_uncommitted_seconds,
+            # COPY has no bind parameters to run out of
+            columns=len(self.load_table.columns) if self.load_mode == "upsert" else None,
+        )
+
+    def _tune(self, rows: int, seconds: float):
+        """Feed one batch write to the tuner and adopt the batch size and commit interval it picks."""
+        bytes_per_row = self.fetch_stats.bytes / self.fetch_stats.records if self.fetch_stats.records else 0
+        self.tuner.observe_write(rows, seconds, rows * bytes_per_row)
+        if self.tuner.batch_size != self.batch_size or self.tuner.commit_interval != self.commit_interval:
+            logger.debug(f"Tuned {self.model_class.__tablename__}: {self.tuner}")
+        self.batch_size = self.tuner.batch_size
+        self.commit_interval = self.tuner.commit_interval
+
+    async def _merge_staged(self, session: AsyncSession, copy_loader: CopyLoader):
+        """Merge a CopyLoader's staged rows and record the BBLs they changed."""
+        counts = await copy_loader.merge(session)
+        if copy_loader.key_column:
+            await self._record_changes(session, copy_loader.changed_keys)
+        self._log_write(counts)
+
+    async def _finish_shadow(self, session: AsyncSession):
+        """
+        Build the loaded shadow table's indexes, record the BBLs it changes and ANALYZE it.
+
+        Rows added, removed or changed relative to the live table count as
+        changed, ignoring `derived_columns`. The shadow is analyzed before
+        it is swapped in, so queries plan on fresh statistics from the
+        start. Idempotent, so a resumed run can repeat it before swapping.
+        `preserved_columns` are first copied over from the live table.
+        """
+        if self.preserved_columns:
+            with self._timed("preserve_columns", self.shadow.name):
+                await self.shadow.copy_columns(
+                    session, sorted(self.preserved_columns), self.get_primary_key_columns()
+                )
+        with self._timed("build_indexes", self.shadow.name):
+            await self._build_shadow_indexes()
+        if self.change_column:
+            with self._timed("record_changes", self.shadow.name):
+                keys = await self.shadow.changed_keys(session, self.change_column, self.derived_columns)
+                await self._record_changes(session, keys)
+            logger.info(f"{self.state_key} full refresh changed {len(keys)} {self.change_column} values")
+        await self._analyze(session, self.shadow.name)
+
+    async def _build_shadow_indexes(self):
+        """
+        Build the shadow table's secondary indexes in parallel, each on its own connection.
+
+        Nothing reads the shadow table yet, so plain CREATE INDEX (one scan,
+        no waiting on other transactions) is used rather than CONCURRENTLY.
+        Up to `pipeline_index_builds` indexes are built at once.
+        """
+        settings = get_settings()
+        async with AsyncSessionLocal() as session:
+            statements = await self.shadow.index_statements(session)
+        limit = asyncio.Semaphore(settings.pipeline_index_builds)
+
+        async def build(name: str, statement: str):
+            async with limit, AsyncSessionLocal() as session:
+                await session.execute(
+                    text(f"SET LOCAL maintenance_work_mem = '{settings.pipeline_maintenance_work_mem}'")
+                )
+                started = time.perf_counter()
+                await session.execute(text(statement))
+                await session.commit()
+                logger.info(f"Built index {name} on {self.shadow.name} in {time.perf_counter() - started:.1f}s")
+
+        await run_stages(*(build(name, statement) for name, statement in statements))
+
+    async def _analyze(self, session: AsyncSession, table: str):
+        """Refresh the planner statistics of a loaded table instead of waiting for autovacuum."""
+        with self._timed("analyze", table):
+            await session.execute(text(f"ANALYZE {table}"))
+
+    @contextmanager
+    def _timed(self, step: str, table: str):
+        """Time a post-load step of the current run, to be saved by _save_steps."""
+        started_at, started = datetime.utcnow(), time.perf_counter()
+        yield
+        seconds = time.perf_counter() - started
+        self.step_timings.append((step, table, started_at, seconds))
+        logger.info(f"{step} of {table} took {seconds:.1f}s")
+
+    async def _save_steps(self, session: AsyncSession):
+        """Record the run's step timings in pipeline_steps (in the caller's transaction)."""
+        if not self.step_timings or not self.run_id:
+            return
+        await session.execute(
+            insert(PipelineStep.__table__).values([
+                {
+                    "run_id": self.run_id,
+                    "extractor": self.state_key,
+                    "table_name": table,
+                    "step": step,
+                    "started_at": started_at,
+                    "seconds": seconds,
+                }
+                for step, table, started_at, seconds in self.step_timings
+            ])
+        )
+        self.step_timings = []
+
+    def _log_write(self, counts: tuple[int, int, int] | None):
+        """Log write progress, with the rows a batch or merge inserted, updated and left unchanged."""
+        if counts is None:
+            logger.info(f"Processed {self.records_loaded} records...")
+            return
+        self.write_counts.add(*counts)
+        inserted, updated, unchanged = counts
         logger.info(
-            f"Completed {self.dataset_id}: {total_processed} records in {elapsed:.1f}s"
+            f"Processed {self.records_loaded} records... "
+            f"({inserted} inserted, {updated} updated, {unchanged} unchanged)"
+        )
+
+    def _transform_batch(self, batch: list[dict[str, Any]]) -> list[dict[str, Any]] | ColumnBatch:
+        """
+        Transform a batch of raw records with transform_batch if implemented.
+
+        Otherwise, or if the batch transform fails, apply transform_record
+        record by record, skipping failures.
+        """
+        try:
+            columns = self.transform_batch(batch)
+        except Exception as e:
+            logger.warning(f"Error transforming batch, falling back to per-record transform: {e}")
+            columns = None
+        if columns is not None:
+            return columns
+
+        transformed = []
+        for record in batch:
+            try:
+                result = self.transform_record(record)
+                if result:
+                    transformed.append(result)
+            except Exception as e:
+                logger.warning(f"Error transforming record: {e}")
+                continue
+        return transformed
+
+    async def _load_watermark(self, session: AsyncSession) -> str | None:
+        """Get the stored high-water mark, if it was recorded for the same column."""
+        result = await session.execute(
+            select(PipelineState.watermark).where(
+                PipelineState.extractor == self.state_key,
+                PipelineState.watermark_column == self.watermark_column,
+            )
         )
-        return total_processed
+        return result.scalar_one_or_none()
 
-    async def _truncate_table(self, session: AsyncSession):
-        """Truncate the target table."""
-        table_name = self.model_class.__tablename__
-        await session.execute(f"TRUNCATE TABLE {table_name} CASCADE")
-        logger.info(f"Truncated table {table_name}")
+    async def _save_watermark(self, session: AsyncSession, watermark: str):
+        """Record the high-water mark (committed with the caller's transaction)."""
+        stmt = insert(PipelineState.__table__).values(
+            extractor=self.state_key,
+            dataset_id=self.dataset_id,
+            watermark_column=self.watermark_column,
+            watermark=watermark,
+            updated_at=datetime.utcnow(),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["extractor"],
+            set_={
+                "dataset_id": stmt.excluded.dataset_id,
+                "watermark_column": stmt.excluded.watermark_column,
+                "watermark": stmt.excluded.watermark,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        await session.execute(stmt)
+        logger.info(f"Advanced {self.state_key} watermark to {watermark}")
+
+    async def _start_checkpoint(
+        self,
+        session: AsyncSession,
+        full_refresh: bool,
+        incremental: bool,
+        offset: int,
+        cursor: str | None,
+    ):
+        """Record the start of a new run as `run_id` (committed with the caller's transaction)."""
+        now = datetime.utcnow()
+        values = {
+            "dataset_id": self.dataset_id,
+            "run_id": self.run_id,
+            "full_refresh": full_refresh,
+            "incremental": incremental,
+            "replacing_table": self.model_class.__tablename__ if self.shadow else None,
+            "resume_offset": offset,
+            "resume_cursor": cursor,
+            "rows_loaded": self.records_loaded,
+            "started_at": now,
+            "updated_at": now,
+            "completed_at": None,
+        }
+        stmt = insert(PipelineCheckpoint.__table__).values(extractor=self.checkpoint_key, **values)
+        stmt = stmt.on_conflict_do_update(index_elements=["extractor"], set_=values)
+        await session.execute(stmt)
+
+    async def _save_checkpoint(self, session: AsyncSession, offset: int, cursor: str | None):
+        """Record the run's progress (committed with the data it describes)."""
+        await session.execute(
+            update(PipelineCheckpoint)
+            .where(
+                PipelineCheckpoint.extractor == self.checkpoint_key,
+                PipelineCheckpoint.run_id == self.run_id,
+            )
+            .values(
+                resume_offset=offset,
+                resume_cursor=cursor,
+                rows_loaded=self.records_loaded,
+                updated_at=datetime.utcnow(),
+            )
+        )
 
-    async def _upsert_batch(self, session: AsyncSession, records: list[dict]):
-        """Upsert a batch of records using PostgreSQL ON CONFLICT."""
+    async def _finish_checkpoint(self, session: AsyncSession):
+        """Mark the run complete, so the next run starts afresh."""
+        await session.execute(
+            update(PipelineCheckpoint)
+            .where(
+                PipelineCheckpoint.extractor == self.checkpoint_key,
+                PipelineCheckpoint.run_id == self.run_id,
+            )
+            .values(rows_loaded=self.records_loaded, completed_at=datetime.utcnow())
+        )
+        logger.info(f"Finished {self.checkpoint_key} run {self.run_id}: {self.records_loaded} records")
+
+    async def _upsert_batch(
+        self, session: AsyncSession, records: list[dict] | ColumnBatch
+    ) -> tuple[int, int, int] | None:
+        """
+        Upsert a batch of records using PostgreSQL ON CONFLICT.
+
+        With `hash_content`, rows are hashed in SQL (see `hashed_insert`)
+        and only overwrite rows whose hash differs.
+
+        Returns:
+            Rows inserted, updated and left unchanged.
+        """
         if not records:
-            return
+            return None
+        if isinstance(records, ColumnBatch):
+            records = records.to_records()
 
         # Deduplicate records by primary key (keep last occurrence)
         pk_columns = self.get_primary_key_columns()
@@ -133,23 +927,61 @@ class BaseExtractor(ABC):
             seen[key] = record
         deduped_records = list(seen.values())
 
-        stmt = insert(self.model_class.__table__).values(deduped_records)
+        if self.hash_content:
+            stmt = hashed_insert(self.load_table, deduped_records, self.derived_columns)
+        else:
+            stmt = insert(self.load_table).values(deduped_records)
 
         update_dict = {
             col.name: stmt.excluded[col.name]
-            for col in self.model_class.__table__.columns
-            if col.name not in pk_columns
+            for col in self.load_table.columns
+            if col.name not in pk_columns and col.name not in self.preserved_columns
         }
 
         if update_dict:
+            where = None
+            if self.hash_content:
+                where = self.load_table.c.content_hash.is_distinct_from(stmt.excluded.content_hash)
             stmt = stmt.on_conflict_do_update(
                 index_elements=pk_columns,
                 set_=update_dict,
+                where=where,
             )
         else:
             stmt = stmt.on_conflict_do_nothing(index_elements=pk_columns)
 
-        await session.execute(stmt)
+        # Only inserted and updated rows are returned; xmax is 0 for inserted ones.
+        # A full refresh records its changes by diffing instead (see _finish_shadow).
+        returning = [literal_column("xmax = 0")]
+        change_column = None if self.shadow else self.change_column
+        if change_column:
+            returning.append(self.load_table.c[change_column])
+        result = await session.execute(stmt.returning(*returning))
+        rows = result.all()
+        if change_column:
+            await self._record_changes(session, [row[1] for row in rows])
+        inserted = sum(row[0] for row in rows)
+        return inserted, len(rows) - inserted, len(deduped_records) - len(rows)
+
+    async def _record_changes(self, session: AsyncSession, keys: list):
+        """
+        Record the BBLs of changed rows for this run (in the caller's transaction).
+
+        `keys` are `change_column` values; extractors whose change column
+        isn't the BBL override this to look the BBLs up.
+        """
+        bbls = sorted({key for key in keys if key})
+        if not bbls or not self.run_id:
+            return
+        await session.execute(
+            text(
+                "INSERT INTO pipeline_changes (run_id, extractor, bbl, changed_at) "
+                "SELECT :run_id, :extractor, bbl, now() AT TIME ZONE 'utc' "
+                "FROM unnest(CAST(:bbls AS varchar[])) AS bbl "
+                "ON CONFLICT DO NOTHING"
+            ),
+            {"run_id": self.run_id, "extractor": self.state_key, "bbls": bbls},
+        )
 
     @staticmethod
     def parse_date(date_str: str | None) -> datetime | None:
@@ -165,6 +997,38 @@ class BaseExtractor(ABC):
         except (ValueError, TypeError):
             return None
 
+    @staticmethod
+    def parse_dates(values: list[str | None]) -> list[datetime | None]:
+        """
+        Parse a column of date strings.
+
+        Each distinct string is parsed once per batch, and recently seen
+        strings are memoized across batches, since inspection and status
+        dates repeat heavily within a dataset.
+        """
+        parsed = {value: _parse_date_memo(value) for value in set(values)}
+        return [parsed[value] for value in values]
+
+    @staticmethod
+    def safe_ints(values: list[Any]) -> list[int | None]:
+        """Convert a column of values to ints, like safe_int."""
+        safe_int = BaseExtractor.safe_int
+        return [
+            int(value) if value.__class__ is str and value.isascii() and value.isdigit() else safe_int(value)
+            for value in values
+        ]
+
+    @staticmethod
+    def make_bbls(boroughs: list[Any], blocks: list[Any], lots: list[Any]) -> list[str | None]:
+        """Create BBLs from columns of boroughs, blocks and lots, like make_bbl."""
+        bbls = []
+        for borough, block, lot in zip(boroughs, blocks, lots):
+            try:
+                bbls.append(f"{int(borough)}{int(block):05d}{int(lot):04d}")
+            except (ValueError, TypeError):
+                bbls.append(None)
+        return bbls
+
     @staticmethod
     def safe_int(value: Any) -> int | None:
         """Safely convert value to int."""
@@ -195,3 +1059,332 @@ class BaseExtractor(ABC):
             return f"{b}{bl:05d}{l:04d}"
         except (ValueError, TypeError):
             return None
+
+
+# Extractor instances used by transform worker processes, one per class
+_worker_extractors: dict[type[BaseExtractor], BaseExtractor] = {}
+
+
+def _transform_in_worker(
+    extractor_class: type[BaseExtractor], batch: list[dict[str, Any]]
+) -> list[dict[str, Any]] | ColumnBatch:
+    """Transform a batch in a transform worker process (see `_transform_in_processes`)."""
+    extractor = _worker_extractors.get(extractor_class)
+    if extractor is None:
+        extractor = _worker_extractors[extractor_class] = extractor_class()
+    return extractor._transform_batch(batch)
+
+
+# Memoized parse_date for bulk date parsing; bounded so a load can't grow it forever
+_parse_date_memo = lru_cache(maxsize=65536)(BaseExtractor.parse_date)
+
+
+async def _missing_shadows(extractors: list[BaseExtractor]) -> list[str]:
+    """State keys of the extractors replacing their table whose shadow table doesn't exist."""
+    async with AsyncSessionLocal() as session:
+        return [
+            extractor.state_key
+            for extractor in extractors
+            if extractor.replaces_table
+            and not await ShadowTable(extractor.model_class.__table__).exists(session)
+        ]
+
+
+def shared_order(extractors: list[BaseExtractor]) -> str | None:
+    """Order of a fetch shared by `extractors`: the `order_clause` any of them needs, if any."""
+    return next((extractor.order_clause for extractor in extractors if extractor.order_clause), None)
+
+
+async def check_no_running_full_refresh(extractors: list[BaseExtractor]):
+    """
+    Refuse to load tables that another process is fully refreshing.
+
+    Any load of the table counts, whichever extractor writes it (PLUTO
+    updates buildings in place, for one): it would otherwise drop or
+    recreate the shadow table the full refresh is loading, or take over
+    its checkpoint. An unfinished full refresh still counts as running
+    while its checkpoint or its ledger row
+    (refreshed every `pipeline_progress_seconds`, also while indexes build)
+    was updated within `pipeline_shard_timeout_seconds`; after that it is
+    abandoned, and its shadow table is dropped or resumed as before.
+
+    Raises:
+        RuntimeError: If one of the extractors' tables has a running full refresh.
+    """
+    tables = {extractor.model_class.__tablename__ for extractor in extractors}
+    stale = datetime.utcnow() - timedelta(seconds=get_settings().pipeline_shard_timeout_seconds)
+    heartbeat = (
+        select(PipelineRun.id)
+        .where(
+            PipelineRun.run_id == PipelineCheckpoint.run_id,
+            PipelineRun.status == "running",
+            PipelineRun.updated_at >= stale,
+        )
+        .exists()
+    )
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(PipelineCheckpoint).where(
+                PipelineCheckpoint.replacing_table.in_(tables),
+                PipelineCheckpoint.completed_at.is_(None),
+                (PipelineCheckpoint.updated_at >= stale) | heartbeat,
+            )
+        )
+        running = list(result.scalars())
+    if running:
+        raise RuntimeError(
+            "Full refresh still running for "
+            + ", ".join(
+                f"{c.replacing_table} by {c.extractor} (run {c.run_id}, updated {c.updated_at:%Y-%m-%d %H:%M:%S})"
+                for c in running
+            )
+            + "; not starting another load of its table"
+        )
+
+
+async def load_unfinished_checkpoints(
+    extractors: list[BaseExtractor],
+) -> list[PipelineCheckpoint] | None:
+    """
+    Get the checkpoints of the extractors' last run if it never finished.
+
+    The run is only resumable if every extractor has an unfinished
+    checkpoint from that same run. Returns the checkpoints in extractor
+    order, or None.
+    """
+    keys = [extractor.checkpoint_key for extractor in extractors]
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(PipelineCheckpoint).where(PipelineCheckpoint.extractor.in_(keys))
+        )
+        checkpoints = {checkpoint.extractor: checkpoint for checkpoint in result.scalars()}
+
+    if set(checkpoints) != set(keys):
+        return None
+    ordered = [checkpoints[key] for key in keys]
+    if any(c.completed_at for c in ordered) or len({c.run_id for c in ordered}) > 1:
+        return None
+    return ordered
+
+
+async def extract_and_load_shared(
+    extractors: list[BaseExtractor],
+    full_refresh: bool = False,
+    start_offset: int = 0,
+    start_after: str | None = None,
+    incremental: bool = False,
+    resume: bool = False,
+) -> list[int]:
+    """
+    Fetch one Socrata dataset once and load it through several extractors.
+
+    A single fetch stream, configured by the first extractor, fans out to
+    each extractor's own transform stage and writers, so a dataset consumed
+    by more than one extractor is only downloaded once. The extractors must
+    be able to share a fetch (see `BaseExtractor.can_share_fetch`); the
+    fetch selects the union of their columns.
+
+    With `resume` and no start position, an unfinished run of the same
+    extractors is continued from the earliest of their checkpoints (see
+    `load_unfinished_checkpoints`).
+
+    Returns:
+        Number of records processed by each extractor, in order.
+    """
+    lead = extractors[0]
+    for n, other in enumerate(extractors[1:], 1):
+        for earlier in extractors[:n]:
+            if not earlier.can_share_fetch(other):
+                raise ValueError(
+                    f"{other.state_key} cannot share a fetch with {earlier.state_key}"
+                )
+
+    await check_no_running_full_refresh(extractors)
+    checkpoints = None
+    if resume and not (start_offset or start_after):
+        checkpoints = await load_unfinished_checkpoints(extractors)
+    if checkpoints and checkpoints[0].full_refresh and await _missing_shadows(extractors):
+        logger.warning(f"Shadow tables of run {checkpoints[0].run_id} are gone; starting over")
+        checkpoints, full_refresh = None, True
+    if full_refresh and (start_offset or start_after) and (missing := await _missing_shadows(extractors)):
+        raise ValueError(
+            f"No interrupted full refresh of {', '.join(missing)} to continue from --offset/--after"
+        )
+    if checkpoints:
+        full_refresh = checkpoints[0].full_refresh
+        incremental = checkpoints[0].incremental
+        start_offset = min(c.resume_offset for c in checkpoints)
+        cursors = [c.resume_cursor for c in checkpoints]
+        start_after = min(cursors) if all(cursors) else None
+        run_id = checkpoints[0].run_id
+        logger.info(f"Resuming run {run_id} of {', '.join(e.state_key for e in extractors)}")
+    else:
+        run_id = uuid4().hex
+
+    if lead.keyset_column:
+        position = f" after {lead.keyset_column} {start_after}" if start_after else ""
+    else:
+        position = f" from offset {start_offset}" if start_offset else ""
+    sinks = ", ".join(e.model_class.__tablename__ for e in extractors)
+    logger.info(f"Starting extraction for {lead.dataset_id} into {sinks}{position}")
+    start_time = datetime.now()
+
+    where = lead.fetch_where
+    select_clause = None
+    if all(e.select_clause for e in extractors):
+        fields = [f.strip() for e in extractors for f in e.select_clause.split(",")]
+        select_clause = ",".join(dict.fromkeys(fields))
+
+    select_clause = await lead.client.project_select(lead.dataset_id, select_clause)
+
+    watermark = None
+    if lead.watermark_column:
+        select_clause = lead.client.include_fields(select_clause, lead.watermark_column)
+        if incremental and not full_refresh:
+            async with AsyncSessionLocal() as session:
+                watermarks = [await e._load_watermark(session) for e in extractors]
+            # Fetch from the oldest watermark; an extractor without one needs everything
+            if all(watermarks):
+                watermark = min(watermarks)
+        if watermark:
+            watermark_filter = f"{lead.watermark_column} >= '{watermark}'"
+            where = f"({where}) AND {watermark_filter}" if where else watermark_filter
+            logger.info(f"Incremental extraction of {lead.dataset_id} since {watermark}")
+
+    for extractor, checkpoint in zip(extractors, checkpoints or [None] * len(extractors)):
+        extractor.run_id = run_id
+        extractor.records_loaded = checkpoint.rows_loaded if checkpoint else 0
+        replace = full_refresh and extractor.replaces_table
+        extractor.shadow = ShadowTable(extractor.model_class.__table__) if replace else None
+
+    if not checkpoints:
+        # A full refresh starting from scratch creates its shadow table in the
+        # same transaction that records the run, so a resume keeps loading it
+        async with AsyncSessionLocal() as session:
+            for extractor in extractors:
+                if extractor.shadow and not (start_offset or start_after):
+                    await extractor.shadow.create(session)
+                elif not extractor.shadow:
+                    # Left behind by an abandoned full refresh (a running one refused this load)
+                    await ShadowTable(extractor.model_class.__table__).drop(session)
+                await extractor._start_checkpoint(
+                    session, full_refresh, incremental, start_offset, start_after
+                )
+            await session.commit()
+
+    fetch_stats = StageStats("fetch")
+    raw_queues: list[asyncio.Queue] = []
+    load_queues: list[asyncio.Queue] = []
+    for extractor in extractors:
+        extractor.fetch_stats = fetch_stats
+        extractor.transform_stats = StageStats("transform")
+        extractor.write_stats = StageStats("write")
+        extractor.write_counts = WriteCounts()
+        extractor.step_timings = []
+        if extractor.auto_tune:
+            extractor._start_tuning()
+        extractor.records_fetched = start_offset
+        extractor.fetching_where = where
+        extractor.raw_queue = asyncio.Queue(maxsize=extractor.queue_size)
+        extractor.load_queue = asyncio.Queue(maxsize=extractor.queue_size)
+        raw_queues.append(extractor.raw_queue)
+        load_queues.append(extractor.load_queue)
+    high_water = watermark
+
+    async def fetch_stage():
+        nonlocal high_water
+        offset = start_offset  # Raw records fetched, for resuming offset-paged loads
+        cursor = start_after
+        batches = lead.client.fetch_batch(
+            lead.dataset_id,
+            # Re-read for every batch, so tuned sizes take effect as the load runs
+            batch_size=lambda: min(e.batch_size for e in extractors),
+            where=where,
+            select=select_clause,
+            order=shared_order(extractors),
+            start_offset=start_offset,
+            keyset=lead.keyset_column,
+            start_after=start_after,
+        )
+        try:
+            while True:
+                started = time.perf_counter()
+                downloaded = lead.client.bytes_downloaded
+                try:
+                    batch = await batches.__anext__()
+                except StopAsyncIteration:
+                    break
+                fetch_stats.record(
+                    len(batch), time.perf_counter() - started, lead.client.bytes_downloaded - downloaded
+                )
+
+                offset += len(batch)
+                for extractor in extractors:
+                    extractor.records_fetched = offset
+                if lead.keyset_column:
+                    cursor = batch[-1].get(lead.keyset_column, cursor)
+                if lead.watermark_column:
+                    batch_max = max((r.get(lead.watermark_column) or "" for r in batch), default="")
+                    if batch_max > (high_water or ""):
+                        high_water = batch_max
+
+                for raw_queue in raw_queues:
+                    await raw_queue.put((batch, offset, cursor))
+        finally:
+            await batches.aclose()
+        for raw_queue in raw_queues:
+            await raw_queue.put(None)
+
+    stages = [fetch_stage()]
+    for extractor, raw_queue, load_queue in zip(extractors, raw_queues, load_queues):
+        stages.append(extractor._transform_stage(raw_queue, load_queue))
+        stages.extend(
+            extractor._write_stage(writer_id, raw_queue, load_queue)
+            for writer_id in range(extractor.writer_count)
+        )
+    await run_stages(*stages)
+
+    # Only swap in reloaded tables, advance watermarks and finish the run
+    # once every writer has committed its data. The swaps share one
+    # transaction, so readers see all reloaded tables change at once.
+    async with AsyncSessionLocal() as session:
+        for extractor in extractors:
+            if extractor.shadow:
+                await extractor._finish_shadow(session)
+        await session.commit()
+
+        for extractor in extractors:
+            if extractor.shadow:
+                with extractor._timed("swap", extractor.model_class.__tablename__):
+                    await extractor.shadow.swap(session)
+            # A shard covers only part of the dataset, so it can't advance the watermark
+            if high_water and high_water != watermark and extractor.shard_id is None:
+                await extractor._save_watermark(session, high_water)
+            await extractor._finish_checkpoint(session)
+        await session.commit()
+
+        # Reloaded tables were analyzed before the swap
+        for extractor in extractors:
+            counts = extractor.write_counts
+            if not extractor.shadow and counts.inserted + counts.updated:
+                await extractor._analyze(session, extractor.model_class.__tablename__)
+            await extractor._save_steps(session)
+        await session.commit()
+    for extractor in extractors:
+        extractor.shadow = None
+
+    elapsed = (datetime.now() - start_time).total_seconds()
+    logger.info(
+        f"Completed {lead.dataset_id} in {elapsed:.1f}s; {fetch_stats}; "
+        f"{lead.client.bytes_downloaded / 1_000_000:.1f} MB downloaded"
+    )
+    for extractor in extractors:
+        logger.info(
+            f"  {extractor.model_class.__tablename__}: {extractor.records_loaded} records "
+            f"({extractor.write_counts}); {extractor.transform_stats}; {extractor.write_stats}"
+        )
+        if extractor.tuner:
+            # Values to pin in the extractor's __init__
+            logger.info(f"  {extractor.model_class.__tablename__} ({lead.dataset_id}) tuned to {extractor.tuner}")
+            extractor.tuner = None
+    return [extractor.records_loaded for extractor in extractors]
@@ -0,0 +1,41 @@
+from itertools import compress
+from typing import Any, Iterator
+
+
+class ColumnBatch:
+    """
+    A batch of transformed records stored column by column.
+
+    Returned by `BaseExtractor.transform_batch`. Every column holds one
+    value per record, in the same order. CopyLoader stages it by zipping
+    the columns straight into row tuples; only the multi-row upsert path
+    needs a dict per record (`to_records`).
+    """
+
+    def __init__(self, columns: dict[str, list[Any]]):
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        self.columns = columns
+        self._length = lengths.pop() if lengths else 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def rows(self, names: list[str] | None = None) -> Iterator[tuple]:
+        """Iterate over the records as tuples of the `names` columns (default: all)."""
+        names = names or list(self.columns)
+        return zip(*(self.columns[name] for name in names))
+
+    def to_records(self) -> list[dict[str, Any]]:
+        """Build one dict per record."""
+        names = list(self.columns)
+        return [dict(zip(names, row)) for row in self.rows(names)]
+
+    def filter(self, keep: list[bool]) -> "ColumnBatch":
+        """Keep only the records whose `keep` flag is true."""
+        if all(keep):
+            return self
+        return ColumnBatch(
+            {name: list(compress(values, keep)) for name, values in self.columns.items()}
+        )
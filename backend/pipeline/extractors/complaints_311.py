@@ -4,6 +4,7 @@ from datetime import datetime
 from app.config import get_settings
 from app.models.complaints import Complaint311
 from pipeline.extractors.base import BaseExtractor
+from pipeline.extractors.columns import ColumnBatch
 
 
 class Complaints311Extractor(BaseExtractor):
@@ -43,14 +44,100 @@ class Complaints311Extractor(BaseExtractor):
 
     @property
     def where_clause(self) -> str | None:
-        """No filter - include all complaint types for comprehensive data."""
-        return None
+        """
+        Housing complaint types at a known BBL - other rows aren't used for scoring.
+
+        The dataset mixes cases ("HEAT/HOT WATER" but "Rodent"), so types
+        are matched case-insensitively.
+        """
+        types = ", ".join(f"'{t.upper()}'" for t in self.HOUSING_COMPLAINT_TYPES)
+        return f"upper(complaint_type) in ({types}) AND bbl IS NOT NULL"
+
+    @property
+    def select_clause(self) -> str | None:
+        """Only fetch the fields transform_record uses."""
+        return (
+            "unique_key,bbl,created_date,closed_date,agency,agency_name,complaint_type,"
+            "descriptor,location_type,incident_zip,incident_address,street_name,city,status,"
+            "resolution_description,resolution_action_updated_date,borough,latitude,longitude"
+        )
 
     @property
     def order_clause(self) -> str | None:
         """Order by created date descending to get newest complaints first."""
         return "created_date DESC"
 
+    @property
+    def load_mode(self) -> str:
+        """Tens of millions of rows - stage with COPY instead of multi-row upserts."""
+        return "copy"
+
+    @property
+    def keyset_column(self) -> str | None:
+        """Page by row id - $offset gets slower the deeper the load goes."""
+        return ":id"
+
+    @property
+    def csv_columns(self) -> dict[str, str] | None:
+        """Fields loaded as-is on CSV full refreshes."""
+        columns = [
+            "bbl", "created_date", "closed_date", "agency", "agency_name", "complaint_type",
+            "descriptor", "location_type", "incident_zip", "incident_address", "street_name",
+            "city", "status", "resolution_description", "resolution_action_updated_date",
+            "borough", "latitude", "longitude",
+        ]
+        return {column: column for column in columns}
+
+    @property
+    def csv_expressions(self) -> dict[str, str]:
+        """SQL equivalents of transform_record's cleaning for CSV full refreshes."""
+        created = "CAST(NULLIF(created_date, '') AS timestamp)"
+        closed = "CAST(NULLIF(closed_date, '') AS timestamp)"
+        return {
+            "unique_key": (
+                "CASE WHEN unique_key ~ '^[0-9]+(\\.[0-9]*)?$' "
+                "THEN NULLIF(CAST(CAST(unique_key AS numeric) AS integer), 0) END"
+            ),
+            "days_to_resolve": (
+                f"CAST(FLOOR(EXTRACT(EPOCH FROM {closed} - {created}) / 86400) AS integer)"
+            ),
+        }
+
+    def transform_batch(self, records: list[dict[str, Any]]) -> ColumnBatch | None:
+        """Column-oriented equivalent of transform_record."""
+        def column(field: str) -> list[Any]:
+            return [record.get(field) for record in records]
+
+        unique_keys = self.safe_ints(column("unique_key"))
+        created = self.parse_dates(column("created_date"))
+        closed = self.parse_dates(column("closed_date"))
+        days_to_resolve = [
+            (c - o).days if o and c else None for o, c in zip(created, closed)
+        ]
+
+        batch = ColumnBatch({
+            "unique_key": unique_keys,
+            "bbl": [bbl or None for bbl in column("bbl")],
+            "created_date": created,
+            "closed_date": closed,
+            **{
+                field: column(field)
+                for field in (
+                    "agency", "agency_name", "complaint_type", "descriptor", "location_type",
+                    "incident_zip", "incident_address", "street_name", "city", "status",
+                    "resolution_description",
+                )
+            },
+            "resolution_action_updated_date": self.parse_dates(
+                column("resolution_action_updated_date")
+            ),
+            "borough": column("borough"),
+            "latitude": column("latitude"),
+            "longitude": column("longitude"),
+            "days_to_resolve": days_to_resolve,
+        })
+        return batch.filter([bool(key) for key in unique_keys])
+
     def transform_record(self, record: dict[str, Any]) -> dict[str, Any] | None:
         """Transform 311 complaint record to model fields."""
         unique_key = self.safe_int(record.get("unique_key"))
@@ -0,0 +1,393 @@
+import logging
+from itertools import repeat
+from typing import Any, AsyncIterator
+
+from sqlalchemy import Table, cast, column, literal_column, select, text, values
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import Insert, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from pipeline.extractors.columns import ColumnBatch
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash_sql(table: Table, columns: list[str]) -> str:
+    """
+    SQL computing a row's content_hash from its loaded `columns`.
+
+    Every load path hashes rows with it (the COPY loaders and
+    `hashed_insert`), so a row hashes alike however it was loaded.
+    """
+    dialect = postgresql.dialect()
+    casts = ", ".join(
+        f"CAST({col} AS {table.columns[col].type.compile(dialect=dialect)})" for col in sorted(columns)
+    )
+    return f"hashtextextended(CAST(ROW({casts}) AS text), 0)"
+
+
+def hashed_insert(table: Table, records: list[dict[str, Any]], hash_exclude: set[str]) -> Insert:
+    """
+    INSERT of `records` into `table` that computes each row's content_hash in SQL.
+
+    The records are selected from a VALUES list with the columns and
+    Python-side defaults CopyLoader would stage, and hashed over the same
+    columns it hashes. Each is cast back to its column type, since a
+    column that is NULL in every row would otherwise come out as text.
+    """
+    loader = CopyLoader(table, [], hash_exclude=hash_exclude)
+    loader.columns = loader._resolve_columns(records[0])
+    defaults = loader._column_defaults(records[0])
+    rows = [
+        tuple(record[col] if col in record else defaults.get(col) for col in loader.columns)
+        for record in records
+    ]
+    staged = values(*(column(col, table.c[col].type) for col in loader.columns), name="staged").data(rows)
+    hashed = [col for col in loader.columns if col not in hash_exclude]
+    return insert(table).from_select(
+        [*loader.columns, "content_hash"],
+        select(
+            *(cast(staged.c[col], table.c[col].type) for col in loader.columns),
+            literal_column(content_hash_sql(table, hashed)),
+        ),
+    )
+
+
+class CopyLoader:
+    """
+    Bulk loader that streams rows into an unlogged staging table with
+    asyncpg's binary COPY and merges them into the target table with a
+    single set-based INSERT ... SELECT ... ON CONFLICT.
+
+    Rows are staged batch by batch via `stage()` and applied by `merge()`,
+    which the extractor calls once per commit interval. Only the merge has
+    to share the extractor's transaction; the staging table is scratch space
+    that is recreated at the start of every load. With a `key_column`, each
+    merge collects that column's values for the rows it inserted or
+    updated in `changed_keys`. With `hash_exclude`, content_hash is not
+    staged but computed on merge from every staged column not in it (see
+    `content_hash_sql`). Columns in `preserve` are only written to new
+    rows, never updated.
+    """
+
+    # Sequence column used to keep the last staged row per key on merge
+    SEQ_COLUMN = "_staged_seq"
+
+    def __init__(
+        self,
+        table: Table,
+        pk_columns: list[str],
+        staging_table: str | None = None,
+        key_column: str | None = None,
+        hash_exclude: set[str] | None = None,
+        preserve: set[str] | None = None,
+    ):
+        self.table = table
+        self.pk_columns = pk_columns
+        self.staging_table = staging_table or f"{table.name}_staging"
+        self.key_column = key_column
+        self.hash_exclude = hash_exclude
+        self.preserve = preserve or set()
+        self.columns: list[str] | None = None
+        self.staged_rows = 0
+        self.changed_keys: list = []  # key_column values the last merge changed
+
+    async def stage(self, session: AsyncSession, records: list[dict[str, Any]] | ColumnBatch):
+        """
+        COPY a batch of transformed records into the staging table.
+
+        A ColumnBatch is staged straight from its columns, without building
+        a dict per record.
+        """
+        if not records:
+            return
+
+        sample = records.columns if isinstance(records, ColumnBatch) else records[0]
+        if self.columns is None:
+            self.columns = self._resolve_columns(sample)
+            await self._create_staging_table(session)
+
+        defaults = self._column_defaults(sample)
+        if isinstance(records, ColumnBatch):
+            columns = [
+                records.columns[col] if col in records.columns else repeat(defaults.get(col), len(records))
+                for col in self.columns
+            ]
+            rows = list(zip(*columns))
+        else:
+            rows = [
+                tuple(
+                    record[col] if col in record else defaults.get(col)
+                    for col in self.columns
+                )
+                for record in records
+            ]
+
+        driver_conn = await self._driver_connection(session)
+        await driver_conn.copy_records_to_table(
+            self.staging_table,
+            records=rows,
+            columns=self.columns,
+        )
+        self.staged_rows += len(rows)
+
+    async def merge(self, session: AsyncSession) -> tuple[int, int, int]:
+        """
+        Merge staged rows into the target table and clear the staging table.
+
+        Returns:
+            Rows inserted, updated and left unchanged (including staged
+            duplicates of a key).
+        """
+        self.changed_keys = []
+        if not self.staged_rows:
+            return 0, 0, 0
+
+        keys = f"array_agg(DISTINCT {self.key_column})" if self.key_column else "NULL"
+        result = await session.execute(
+            text(
+                f"WITH merged AS ({self._merge_sql()}) "
+                f"SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted), "
+                f"{keys} FROM merged"
+            )
+        )
+        inserted, updated, changed_keys = result.one()
+        self.changed_keys = changed_keys or []
+        await session.execute(text(f"TRUNCATE TABLE {self.staging_table}"))
+
+        unchanged = self.staged_rows - inserted - updated
+        self.staged_rows = 0
+        logger.debug(f"Merged {inserted + updated} staged rows into {self.table.name}")
+        return inserted, updated, unchanged
+
+    async def drop(self, session: AsyncSession):
+        """Drop the staging table once the load is finished."""
+        if self.columns is None:
+            return
+        await session.execute(text(f"DROP TABLE IF EXISTS {self.staging_table}"))
+        await session.commit()
+        self.columns = None
+
+    def _resolve_columns(self, sample: dict[str, Any]) -> list[str]:
+        """Columns to stage: transformed fields plus Python-side column defaults."""
+        return [
+            col.name
+            for col in self.table.columns
+            if (col.name in sample or self._has_python_default(col))
+            and not (self.hash_exclude is not None and col.name == "content_hash")
+        ]
+
+    def _column_defaults(self, sample: dict[str, Any]) -> dict[str, Any]:
+        """Evaluate Python-side defaults for staged columns the transform omits."""
+        defaults = {}
+        for col in self.table.columns:
+            if col.name in sample or col.name not in self.columns:
+                continue
+            if col.default.is_callable:
+                defaults[col.name] = col.default.arg(None)
+            else:
+                defaults[col.name] = col.default.arg
+        return defaults
+
+    @staticmethod
+    def _has_python_default(col) -> bool:
+        return col.default is not None and (col.default.is_scalar or col.default.is_callable)
+
+    async def _create_staging_table(self, session: AsyncSession):
+        """(Re)create the unlogged staging table with the staged column types."""
+        column_list = ", ".join(self.columns)
+        await session.execute(text(f"DROP TABLE IF EXISTS {self.staging_table}"))
+        await session.execute(
+            text(
+                f"CREATE UNLOGGED TABLE {self.staging_table} AS "
+                f"SELECT {column_list} FROM {self.table.name} WITH NO DATA"
+            )
+        )
+        await session.execute(
+            text(f"ALTER TABLE {self.staging_table} ADD COLUMN {self.SEQ_COLUMN} BIGSERIAL")
+        )
+        logger.info(f"Created staging table {self.staging_table}")
+
+    @staticmethod
+    async def _driver_connection(session: AsyncSession):
+        """Get the asyncpg connection underlying the session's transaction."""
+        conn = await session.connection()
+        raw = await conn.get_raw_connection()
+        return raw.driver_connection
+
+    def _merge_sql(self) -> str:
+        columns = list(self.columns)
+        select_list = list(self.columns)
+        if self.hash_exclude is not None:
+            hashed = [col for col in self.columns if col not in self.hash_exclude]
+            columns.append("content_hash")
+            select_list.append(f"{content_hash_sql(self.table, hashed)} AS content_hash")
+        column_list = ", ".join(columns)
+        pk_list = ", ".join(self.pk_columns)
+        update_columns = [col for col in columns if col not in self.pk_columns and col not in self.preserve]
+
+        # DISTINCT ON keeps the most recently staged row per key, matching the
+        # "keep last occurrence" dedup of the multi-row upsert path.
+        sql = (
+            f"INSERT INTO {self.table.name} ({column_list}) "
+            f"SELECT DISTINCT ON ({pk_list}) {', '.join(select_list)} FROM {self.staging_table} "
+            f"ORDER BY {pk_list}, {self.SEQ_COLUMN} DESC "
+        )
+        if update_columns:
+            set_clause = ", ".join(f"{col} = EXCLUDED.{col}" for col in update_columns)
+            sql += f"ON CONFLICT ({pk_list}) DO UPDATE SET {set_clause} "
+            if "content_hash" in columns:
+                # Leave rows whose content is unchanged alone
+                sql += f"WHERE {self.table.name}.content_hash IS DISTINCT FROM EXCLUDED.content_hash "
+        else:
+            sql += f"ON CONFLICT ({pk_list}) DO NOTHING "
+        # Only inserted and updated rows are returned; xmax is 0 for inserted ones
+        sql += "RETURNING (xmax = 0) AS inserted"
+        if self.key_column:
+            sql += f", {self.key_column}"
+        return sql
+
+
+class CsvCopyLoader:
+    """
+    Bulk loader for Socrata CSV exports.
+
+    The CSV body is streamed straight into an unlogged staging table of raw
+    text fields with `COPY ... FROM STDIN (FORMAT csv)`, without building a
+    Python dict per record. `merge()` then casts and cleans the fields in
+    SQL and upserts them into the target table.
+
+    `columns` maps target columns to raw fields that need no cleaning: empty
+    strings become NULL and the value is cast to the column type.
+    `expressions` maps target columns to SQL expressions over the raw
+    fields for everything else. Staged rows with a NULL primary key are
+    skipped, like records transform_record rejects. With `hash_exclude`,
+    content_hash is computed as CopyLoader computes it, and rows whose hash
+    is unchanged are left alone. Columns in `preserve` are only written to
+    new rows, never updated.
+    """
+
+    def __init__(
+        self,
+        table: Table,
+        pk_columns: list[str],
+        fields: list[str],
+        columns: dict[str, str],
+        expressions: dict[str, str] | None = None,
+        staging_table: str | None = None,
+        hash_exclude: set[str] | None = None,
+        preserve: set[str] | None = None,
+    ):
+        self.table = table
+        self.pk_columns = pk_columns
+        self.fields = fields
+        self.columns = columns
+        self.expressions = expressions or {}
+        self.staging_table = staging_table or f"{table.name}_csv_staging"
+        self.hash_exclude = hash_exclude
+        self.preserve = preserve or set()
+
+    async def create(self, session: AsyncSession):
+        """(Re)create the staging table with one text column per raw field."""
+        field_list = ", ".join(f"{self.quote(field)} text" for field in self.fields)
+        await session.execute(text(f"DROP TABLE IF EXISTS {self.staging_table}"))
+        await session.execute(text(f"CREATE UNLOGGED TABLE {self.staging_table} ({field_list})"))
+        logger.info(f"Created CSV staging table {self.staging_table}")
+
+    async def stage(self, session: AsyncSession, source: AsyncIterator[bytes], fields: list[str]) -> int:
+        """
+        Replace the staging table's contents with a CSV body.
+
+        `source` yields the raw CSV bytes, header line included; `fields`
+        are the CSV's columns in order. Returns the number of rows copied.
+        """
+        await session.execute(text(f"TRUNCATE TABLE {self.staging_table}"))
+        driver_conn = await CopyLoader._driver_connection(session)
+        status = await driver_conn.copy_to_table(
+            self.staging_table,
+            source=source,
+            columns=fields,
+            format="csv",
+            header=True,
+        )
+        return int(status.split()[-1])
+
+    async def merge(self, session: AsyncSession) -> int:
+        """Cast, clean and upsert the staged rows into the target table. Returns rows written."""
+        sql, params = self._merge_sql()
+        result = await session.execute(text(sql), params)
+        return result.rowcount
+
+    async def max_value(self, session: AsyncSession, field: str) -> str | None:
+        """Largest staged value of a raw field (e.g. a watermark column)."""
+        result = await session.execute(
+            text(f"SELECT max({self.quote(field)}) FROM {self.staging_table}")
+        )
+        return result.scalar_one_or_none()
+
+    async def drop(self, session: AsyncSession):
+        """Drop the staging table once the load is finished."""
+        await session.execute(text(f"DROP TABLE IF EXISTS {self.staging_table}"))
+        await session.commit()
+
+    @staticmethod
+    def quote(field: str) -> str:
+        """
+        Quote a raw field name for use in a text() statement.
+
+        Socrata system fields start with a colon, which text() would
+        otherwise take for a bind parameter.
+        """
+        return '"' + field.replace('"', '""').replace(":", "\\:") + '"'
+
+    def _column_expressions(self) -> dict[str, str]:
+        """SQL expression producing each target column from the raw fields."""
+        dialect = postgresql.dialect()
+        expressions = {}
+        for col in self.table.columns:
+            if col.name in self.expressions:
+                expressions[col.name] = self.expressions[col.name]
+            elif col.name in self.columns:
+                field = self.quote(self.columns[col.name])
+                expressions[col.name] = f"CAST(NULLIF({field}, '') AS {col.type.compile(dialect=dialect)})"
+        return expressions
+
+    def _merge_sql(self) -> tuple[str, dict[str, Any]]:
+        expressions = self._column_expressions()
+
+        # Python-side defaults the CSV doesn't cover are evaluated once per merge
+        params = {}
+        for col in self.table.columns:
+            if col.name not in expressions and CopyLoader._has_python_default(col):
+                default = col.default
+                params[col.name] = default.arg(None) if default.is_callable else default.arg
+                expressions[col.name] = f"CAST(:{col.name} AS {col.type.compile(dialect=postgresql.dialect())})"
+
+        columns = list(expressions)
+        outer_list = ["*"]
+        if self.hash_exclude is not None:
+            hashed = [col for col in expressions if col not in self.hash_exclude]
+            columns.append("content_hash")
+            outer_list.append(f"{content_hash_sql(self.table, hashed)} AS content_hash")
+        column_list = ", ".join(columns)
+        select_list = ", ".join(f"{expr} AS {col}" for col, expr in expressions.items())
+        pk_list = ", ".join(self.pk_columns)
+        pk_filter = " AND ".join(f"{expressions[col]} IS NOT NULL" for col in self.pk_columns)
+        update_columns = [col for col in columns if col not in self.pk_columns and col not in self.preserve]
+
+        # Rows within a page are distinct by key almost always; DISTINCT ON
+        # keeps one so a duplicate can't abort the whole merge.
+        sql = (
+            f"INSERT INTO {self.table.name} ({column_list}) "
+            f"SELECT DISTINCT ON ({pk_list}) {', '.join(outer_list)} FROM ("
+            f"SELECT {select_list} FROM {self.staging_table} WHERE {pk_filter}"
+            f") staged ORDER BY {pk_list} "
+        )
+        if update_columns:
+            set_clause = ", ".join(f"{col} = EXCLUDED.{col}" for col in update_columns)
+            sql += f"ON CONFLICT ({pk_list}) DO UPDATE SET {set_clause}"
+            if "content_hash" in columns:
+                sql += f" WHERE {self.table.name}.content_hash IS DISTINCT FROM EXCLUDED.content_hash"
+        else:
+            sql += f"ON CONFLICT ({pk_list}) DO NOTHING"
+        return sql, params
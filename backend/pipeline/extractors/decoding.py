@@ -0,0 +1,90 @@
+"""JSON decoding for Socrata responses.
+
+Uses the fastest available decoder (orjson, then msgspec, then the standard
+library) and provides an incremental decoder that yields the records of a
+JSON array as the response body streams in.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+
+    loads = orjson.loads
+    DECODE_ERRORS: tuple[type[Exception], ...] = (orjson.JSONDecodeError,)
+    DECODER_NAME = "orjson"
+except ImportError:  # pragma: no cover - depends on installed packages
+    try:
+        import msgspec
+
+        loads = msgspec.json.decode
+        DECODE_ERRORS = (msgspec.DecodeError,)
+        DECODER_NAME = "msgspec"
+    except ImportError:
+        loads = json.loads
+        DECODE_ERRORS = (ValueError,)
+        DECODER_NAME = "json"
+
+
+class RecordStreamDecoder:
+    """
+    Incrementally decode a JSON array of records from byte chunks.
+
+    Socrata writes one record per line (`[{...}\\n,{...}\\n]`), so each
+    complete line is decoded on its own as soon as it arrives and only the
+    current partial line is buffered. Records that span several lines are
+    accumulated until they parse. A body that is not line-delimited at all
+    is decoded in one go when the stream is closed.
+    """
+
+    def __init__(self):
+        self._buffer = b""
+        self._pending = b""
+
+    def feed(self, chunk: bytes) -> list[dict[str, Any]]:
+        """Add a chunk of the body and return the records completed by it."""
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split(b"\n")
+        records = []
+        for line in lines:
+            record = self._decode_line(line)
+            if record is not None:
+                records.append(record)
+        return records
+
+    def close(self) -> list[dict[str, Any]]:
+        """Decode whatever is left once the body is complete."""
+        records = []
+        if self._buffer:
+            record = self._decode_line(self._buffer)
+            self._buffer = b""
+            if record is not None:
+                records.append(record)
+
+        if self._pending.strip():
+            # Not line-delimited: the leftover is the array body without brackets
+            pending = self._pending.strip().rstrip(b",]")
+            self._pending = b""
+            records.extend(loads(b"[" + pending + b"]"))
+        return records
+
+    def _decode_line(self, line: bytes) -> dict[str, Any] | None:
+        if self._pending:
+            candidate = self._pending + b"\n" + line
+        else:
+            candidate = line.strip().lstrip(b"[,").lstrip()
+            if not candidate or candidate in (b"]", b"[]"):
+                return None
+
+        for text in (candidate, candidate.rstrip().rstrip(b",]").rstrip()):
+            try:
+                record = loads(text)
+            except DECODE_ERRORS:
+                continue
+            if isinstance(record, dict):
+                self._pending = b""
+                return record
+
+        self._pending = candidate
+        return None
@@ -16,6 +16,18 @@ class DOBViolationsExtractor(BaseExtractor):
     def model_class(self):
         return DOBViolation
 
+    @property
+    def select_clause(self) -> str | None:
+        """Only fetch the fields transform_record uses (including alternate names)."""
+        return (
+            "isn_dob_bis_viol,isn_dob_bis_extract,boro,block,lot,bin,issue_date,"
+            "infraction_code1,violation_type_code,dob_violation_number,violation_number,"
+            "respondent_house_number,house_number,respondent_street,street,hearing_date,"
+            "disposition_date,hearing_status,ecb_violation_status,disposition_comments,"
+            "device_number,violation_description,section_law_description1,description,"
+            "ecb_violation_number,ecb_number,number,severity,violation_category,violation_type"
+        )
+
     @property
     def order_clause(self) -> str | None:
         """Order by issue date descending to get newest violations first."""
@@ -16,6 +16,18 @@ class EvictionsExtractor(BaseExtractor):
     def model_class(self):
         return Eviction
 
+    @property
+    def select_clause(self) -> str | None:
+        """Only fetch the fields transform_record uses (including alternate names)."""
+        return (
+            "court_index_number,courtindexnumber,docket_number,docketnumber,bbl,"
+            "eviction_address,evictionaddress,eviction_apt_num,aptseal,executed_date,"
+            "executeddate,marshal_first_name,marshalfirstname,marshal_last_name,"
+            "marshallastname,residential_commercial_ind,residentialcommercialind,borough,"
+            "ejectment,eviction_zip,evictionzip,eviction_possession,scheduledstatus,"
+            "latitude,longitude"
+        )
+
     @property
     def order_clause(self) -> str | None:
         """Order by executed date descending to get newest evictions first."""
@@ -1,10 +1,13 @@
 import hashlib
-import re
 from typing import Any
 
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from app.config import get_settings
 from app.models.hpd import HPDRegistration, RegistrationContact
 from app.models.building import Building
+from app.utils.normalize import normalize_address, normalize_name
 from pipeline.extractors.base import BaseExtractor
 
 
@@ -19,6 +22,14 @@ class HPDRegistrationsExtractor(BaseExtractor):
     def model_class(self):
         return HPDRegistration
 
+    @property
+    def select_clause(self) -> str | None:
+        """Only fetch the fields transform_record uses."""
+        return (
+            "registrationid,boroid,boro,block,lot,buildingid,bin,housenumber,streetname,"
+            "zip,lastregistrationdate,registrationenddate"
+        )
+
     @property
     def order_clause(self) -> str | None:
         """Order by last registration date descending."""
@@ -70,13 +81,10 @@ class HPDRegistrationsExtractor(BaseExtractor):
 class RegistrationContactsExtractor(BaseExtractor):
     """Extractor for HPD Registration Contacts dataset."""
 
-    # Patterns for name normalization
-    SUFFIX_PATTERN = re.compile(
-        r'\b(LLC|L\.L\.C\.|INC|INCORPORATED|CORP|CORPORATION|CO|COMPANY|'
-        r'LP|L\.P\.|LTD|LIMITED|PLLC|P\.L\.L\.C\.|PC|P\.C\.)\b',
-        re.IGNORECASE
-    )
-    PUNCT_PATTERN = re.compile(r'[^\w\s]')
+    def __init__(self):
+        super().__init__()
+        # Normalizing and hashing every contact is CPU-bound
+        self.transform_workers = get_settings().pipeline_transform_workers
 
     @property
     def dataset_id(self) -> str:
@@ -86,10 +94,44 @@ class RegistrationContactsExtractor(BaseExtractor):
     def model_class(self):
         return RegistrationContact
 
+    @property
+    def select_clause(self) -> str | None:
+        """Only fetch the fields transform_record uses."""
+        return (
+            "registrationid,type,contactdescription,corporationname,firstname,middleinitial,"
+            "lastname,businesshousenumber,businessstreetname,businessapartment,businesscity,"
+            "businessstate,businesszip"
+        )
+
     def get_primary_key_columns(self) -> list[str]:
         """Override to handle auto-increment ID."""
         return ["registration_id", "contact_type", "full_name"]
 
+    @property
+    def change_column(self) -> str | None:
+        """Contacts belong to buildings through their registration."""
+        return "registration_id"
+
+    @property
+    def derived_columns(self) -> set[str]:
+        """Portfolios are assigned by entity resolution, not loaded."""
+        return super().derived_columns | {"owner_portfolio_id"}
+
+    async def _record_changes(self, session: AsyncSession, keys: list):
+        """Record the BBLs of the registrations whose contacts changed."""
+        registration_ids = sorted({key for key in keys if key})
+        if not registration_ids or not self.run_id:
+            return
+        await session.execute(
+            text(
+                "INSERT INTO pipeline_changes (run_id, extractor, bbl, changed_at) "
+                "SELECT DISTINCT :run_id, :extractor, bbl, now() AT TIME ZONE 'utc' "
+                "FROM hpd_registrations WHERE registration_id = ANY(CAST(:ids AS integer[])) "
+                "ON CONFLICT DO NOTHING"
+            ),
+            {"run_id": self.run_id, "extractor": self.state_key, "ids": registration_ids},
+        )
+
     def transform_record(self, record: dict[str, Any]) -> dict[str, Any] | None:
         """Transform registration contact record to model fields."""
         registration_id = self.safe_int(record.get("registrationid"))
@@ -115,8 +157,8 @@ class RegistrationContactsExtractor(BaseExtractor):
         business_address = self._build_address(record)
 
         # Normalize for entity resolution
-        normalized_name = self._normalize_name(full_name)
-        normalized_address = self._normalize_address(business_address)
+        normalized_name = normalize_name(full_name)
+        normalized_address = normalize_address(business_address)
         name_hash = self._create_hash(normalized_name, normalized_address)
 
         return {
@@ -149,53 +191,6 @@ class RegistrationContactsExtractor(BaseExtractor):
         ]
         return " ".join(str(p) for p in parts if p).strip()
 
-    def _normalize_name(self, name: str) -> str:
-        """Normalize owner name for matching."""
-        if not name:
-            return ""
-        # Uppercase
-        result = name.upper()
-        # Remove LLC, INC, etc.
-        result = self.SUFFIX_PATTERN.sub("", result)
-        # Remove punctuation
-        result = self.PUNCT_PATTERN.sub("", result)
-        # Normalize whitespace
-        result = " ".join(result.split())
-        return result.strip()
-
-    def _normalize_address(self, address: str) -> str:
-        """Normalize address for matching."""
-        if not address:
-            return ""
-        result = address.upper()
-
-        # Standardize street types
-        replacements = [
-            (r'\bSTREET\b', 'ST'),
-            (r'\bAVENUE\b', 'AVE'),
-            (r'\bBOULEVARD\b', 'BLVD'),
-            (r'\bROAD\b', 'RD'),
-            (r'\bDRIVE\b', 'DR'),
-            (r'\bLANE\b', 'LN'),
-            (r'\bPLACE\b', 'PL'),
-            (r'\bCOURT\b', 'CT'),
-            (r'\bAPARTMENT\b', 'APT'),
-            (r'\bSUITE\b', 'STE'),
-            (r'\bFLOOR\b', 'FL'),
-            (r'\b(\d+)(ST|ND|RD|TH)\b', r'\1'),
-        ]
-        for pattern, repl in replacements:
-            result = re.sub(pattern, repl, result)
-
-        # Remove apartment/suite numbers
-        result = re.sub(r'\b(APT|STE|UNIT|FL|#)\s*[\w-]+\b', '', result)
-
-        # Remove punctuation and normalize whitespace
-        result = self.PUNCT_PATTERN.sub("", result)
-        result = " ".join(result.split())
-
-        return result.strip()
-
     def _create_hash(self, normalized_name: str, normalized_address: str) -> str:
         """Create hash for entity resolution grouping."""
         combined = f"{normalized_name}|{normalized_address}"
@@ -213,6 +208,21 @@ class BuildingsFromRegistrationsExtractor(BaseExtractor):
     def model_class(self):
         return Building
 
+    @property
+    def select_clause(self) -> str | None:
+        """Only fetch the fields transform_record uses."""
+        return "boroid,boro,block,lot,housenumber,streetname,zip,totalunits"
+
+    @property
+    def derived_columns(self) -> set[str]:
+        """Fields PLUTO fills in (or overwrites) after the buildings are loaded."""
+        return super().derived_columns | self.preserved_columns
+
+    @property
+    def preserved_columns(self) -> set[str]:
+        """PLUTO's fields: registrations only give new buildings their unit count."""
+        return {"total_units", "residential_units", "year_built", "building_class", "latitude", "longitude"}
+
     def transform_record(self, record: dict[str, Any]) -> dict[str, Any] | None:
         """Extract building info from registration record."""
         borough = record.get("boroid") or record.get("boro")
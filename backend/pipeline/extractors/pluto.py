@@ -24,6 +24,26 @@ class PLUTOExtractor(BaseExtractor):
     def model_class(self):
         return Building
 
+    @property
+    def replaces_table(self) -> bool:
+        """PLUTO only enriches buildings; a full refresh updates them all in place."""
+        return False
+
+    @property
+    def watermark_column(self) -> str | None:
+        """
+        Always re-read every lot.
+
+        Buildings created since the last run need PLUTO's fields even when
+        their lot hasn't changed; unchanged buildings aren't rewritten.
+        """
+        return None
+
+    @property
+    def hash_content(self) -> bool:
+        """The UPDATE compares PLUTO's fields directly (see _upsert_batch)."""
+        return False
+
     @property
     def select_clause(self) -> str | None:
         """Only fetch the fields we need from PLUTO."""
@@ -61,15 +81,24 @@ class PLUTOExtractor(BaseExtractor):
             "longitude": longitude,
         }
 
-    async def _upsert_batch(self, session: AsyncSession, records: list[dict]):
+    async def _upsert_batch(
+        self, session: AsyncSession, records: list[dict]
+    ) -> tuple[int, int, int] | None:
         """
         Update existing buildings with PLUTO data.
 
         Uses UPDATE (not INSERT) to only update buildings that already exist.
-        This prevents creating buildings with incomplete data.
+        This prevents creating buildings with incomplete data. The whole batch
+        is passed as parallel arrays and applied with one set-based
+        UPDATE ... FROM unnest(...) instead of one statement per record.
+        Buildings whose values would not change are not rewritten; those
+        that do are recorded as changed.
+
+        Returns:
+            Rows inserted (always 0), updated and left unchanged or missing.
         """
         if not records:
-            return
+            return None
 
         # Deduplicate records by BBL (keep last occurrence)
         seen = {}
@@ -79,18 +108,41 @@ class PLUTOExtractor(BaseExtractor):
                 seen[bbl] = record
         deduped_records = list(seen.values())
 
-        # Use UPDATE to only modify existing buildings
+        # Use UPDATE to only modify existing buildings. COALESCE keeps the
+        # current value wherever PLUTO has no data for a field.
         sql = text("""
-            UPDATE buildings SET
-                residential_units = COALESCE(:residential_units, residential_units),
-                total_units = COALESCE(:total_units, total_units),
-                year_built = COALESCE(:year_built, year_built),
-                latitude = COALESCE(:latitude, latitude),
-                longitude = COALESCE(:longitude, longitude),
+            UPDATE buildings b SET
+                residential_units = COALESCE(s.residential_units, b.residential_units),
+                total_units = COALESCE(s.total_units, b.total_units),
+                year_built = COALESCE(s.year_built, b.year_built),
+                latitude = COALESCE(s.latitude, b.latitude),
+                longitude = COALESCE(s.longitude, b.longitude),
                 updated_at = NOW()
-            WHERE bbl = :bbl
+            FROM unnest(
+                CAST(:bbl AS varchar[]),
+                CAST(:residential_units AS integer[]),
+                CAST(:total_units AS integer[]),
+                CAST(:year_built AS integer[]),
+                CAST(:latitude AS double precision[]),
+                CAST(:longitude AS double precision[])
+            ) AS s(bbl, residential_units, total_units, year_built, latitude, longitude)
+            WHERE b.bbl = s.bbl
+              AND (b.residential_units, b.total_units, b.year_built, b.latitude, b.longitude)
+                  IS DISTINCT FROM (
+                      COALESCE(s.residential_units, b.residential_units),
+                      COALESCE(s.total_units, b.total_units),
+                      COALESCE(s.year_built, b.year_built),
+                      COALESCE(s.latitude, b.latitude),
+                      COALESCE(s.longitude, b.longitude)
+                  )
+            RETURNING b.bbl
         """)
 
-        # Execute updates for each record
-        for record in deduped_records:
-            await session.execute(sql, record)
+        columns = ["bbl", "residential_units", "total_units", "year_built", "latitude", "longitude"]
+        result = await session.execute(
+            sql,
+            {col: [record[col] for record in deduped_records] for col in columns},
+        )
+        changed = list(result.scalars())
+        await self._record_changes(session, changed)
+        return 0, len(changed), len(deduped_records) - len(changed)
@@ -0,0 +1,201 @@
+import logging
+import re
+
+from sqlalchemy import MetaData, Table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowTable:
+    """
+    A copy of a table that a full refresh loads into and then swaps in.
+
+    Readers keep seeing the live table, complete, until the reload has
+    finished. `create()` copies the live table's columns, defaults, checks
+    and key/unique/foreign key constraints, but none of its secondary
+    indexes, so the bulk load doesn't maintain them row by row.
+    `build_indexes()` (or the `index_statements()`, run in parallel)
+    creates them all once at the end, and `swap()` then
+    replaces the live table by renaming, inside the caller's transaction.
+
+    Foreign keys from other tables to the live table are moved to the new
+    one as NOT VALID: they are enforced for new rows, but existing rows
+    that point at keys the reload no longer has are kept, not deleted.
+    """
+
+    SUFFIX = "_shadow"
+
+    def __init__(self, table: Table):
+        self.table = table
+        self.name = f"{table.name}{self.SUFFIX}"
+        # Same columns under the shadow's name, for loaders and upserts to target
+        self.target = table.to_metadata(MetaData(), name=self.name)
+
+    async def exists(self, session: AsyncSession) -> bool:
+        """Whether the shadow table exists (e.g. left by an interrupted full refresh)."""
+        result = await session.execute(
+            text("SELECT to_regclass(:name) IS NOT NULL"), {"name": self.name}
+        )
+        return result.scalar_one()
+
+    async def create(self, session: AsyncSession):
+        """(Re)create the empty shadow table, without secondary indexes."""
+        await self.drop(session)
+        await session.execute(
+            text(
+                f"CREATE TABLE {self.name} (LIKE {self.table.name} "
+                f"INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING IDENTITY "
+                f"INCLUDING GENERATED INCLUDING STORAGE)"
+            )
+        )
+        for name, definition in await self._constraints(session):
+            await session.execute(
+                text(f"ALTER TABLE {self.name} ADD CONSTRAINT {self._shadow_name(name)} {definition}")
+            )
+        logger.info(f"Created shadow table {self.name}")
+
+    async def index_statements(self, session: AsyncSession) -> list[tuple[str, str]]:
+        """
+        Names and CREATE INDEX statements of the live table's secondary indexes, for the shadow.
+
+        Each statement can run on its own connection, so they can be built
+        in parallel. They are idempotent (IF NOT EXISTS).
+        """
+        statements = []
+        for name, unique, definition in await self._indexes(session):
+            # Keep the access method, columns and predicate: "USING btree (bbl) ..."
+            using = re.search(r" USING .*", definition).group(0)
+            statements.append((
+                name,
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS "
+                f"{self._shadow_name(name)} ON {self.name}{using}",
+            ))
+        return statements
+
+    async def build_indexes(self, session: AsyncSession):
+        """Create the live table's secondary indexes on the loaded shadow table."""
+        for name, statement in await self.index_statements(session):
+            await session.execute(text(statement))
+            logger.info(f"Built index {name} on {self.name}")
+
+    async def changed_keys(self, session: AsyncSession, key_column: str, ignored: set[str]) -> list:
+        """
+        Distinct `key_column` values of rows added, removed or changed by the reload.
+
+        Compares every column of the shadow and live tables except `ignored`.
+        """
+        columns = ", ".join(col.name for col in self.table.columns if col.name not in ignored)
+        live = self.table.name
+        result = await session.execute(
+            text(
+                f"SELECT DISTINCT {key_column} FROM ("
+                f"(SELECT {columns} FROM {self.name} EXCEPT SELECT {columns} FROM {live}) "
+                f"UNION ALL "
+                f"(SELECT {columns} FROM {live} EXCEPT SELECT {columns} FROM {self.name})"
+                f") changed WHERE {key_column} IS NOT NULL"
+            )
+        )
+        return list(result.scalars())
+
+    async def copy_columns(self, session: AsyncSession, columns: list[str], key_columns: list[str]):
+        """Copy `columns` of the live table's rows into the shadow rows with the same key."""
+        live = self.table.name
+        assignments = ", ".join(f"{col} = {live}.{col}" for col in columns)
+        join = " AND ".join(f"{self.name}.{col} = {live}.{col}" for col in key_columns)
+        await session.execute(text(f"UPDATE {self.name} SET {assignments} FROM {live} WHERE {join}"))
+
+    async def swap(self, session: AsyncSession):
+        """
+        Replace the live table with the shadow table (in the caller's transaction).
+
+        Constraints and indexes take back their live names. Sequences owned
+        by the live table (serial ids) pass to the shadow table so dropping
+        the live table keeps them.
+        """
+        table = self.table.name
+        constraints = await self._constraints(session)
+        indexes = await self._indexes(session)
+        references = await self._references(session)
+        sequences = await self._owned_sequences(session)
+
+        for referencing, name, _ in references:
+            await session.execute(text(f"ALTER TABLE {referencing} DROP CONSTRAINT {name}"))
+        for sequence, column in sequences:
+            await session.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {self.name}.{column}"))
+
+        await session.execute(text(f"DROP TABLE {table}"))
+        await session.execute(text(f"ALTER TABLE {self.name} RENAME TO {table}"))
+
+        for name, _ in constraints:
+            await session.execute(
+                text(f"ALTER TABLE {table} RENAME CONSTRAINT {self._shadow_name(name)} TO {name}")
+            )
+        for name, _, _ in indexes:
+            await session.execute(text(f"ALTER INDEX {self._shadow_name(name)} RENAME TO {name}"))
+        for referencing, name, definition in references:
+            definition = definition.removesuffix(" NOT VALID")
+            await session.execute(
+                text(f"ALTER TABLE {referencing} ADD CONSTRAINT {name} {definition} NOT VALID")
+            )
+        logger.info(f"Swapped {self.name} in as {table}")
+
+    async def drop(self, session: AsyncSession):
+        """Drop the shadow table, if any."""
+        await session.execute(text(f"DROP TABLE IF EXISTS {self.name}"))
+
+    def _shadow_name(self, name: str) -> str:
+        """Name of a constraint or index on the shadow table (they share the schema's namespace)."""
+        return f"{name}{self.SUFFIX}"
+
+    async def _constraints(self, session: AsyncSession) -> list[tuple[str, str]]:
+        """Primary key, unique, exclusion and foreign key constraints of the live table."""
+        result = await session.execute(
+            text(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = CAST(:table AS regclass) AND contype IN ('p', 'u', 'x', 'f') "
+                "ORDER BY contype DESC, conname"  # Keys before the foreign keys
+            ),
+            {"table": self.table.name},
+        )
+        return [tuple(row) for row in result]
+
+    async def _indexes(self, session: AsyncSession) -> list[tuple[str, bool, str]]:
+        """Indexes of the live table that don't back one of its constraints."""
+        result = await session.execute(
+            text(
+                "SELECT i.relname, x.indisunique, pg_get_indexdef(x.indexrelid) "
+                "FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid "
+                "WHERE x.indrelid = CAST(:table AS regclass) AND NOT EXISTS ("
+                "SELECT 1 FROM pg_constraint c "
+                "WHERE c.conindid = x.indexrelid AND c.conrelid = x.indrelid"
+                ") ORDER BY i.relname"
+            ),
+            {"table": self.table.name},
+        )
+        return [tuple(row) for row in result]
+
+    async def _references(self, session: AsyncSession) -> list[tuple[str, str, str]]:
+        """Foreign keys of other tables that reference the live table."""
+        result = await session.execute(
+            text(
+                "SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) "
+                "FROM pg_constraint WHERE contype = 'f' "
+                "AND confrelid = CAST(:table AS regclass) AND conrelid <> confrelid"
+            ),
+            {"table": self.table.name},
+        )
+        return [tuple(row) for row in result]
+
+    async def _owned_sequences(self, session: AsyncSession) -> list[tuple[str, str]]:
+        """Sequences owned by columns of the live table, with their column."""
+        result = await session.execute(
+            text(
+                "SELECT s.oid::regclass::text, a.attname FROM pg_class s "
+                "JOIN pg_depend d ON d.objid = s.oid AND d.deptype = 'a' "
+                "JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid "
+                "WHERE s.relkind = 'S' AND d.refobjid = CAST(:table AS regclass)"
+            ),
+            {"table": self.table.name},
+        )
+        return [tuple(row) for row in result]
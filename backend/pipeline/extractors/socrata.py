@@ -1,27 +1,52 @@
 import asyncio
 import logging
-from typing import AsyncIterator, Any
-from datetime import datetime
+from collections import deque
+from typing import AsyncIterator, Any, Callable
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 
 import httpx
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from tenacity import RetryCallState, retry, retry_if_exception, stop_after_attempt, wait_exponential
 
 from app.config import get_settings
+from pipeline.extractors.archive import get_archive
+from pipeline.extractors.decoding import RecordStreamDecoder, loads
 
 logger = logging.getLogger(__name__)
 
 
 class RateLimiter:
-    """Token bucket rate limiter for API requests."""
+    """
+    Adaptive token bucket rate limiter for API requests.
 
-    def __init__(self, rate: int):
-        self.rate = rate
-        self.tokens = rate
+    Starts at `rate` requests per second and adapts to how the server
+    responds (see `observe`): every healthy response raises the rate
+    additively, by about one request per second for each second of healthy
+    traffic, up to `max_rate`; a 429 or 5xx halves it, down to `min_rate`.
+    A Retry-After header holds every request until it has passed.
+    """
+
+    INCREASE = 1.0  # Requests/s gained per `rate` healthy responses
+    DECREASE = 0.5  # Factor applied to the rate on throttling
+
+    def __init__(self, rate: float, min_rate: float | None = None, max_rate: float | None = None):
+        self.rate = float(rate)
+        self.min_rate = min_rate or min(1.0, self.rate)
+        self.max_rate = max(max_rate or self.rate, self.rate)
+        self.tokens = self.rate
         self.last_refill = datetime.now()
+        self.blocked_until: datetime | None = None
+        self.throttled = 0  # Throttling responses seen
         self._lock = asyncio.Lock()
 
     async def acquire(self):
         async with self._lock:
+            if self.blocked_until:
+                wait_time = (self.blocked_until - datetime.now()).total_seconds()
+                if wait_time > 0:
+                    await asyncio.sleep(wait_time)
+                self.blocked_until = None
+
             now = datetime.now()
             elapsed = (now - self.last_refill).total_seconds()
             self.tokens = min(self.rate, self.tokens + elapsed * self.rate)
@@ -34,39 +59,146 @@ class RateLimiter:
             else:
                 self.tokens -= 1
 
+    def observe(self, response: httpx.Response):
+        """Adapt the rate to a response: back off on 429/5xx, speed up otherwise."""
+        if is_throttling_status(response.status_code):
+            self.throttle(parse_retry_after(response))
+        else:
+            self.rate = min(self.max_rate, self.rate + self.INCREASE / self.rate)
+
+    def throttle(self, retry_after: float | None = None):
+        """Cut the rate and, given a Retry-After delay, hold all requests until it passes."""
+        previous = self.rate
+        self.rate = max(self.min_rate, self.rate * self.DECREASE)
+        self.tokens = min(self.tokens, 0)
+        self.throttled += 1
+        if retry_after:
+            until = datetime.now() + timedelta(seconds=retry_after)
+            if not self.blocked_until or until > self.blocked_until:
+                self.blocked_until = until
+        logger.warning(
+            f"Socrata is throttling: rate {previous:.1f} -> {self.rate:.1f} requests/s"
+            + (f", pausing {retry_after:.0f}s (Retry-After)" if retry_after else "")
+        )
+
+
+def is_throttling_status(status_code: int) -> bool:
+    """Whether a response status means the server is overloaded or rate limiting us."""
+    return status_code == 429 or status_code >= 500
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a failed request is worth retrying (network errors, 429 and 5xx)."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return is_throttling_status(error.response.status_code)
+    return isinstance(error, httpx.RequestError)
+
+
+def parse_retry_after(response: httpx.Response) -> float | None:
+    """Seconds to wait from a Retry-After header (delay-seconds or HTTP date), if any."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+_backoff = wait_exponential(multiplier=1, min=2, max=60)
+
+
+def retry_wait(retry_state: RetryCallState) -> float:
+    """
+    Tenacity wait: exponential backoff, unless the server sent Retry-After.
+
+    The shared rate limiter already holds every request until Retry-After
+    has passed, so no extra wait is needed then.
+    """
+    error = retry_state.outcome.exception()
+    if isinstance(error, httpx.HTTPStatusError) and parse_retry_after(error.response) is not None:
+        return 0
+    return _backoff(retry_state)
+
+
+_shared_rate_limiter: RateLimiter | None = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Get the process-wide rate limiter.
+
+    All SocrataClient instances share it, so extractors running concurrently
+    stay within one adaptive rate budget and back off together.
+    """
+    global _shared_rate_limiter
+    if _shared_rate_limiter is None:
+        settings = get_settings()
+        _shared_rate_limiter = RateLimiter(
+            settings.socrata_rate_limit,
+            min_rate=settings.socrata_rate_limit_min,
+            max_rate=settings.socrata_rate_limit_max,
+        )
+    return _shared_rate_limiter
+
 
 class SocrataClient:
     """Async client for NYC Open Data Socrata API with pagination and rate limiting."""
 
+    STREAM_ATTEMPTS = 5
+    PREFETCH_CHUNKS = 2  # Decoded chunks a prefetched page may buffer ahead of the consumer
+
     def __init__(self):
         self.settings = get_settings()
         self.base_url = self.settings.socrata_base_url
         self.app_token = self.settings.socrata_app_token
         self.page_size = self.settings.socrata_page_size
-        self.rate_limiter = RateLimiter(self.settings.socrata_rate_limit)
+        self.prefetch_pages = max(1, self.settings.socrata_prefetch_pages)
+        self.stream_decode = self.settings.socrata_stream_decode
+        self.csv_page_size = self.settings.socrata_csv_page_size
+        self.rate_limiter = get_rate_limiter()
+        self.bytes_downloaded = 0  # Response bytes received over the wire (record counts aside)
+        self.pages_fetched = 0  # Data pages received (JSON or CSV)
+        self._field_names: dict[str, set[str] | None] = {}
+        self.archive, self.replay = get_archive()
 
         self.headers = {"Accept": "application/json"}
         if self.app_token:
             self.headers["X-App-Token"] = self.app_token
 
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_exponential(multiplier=1, min=2, max=60),
-        retry=retry_if_exception_type((httpx.HTTPStatusError, httpx.RequestError)),
-    )
-    async def _fetch_page(
+    @staticmethod
+    def include_fields(select: str | None, *fields: str) -> str:
+        """
+        Extend a SoQL SELECT clause so it also returns `fields`.
+
+        System fields such as :id and :updated_at are only returned when
+        selected explicitly, so a missing SELECT becomes "*" plus the fields.
+        """
+        selected = [field.strip() for field in select.split(",")] if select else ["*"]
+        for field in fields:
+            if field not in selected:
+                selected.append(field)
+        return ",".join(selected)
+
+    @staticmethod
+    def retry_delay(error: Exception, attempt: int) -> float:
+        """Seconds to wait before retrying a streamed request (see `retry_wait`)."""
+        if isinstance(error, httpx.HTTPStatusError) and parse_retry_after(error.response) is not None:
+            return 0
+        return min(60, 2 ** attempt)
+
+    def _page_params(
         self,
-        client: httpx.AsyncClient,
-        dataset_id: str,
         offset: int,
         where: str | None = None,
         select: str | None = None,
         order: str | None = None,
-    ) -> list[dict[str, Any]]:
-        """Fetch a single page of results from Socrata API."""
-        await self.rate_limiter.acquire()
-
-        url = f"{self.base_url}/resource/{dataset_id}.json"
+    ) -> dict[str, Any]:
         params = {
             "$limit": self.page_size,
             "$offset": offset,
@@ -77,53 +209,407 @@ class SocrataClient:
             params["$select"] = select
         if order:
             params["$order"] = order
+        return params
 
+    async def _fetch_page(
+        self,
+        client: httpx.AsyncClient,
+        dataset_id: str,
+        offset: int,
+        where: str | None = None,
+        select: str | None = None,
+        order: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Fetch a single page of results from Socrata API (or the page archive)."""
+        params = self._page_params(offset, where, select, order)
+
+        if self.replay:
+            return loads(self.archive.load_page(dataset_id, params))
+
+        body = await self._get_page_body(client, dataset_id, params)
+        records = loads(body)
+        if self.archive:
+            self.archive.save_page(dataset_id, params, body, len(records))
+        return records
+
+    async def _stream_page(
+        self,
+        client: httpx.AsyncClient,
+        dataset_id: str,
+        offset: int,
+        where: str | None = None,
+        select: str | None = None,
+        order: str | None = None,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """
+        Fetch a single page, yielding its records in chunks as they are decoded.
+
+        With `stream_decode`, the body is read incrementally and decoded line
+        by line, so memory no longer grows with the page size. A request that
+        fails part-way is retried and the records already yielded are skipped.
+        Otherwise (or when replaying) the whole page is yielded at once.
+        """
+        if not self.stream_decode or self.replay:
+            yield await self._fetch_page(client, dataset_id, offset, where, select, order)
+            return
+
+        params = self._page_params(offset, where, select, order)
+        url = f"{self.base_url}/resource/{dataset_id}.json"
+        yielded = 0
+
+        for attempt in range(1, self.STREAM_ATTEMPTS + 1):
+            decoder = RecordStreamDecoder()
+            decoded = 0
+            body = [] if self.archive else None
+            try:
+                await self.rate_limiter.acquire()
+                async with client.stream("GET", url, params=params, headers=self.headers) as response:
+                    self.rate_limiter.observe(response)
+                    response.raise_for_status()
+                    chunks = response.aiter_bytes()
+                    while True:
+                        try:
+                            chunk = await chunks.__anext__()
+                            records = decoder.feed(chunk)
+                            if body is not None:
+                                body.append(chunk)
+                        except StopAsyncIteration:
+                            records = decoder.close()
+                            chunk = None
+
+                        # Skip records already yielded by an earlier attempt
+                        skip = max(0, min(len(records), yielded - decoded))
+                        decoded += len(records)
+                        if len(records) > skip:
+                            yielded += len(records) - skip
+                            yield records[skip:]
+                        if chunk is None:
+                            break
+                    self.bytes_downloaded += response.num_bytes_downloaded
+            except (httpx.HTTPStatusError, httpx.RequestError) as e:
+                if attempt == self.STREAM_ATTEMPTS or not is_retryable(e):
+                    raise
+                wait = self.retry_delay(e, attempt)
+                logger.warning(f"Streaming {dataset_id} offset={offset} failed ({e}); retrying in {wait}s")
+                await asyncio.sleep(wait)
+                continue
+
+            if body is not None:
+                self.archive.save_page(dataset_id, params, b"".join(body), decoded)
+            return
+
+    @retry(
+        stop=stop_after_attempt(5),
+        wait=retry_wait,
+        retry=retry_if_exception(is_retryable),
+        reraise=True,
+    )
+    async def _get_page_body(
+        self,
+        client: httpx.AsyncClient,
+        dataset_id: str,
+        params: dict[str, Any],
+    ) -> bytes:
+        """Request a page and return the raw response body."""
+        await self.rate_limiter.acquire()
+
+        url = f"{self.base_url}/resource/{dataset_id}.json"
         response = await client.get(url, params=params, headers=self.headers)
+        self.rate_limiter.observe(response)
         response.raise_for_status()
-        return response.json()
+        self.bytes_downloaded += response.num_bytes_downloaded
+        return response.content
 
-    async def fetch_all(
+    async def stream_csv(
+        self,
+        client: httpx.AsyncClient,
+        dataset_id: str,
+        offset: int = 0,
+        limit: int | None = None,
+        where: str | None = None,
+        select: str | None = None,
+        order: str | None = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream one page of a dataset's CSV export as raw bytes.
+
+        The CSV export is far cheaper for Socrata to produce than JSON and
+        needs no decoding on our side: the bytes, header line included, are
+        meant to be fed straight to a COPY (see CsvCopyLoader). The page is
+        `limit` rows (default `csv_page_size`) starting at `offset`.
+        Failures are not retried here, since part of the body may already
+        have been consumed; callers retry the whole page. Pages are archived
+        (and replayed) like JSON ones, kept apart as CSV.
+        """
+        params = self._page_params(offset, where, select, order)
+        params["$limit"] = limit or self.csv_page_size
+
+        if self.replay:
+            yield self.archive.load_page(dataset_id, params, fmt="csv")
+            self.pages_fetched += 1
+            return
+
+        url = f"{self.base_url}/resource/{dataset_id}.csv"
+        body = [] if self.archive else None
+        await self.rate_limiter.acquire()
+        headers = {**self.headers, "Accept": "text/csv"}
+        async with client.stream("GET", url, params=params, headers=headers) as response:
+            self.rate_limiter.observe(response)
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                if body is not None:
+                    body.append(chunk)
+                yield chunk
+            self.bytes_downloaded += response.num_bytes_downloaded
+            self.pages_fetched += 1
+        if body is not None:
+            # Rows aren't decoded here (quoted fields may span lines), so none are counted
+            self.archive.save_page(dataset_id, params, b"".join(body), None, fmt="csv")
+
+    async def get_field_names(self, dataset_id: str) -> set[str] | None:
+        """Get a dataset's column field names from its view metadata (None if unavailable)."""
+        if dataset_id in self._field_names:
+            return self._field_names[dataset_id]
+
+        if self.replay:
+            self._field_names[dataset_id] = self.archive.load_fields(dataset_id)
+            return self._field_names[dataset_id]
+
+        await self.rate_limiter.acquire()
+        url = f"{self.base_url}/api/views/{dataset_id}.json"
+        try:
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                response = await client.get(url, headers=self.headers)
+                self.rate_limiter.observe(response)
+                response.raise_for_status()
+                self.bytes_downloaded += response.num_bytes_downloaded
+                columns = response.json().get("columns", [])
+            field_names = {col["fieldName"] for col in columns if "fieldName" in col}
+            if self.archive:
+                self.archive.save_fields(dataset_id, field_names)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning(f"Could not read column metadata for {dataset_id}: {e}")
+            field_names = None
+
+        self._field_names[dataset_id] = field_names
+        return field_names
+
+    async def project_select(self, dataset_id: str, select: str | None) -> str | None:
+        """
+        Restrict a plain comma-separated SELECT to fields the dataset actually has.
+
+        Extractors list every field name variant their transform accepts;
+        selecting a field the dataset lacks is an error in SoQL. If column
+        metadata is unavailable or nothing matches, no projection is applied.
+        """
+        if not select:
+            return select
+        field_names = await self.get_field_names(dataset_id)
+        if field_names is None:
+            return None
+
+        fields = [field.strip() for field in select.split(",")]
+        projected = [f for f in fields if f in field_names or f.startswith(":")]
+        dropped = [f for f in fields if f not in projected]
+        if dropped:
+            logger.debug(f"Not selecting fields missing from {dataset_id}: {', '.join(dropped)}")
+        return ",".join(projected) if projected else None
+
+    async def fetch_pages(
         self,
         dataset_id: str,
         where: str | None = None,
         select: str | None = None,
         order: str | None = None,
         start_offset: int = 0,
-    ) -> AsyncIterator[dict[str, Any]]:
+        keyset: str | None = None,
+        start_after: str | None = None,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
         """
-        Fetch all records from a dataset with automatic pagination.
+        Fetch all pages of a dataset, keeping up to `prefetch_pages` requests in flight.
 
-        Yields individual records as they are fetched.
+        Pages are requested in offset order (each still goes through the rate
+        limiter) and yielded in that same order. Every page is streamed (see
+        `_stream_page`), so it may be yielded in several chunks: the oldest
+        page's chunks are yielded as they are decoded, while each page behind
+        it decodes at most `PREFETCH_CHUNKS` chunks ahead and then waits, so
+        memory stays bounded by chunks rather than whole pages. A short or
+        empty page marks the end of the dataset; any requests already issued
+        past it are cancelled.
+
+        If `keyset` is given, pages are fetched by keyset pagination instead
+        and `start_offset` is ignored. Keyset pages, and offset pages when
+        `prefetch_pages` is 1, are fetched one at a time (see
+        `_fetch_sequential_pages`).
         """
-        offset = start_offset
+        if keyset or self.prefetch_pages == 1:
+            async for records in self._fetch_sequential_pages(
+                dataset_id, where, select, order, start_offset, keyset, start_after
+            ):
+                yield records
+            return
+
+        next_offset = start_offset
         total_fetched = 0
+        in_flight: deque[tuple[asyncio.Task, asyncio.Queue]] = deque()
 
         async with httpx.AsyncClient(timeout=120.0) as client:
-            while True:
+
+            def schedule_next():
+                nonlocal next_offset
                 logger.info(
-                    f"Fetching {dataset_id}: offset={offset}, page_size={self.page_size}"
+                    f"Fetching {dataset_id}: offset={next_offset}, page_size={self.page_size}"
                 )
-
-                records = await self._fetch_page(
-                    client, dataset_id, offset, where, select, order
+                chunks = asyncio.Queue(maxsize=self.PREFETCH_CHUNKS)
+                task = asyncio.create_task(
+                    self._prefetch_page(chunks, client, dataset_id, next_offset, where, select, order)
                 )
+                in_flight.append((task, chunks))
+                next_offset += self.page_size
 
-                if not records:
-                    logger.info(f"Finished fetching {dataset_id}: {total_fetched} total records")
-                    break
+            try:
+                for _ in range(self.prefetch_pages):
+                    schedule_next()
+
+                while in_flight:
+                    _, chunks = in_flight.popleft()
+                    page_count = 0
+                    while (records := await chunks.get()) is not None:
+                        if isinstance(records, Exception):
+                            raise records
+                        if records:
+                            page_count += len(records)
+                            yield records
+                    self.pages_fetched += 1
+                    total_fetched += page_count
+
+                    if page_count < self.page_size:
+                        break
+
+                    schedule_next()
+            finally:
+                tasks = [task for task, _ in in_flight]
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        logger.info(f"Finished fetching {dataset_id}: {total_fetched} total records")
+
+    async def _prefetch_page(
+        self,
+        chunks: asyncio.Queue,
+        client: httpx.AsyncClient,
+        dataset_id: str,
+        offset: int,
+        where: str | None = None,
+        select: str | None = None,
+        order: str | None = None,
+    ):
+        """
+        Stream a page's decoded chunks into `chunks`, then None.
 
-                for record in records:
-                    yield record
+        A failure is put on the queue instead, to be raised by the consumer
+        when it reaches this page.
+        """
+        try:
+            async for records in self._stream_page(client, dataset_id, offset, where, select, order):
+                await chunks.put(records)
+        except Exception as e:
+            await chunks.put(e)
+            return
+        await chunks.put(None)
 
-                total_fetched += len(records)
-                offset += self.page_size
+    async def _fetch_sequential_pages(
+        self,
+        dataset_id: str,
+        where: str | None = None,
+        select: str | None = None,
+        order: str | None = None,
+        start_offset: int = 0,
+        keyset: str | None = None,
+        start_after: str | None = None,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """
+        Fetch all pages of a dataset one request at a time, streaming each page.
 
-                if len(records) < self.page_size:
-                    logger.info(f"Finished fetching {dataset_id}: {total_fetched} total records")
+        With `keyset`, each page asks for `$where <keyset> > last_seen` ordered
+        by the keyset column, so page latency stays flat however deep the
+        load goes and the last key seen is a stable resume cursor. Each
+        request depends on the previous page's last key, which is why keyset
+        pages are always fetched sequentially.
+        """
+        offset = start_offset
+        last_key = start_after
+        total_fetched = 0
+
+        if keyset:
+            # The key must be in every record to advance the cursor
+            select = self.include_fields(select, keyset)
+            order = keyset
+            offset = 0
+
+        async with httpx.AsyncClient(timeout=120.0) as client:
+            while True:
+                page_where = where
+                if keyset and last_key is not None:
+                    key_filter = f"{keyset} > '{last_key}'"
+                    page_where = f"({where}) AND {key_filter}" if where else key_filter
+                    logger.info(
+                        f"Fetching {dataset_id}: {keyset} > {last_key!r}, page_size={self.page_size}"
+                    )
+                else:
+                    logger.info(
+                        f"Fetching {dataset_id}: offset={offset}, page_size={self.page_size}"
+                    )
+
+                page_count = 0
+                async for records in self._stream_page(
+                    client, dataset_id, offset, page_where, select, order
+                ):
+                    if not records:
+                        continue
+                    page_count += len(records)
+                    if keyset:
+                        last_key = records[-1].get(keyset)
+                    yield records
+
+                self.pages_fetched += 1
+                total_fetched += page_count
+                if page_count < self.page_size or (keyset and last_key is None):
                     break
+                if not keyset:
+                    offset += self.page_size
+
+        logger.info(f"Finished fetching {dataset_id}: {total_fetched} total records")
+
+    async def fetch_all(
+        self,
+        dataset_id: str,
+        where: str | None = None,
+        select: str | None = None,
+        order: str | None = None,
+        start_offset: int = 0,
+        keyset: str | None = None,
+        start_after: str | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Fetch all records from a dataset with automatic pagination.
+
+        Yields individual records as they are fetched.
+        """
+        async for records in self.fetch_pages(
+            dataset_id, where, select, order, start_offset, keyset, start_after
+        ):
+            for record in records:
+                yield record
 
     async def get_record_count(self, dataset_id: str, where: str | None = None) -> int:
-        """Get total record count for a dataset."""
+        """
+        Get total record count for a dataset.
+
+        Counts are requested alongside loads (for progress), not as part of
+        them, so their bytes aren't added to `bytes_downloaded`.
+        """
         await self.rate_limiter.acquire()
 
         url = f"{self.base_url}/resource/{dataset_id}.json"
@@ -133,30 +619,50 @@ class SocrataClient:
 
         async with httpx.AsyncClient(timeout=30.0) as client:
             response = await client.get(url, params=params, headers=self.headers)
+            self.rate_limiter.observe(response)
             response.raise_for_status()
             result = response.json()
             return int(result[0]["count"]) if result else 0
 
+    async def get_value_at(
+        self, dataset_id: str, field: str, offset: int, where: str | None = None
+    ) -> str | None:
+        """Value of `field` in the row at `offset` when ordered by that field (e.g. a shard boundary)."""
+        params = {"$select": field, "$order": field, "$offset": offset, "$limit": 1}
+        if where:
+            params["$where"] = where
+
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            records = loads(await self._get_page_body(client, dataset_id, params))
+        return records[0].get(field) if records else None
+
     async def fetch_batch(
         self,
         dataset_id: str,
-        batch_size: int = 1000,
+        batch_size: int | Callable[[], int] = 1000,
         where: str | None = None,
         select: str | None = None,
         order: str | None = None,
         start_offset: int = 0,
+        keyset: str | None = None,
+        start_after: str | None = None,
     ) -> AsyncIterator[list[dict[str, Any]]]:
         """
         Fetch records in batches for bulk processing.
 
-        Yields lists of records for batch database inserts.
+        Yields lists of records for batch database inserts. `batch_size`
+        may be a callable, called for every batch, so the size can change
+        while fetching.
         """
-        batch = []
-        async for record in self.fetch_all(dataset_id, where, select, order, start_offset):
+        size = batch_size if callable(batch_size) else lambda: batch_size
+        batch, limit = [], size()
+        async for record in self.fetch_all(
+            dataset_id, where, select, order, start_offset, keyset, start_after
+        ):
             batch.append(record)
-            if len(batch) >= batch_size:
+            if len(batch) >= limit:
                 yield batch
-                batch = []
+                batch, limit = [], size()
 
         if batch:
             yield batch
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+from typing import Awaitable
+
+logger = logging.getLogger(__name__)
+
+
+class StageStats:
+    """Throughput counters for one stage of an extraction pipeline."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.records = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self.bytes = 0
+
+    def record(self, records: int, seconds: float, nbytes: int = 0):
+        """Count one batch of `records` (`nbytes` long) that kept the stage busy for `seconds`."""
+        self.records += records
+        self.batches += 1
+        self.busy_seconds += seconds
+        self.bytes += nbytes
+
+    @property
+    def rate(self) -> float:
+        """Records per second of busy time (time spent not waiting on a queue)."""
+        return self.records / self.busy_seconds if self.busy_seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.records} records in {self.batches} batches, "
+            f"{self.busy_seconds:.1f}s busy ({self.rate:.0f} records/s)"
+        )
+
+
+class WriteCounts:
+    """Rows a load inserted, updated, or left alone because their content was unchanged."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+
+    def add(self, inserted: int, updated: int, unchanged: int):
+        self.inserted += inserted
+        self.updated += updated
+        self.unchanged += unchanged
+
+    def __str__(self) -> str:
+        return f"{self.inserted} inserted, {self.updated} updated, {self.unchanged} unchanged"
+
+
+async def run_stages(*stages: Awaitable) -> list:
+    """
+    Run pipeline stages concurrently until all of them finish.
+
+    If any stage fails the others are cancelled (unblocking any stage stuck
+    on a full or empty queue) and the original exception is re-raised.
+    """
+    tasks = [asyncio.ensure_future(stage) for stage in stages]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
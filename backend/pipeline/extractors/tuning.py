@@ -0,0 +1,98 @@
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+
+class BatchTuner:
+    """
+    Adapts an extractor's batch size and commit interval to measured write latency.
+
+    After each batch write, the batch size moves toward the number of rows
+    that takes `target_seconds` to write, at the smoothed seconds per row
+    seen so far. It changes by at most a factor of two per batch and stays
+    within `max_batch_size`, the bind parameter limit of a multi-row INSERT
+    (`columns` per row, None for COPY loads) and `max_batch_bytes` of
+    fetched data. Narrow rows such as PLUTO's end up in large batches, wide
+    violation rows in smaller ones.
+
+    The commit interval is set so commits take at most `COMMIT_OVERHEAD` of
+    the write time, without leaving more than `max_uncommitted_seconds` of
+    writes to redo if a run is interrupted.
+    """
+
+    MIN_BATCH_SIZE = 100
+    MAX_STEP = 2.0  # Largest factor the batch size changes by per batch
+    SMOOTHING = 0.3  # Weight of the newest measurement
+    COMMIT_OVERHEAD = 0.1
+    MAX_PARAMS = 32767  # Bind parameters per statement (Postgres protocol limit)
+
+    def __init__(
+        self,
+        batch_size: int,
+        commit_interval: int,
+        target_seconds: float,
+        max_batch_size: int,
+        max_batch_bytes: int,
+        max_uncommitted_seconds: float,
+        columns: int | None = None,
+    ):
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.target_seconds = target_seconds
+        self.max_batch_size = max_batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.max_uncommitted_seconds = max_uncommitted_seconds
+        self.columns = columns
+        self.seconds_per_row: float | None = None
+        self.bytes_per_row: float | None = None
+        self.commit_seconds: float | None = None
+
+    @property
+    def limit(self) -> int:
+        """Largest batch size allowed by the size, parameter and memory limits."""
+        limit = self.max_batch_size
+        if self.columns:
+            limit = min(limit, self.MAX_PARAMS // self.columns)
+        if self.bytes_per_row:
+            limit = min(limit, int(self.max_batch_bytes / self.bytes_per_row))
+        return max(self.MIN_BATCH_SIZE, limit)
+
+    def observe_write(self, rows: int, seconds: float, nbytes: float):
+        """Record one batch of `rows` (about `nbytes` fetched) that took `seconds` to write."""
+        if rows <= 0:
+            return
+        self.seconds_per_row = self._smooth(self.seconds_per_row, seconds / rows)
+        self.bytes_per_row = self._smooth(self.bytes_per_row, nbytes / rows)
+
+        wanted = self.target_seconds / self.seconds_per_row if self.seconds_per_row else self.limit
+        wanted = min(max(wanted, self.batch_size / self.MAX_STEP), self.batch_size * self.MAX_STEP)
+        self.batch_size = int(min(max(wanted, self.MIN_BATCH_SIZE), self.limit))
+        self._tune_commit_interval()
+
+    def observe_commit(self, seconds: float):
+        """Record a commit (with any merge and checkpoint) that took `seconds`."""
+        self.commit_seconds = self._smooth(self.commit_seconds, seconds)
+        self._tune_commit_interval()
+
+    def _tune_commit_interval(self):
+        if self.seconds_per_row is None or self.commit_seconds is None:
+            return
+        batch_seconds = max(self.seconds_per_row * self.batch_size, 1e-6)
+        wanted = math.ceil(self.commit_seconds / (self.COMMIT_OVERHEAD * batch_seconds))
+        most = max(1, int(self.max_uncommitted_seconds / batch_seconds))
+        self.commit_interval = min(max(wanted, 1), most)
+
+    def _smooth(self, average: float | None, value: float) -> float:
+        if average is None:
+            return value
+        return average + self.SMOOTHING * (value - average)
+
+    def __str__(self) -> str:
+        measured = ""
+        if self.seconds_per_row is not None:
+            measured = (
+                f" ({self.seconds_per_row * self.batch_size:.2f}s per batch, "
+                f"{self.bytes_per_row or 0:.0f} bytes per row)"
+            )
+        return f"batch_size={self.batch_size}, commit_interval={self.commit_interval}{measured}"
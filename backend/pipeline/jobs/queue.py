@@ -0,0 +1,161 @@
+"""
+Queue of admin-triggered pipeline jobs.
+
+The API process only calls `submit_job` and reports on jobs; it never runs
+them. Worker processes (`python -m pipeline.runner --worker`, see
+`pipeline.runner.run_worker`) claim queued jobs with SELECT ... FOR UPDATE
+SKIP LOCKED and run them with their own engine and connection pool, so a
+multi-hour refresh doesn't compete with user requests for the API's event
+loop or connections. A running job whose worker stops heartbeating is
+claimed again; extraction resumes from its checkpoints.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.models.pipeline import PipelineJob
+
+logger = logging.getLogger(__name__)
+
+EXTRACT = "extract"
+ENTITY_RESOLUTION = "entity_resolution"
+SCORING = "scoring"
+KINDS = (EXTRACT, ENTITY_RESOLUTION, SCORING)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+async def submit_job(
+    session: AsyncSession, kind: str, dataset: str | None = None, full_refresh: bool = False
+) -> tuple[PipelineJob, bool]:
+    """
+    Queue a job, unless the same job is already queued or running.
+
+    Returns the job and whether it was newly queued.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown job kind: {kind}. Available: {list(KINDS)}")
+
+    result = await session.execute(
+        select(PipelineJob)
+        .where(
+            PipelineJob.kind == kind,
+            PipelineJob.dataset.is_(None) if dataset is None else PipelineJob.dataset == dataset,
+            PipelineJob.full_refresh == full_refresh,
+            PipelineJob.status.in_([QUEUED, RUNNING]),
+        )
+        .order_by(PipelineJob.id)
+        .limit(1)
+    )
+    existing = result.scalar_one_or_none()
+    if existing:
+        return existing, False
+
+    job = PipelineJob(kind=kind, dataset=dataset, full_refresh=full_refresh, status=QUEUED)
+    session.add(job)
+    await session.commit()
+    logger.info(f"Queued pipeline job {job.id}: {describe_job(job)}")
+    return job, True
+
+
+async def claim_job(worker: str) -> PipelineJob | None:
+    """
+    Claim the oldest job ready to run, or None if there is none.
+
+    Queued jobs are claimable, and so are running jobs without a recent
+    heartbeat (their worker died) that still have attempts left.
+    """
+    settings = get_settings()
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=settings.pipeline_shard_timeout_seconds)
+    claimable = or_(
+        PipelineJob.status == QUEUED,
+        and_(
+            PipelineJob.status == RUNNING,
+            PipelineJob.heartbeat_at < stale,
+            PipelineJob.attempts < settings.pipeline_shard_attempts,
+        ),
+    )
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(PipelineJob)
+            .where(claimable)
+            .order_by(PipelineJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = result.scalar_one_or_none()
+        if job is None:
+            return None
+
+        job.status = RUNNING
+        job.worker = worker
+        job.attempts += 1
+        job.started_at = now
+        job.heartbeat_at = now
+        await session.commit()
+    return job
+
+
+async def heartbeat_job(job_id: int):
+    """Record that the job's worker is still running it."""
+    await _update_job(job_id, heartbeat_at=datetime.utcnow())
+
+
+async def finish_job(job_id: int):
+    """Mark a job succeeded."""
+    await _update_job(job_id, status=SUCCEEDED, finished_at=datetime.utcnow())
+
+
+async def fail_job(job_id: int, error: str):
+    """Mark a job failed. Failed jobs are not retried; trigger them again instead."""
+    await _update_job(job_id, status=FAILED, error=error, finished_at=datetime.utcnow())
+
+
+async def recent_jobs(session: AsyncSession, limit: int = 20) -> list[dict]:
+    """The `limit` most recently queued jobs, newest first."""
+    result = await session.execute(select(PipelineJob).order_by(PipelineJob.id.desc()).limit(limit))
+    return [job_status(job) for job in result.scalars()]
+
+
+def describe_job(job: PipelineJob) -> str:
+    """What a job runs, e.g. "extract hpd_violations (full refresh)"."""
+    description = job.kind
+    if job.kind == EXTRACT:
+        description += f" {job.dataset or 'all'}"
+    if job.full_refresh:
+        description += " (full refresh)"
+    return description
+
+
+def job_status(job: PipelineJob) -> dict:
+    """A job as reported by the admin API."""
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "dataset": job.dataset,
+        "full_refresh": job.full_refresh,
+        "status": job.status,
+        "attempts": job.attempts,
+        "worker": job.worker,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "heartbeat_at": job.heartbeat_at,
+        "finished_at": job.finished_at,
+        "error": job.error,
+    }
+
+
+async def _update_job(job_id: int, **values):
+    async with AsyncSessionLocal() as session:
+        await session.execute(update(PipelineJob).where(PipelineJob.id == job_id).values(**values))
+        await session.commit()
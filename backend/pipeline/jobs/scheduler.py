@@ -1,10 +1,12 @@
 import asyncio
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 
+from app.config import get_settings
+from pipeline.changes import changed_bbls, prune_changes
 from pipeline.runner import run_all, run_entity_resolution, run_scoring
 
 logging.basicConfig(
@@ -18,10 +20,13 @@ async def nightly_refresh():
     """Run nightly data refresh pipeline."""
     logger.info("Starting nightly data refresh")
     start = datetime.now()
+    loaded_since = datetime.utcnow()
 
     try:
-        # Run all extractors
-        await run_all(full_refresh=False)
+        # Run all extractors, fetching only rows changed since the last run
+        await run_all(full_refresh=False, incremental=True)
+        changed = await changed_bbls(since=loaded_since)
+        logger.info(f"{len(changed)} buildings changed")
 
         # Run entity resolution to update portfolios
         await run_entity_resolution()
@@ -29,6 +34,9 @@ async def nightly_refresh():
         # Recompute all scores
         await run_scoring()
 
+        retention = timedelta(days=get_settings().pipeline_change_retention_days)
+        await prune_changes(datetime.utcnow() - retention)
+
         elapsed = (datetime.now() - start).total_seconds()
         logger.info(f"Nightly refresh complete in {elapsed:.1f}s")
 
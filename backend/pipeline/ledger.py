@@ -0,0 +1,247 @@
+"""
+Ledger of pipeline runs, with live progress.
+
+`run_extractor`, `run_extractor_group` and `run_all` record every run in
+`pipeline_runs` through `track_run`: dataset, start and end, rows, bytes,
+status and error. While a load runs, its row is refreshed every
+`pipeline_progress_seconds` with rows loaded and the current rate, pages
+fetched, queue depths and how far the fetch has got out of the records
+Socrata counts for it, so `pipeline_status` (GET /admin/pipeline/status)
+can report progress and an ETA from any process. A process that is killed
+can't record how its runs ended; a running row that has gone
+`STALE_INTERVALS` updates without one is reported as abandoned. Comparing
+finished runs across nights shows throughput regressions.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Awaitable, TypeVar
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.models.pipeline import PipelineRun
+from pipeline.extractors.base import BaseExtractor
+
+logger = logging.getLogger(__name__)
+
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+ABANDONED = "abandoned"  # Reported for running rows no longer updated; never stored
+
+# Missed progress updates after which a running row counts as abandoned
+STALE_INTERVALS = 3
+
+T = TypeVar("T")
+
+# Ledger id of the run_all run in progress, inherited by the runs it starts
+_parent_run: ContextVar[int | None] = ContextVar("pipeline_parent_run", default=None)
+
+
+async def track_run(
+    dataset: str,
+    load: Awaitable[T],
+    extractors: list[BaseExtractor] | None = None,
+    full_refresh: bool = False,
+) -> T:
+    """
+    Record `load` in the ledger while awaiting it, and return its result.
+
+    With `extractors` (the ones `load` runs), their progress is reported
+    while it runs. Without, the run is a parent (run_all): runs started
+    while it is awaited are recorded as part of it, and its row is only
+    kept fresh.
+    """
+    ledger_id = await start_run(dataset, full_refresh)
+    token = _parent_run.set(ledger_id) if extractors is None else None
+    stop = asyncio.Event()
+    reporter = asyncio.create_task(_report_progress(ledger_id, extractors, stop))
+    started = time.perf_counter()
+    try:
+        result = await load
+    except BaseException as e:
+        await _stop_reporting(reporter, stop)
+        await finish_run(ledger_id, FAILED, extractors, time.perf_counter() - started, str(e) or repr(e))
+        raise
+    finally:
+        if token:
+            _parent_run.reset(token)
+    await _stop_reporting(reporter, stop)
+    await finish_run(ledger_id, SUCCEEDED, extractors, time.perf_counter() - started)
+    return result
+
+
+async def _stop_reporting(reporter: asyncio.Task, stop: asyncio.Event):
+    """
+    Stop a run's progress reporter and wait for it, so no update lands after the final one.
+
+    It stops between updates rather than being cancelled during one, which
+    would leave its connection in an unknown state.
+    """
+    stop.set()
+    await reporter
+
+
+async def start_run(dataset: str, full_refresh: bool = False) -> int:
+    """Record the start of a run. Returns its ledger id."""
+    async with AsyncSessionLocal() as session:
+        run = PipelineRun(
+            parent_id=_parent_run.get(),
+            dataset=dataset,
+            full_refresh=full_refresh,
+            status=RUNNING,
+            started_at=datetime.utcnow(),
+            updated_at=datetime.utcnow(),
+        )
+        session.add(run)
+        await session.commit()
+    return run.id
+
+
+async def finish_run(
+    ledger_id: int,
+    status: str,
+    extractors: list[BaseExtractor] | None = None,
+    seconds: float | None = None,
+    error: str | None = None,
+):
+    """Record the end of a run, with the extractors' final counts."""
+    now = datetime.utcnow()
+    values = {"status": status, "error": error, "finished_at": now, "updated_at": now}
+    if extractors:
+        values.update(_progress(extractors))
+        values.update(raw_queued=None, load_queued=None, estimated_finish_at=None)
+        if seconds:
+            values["rows_per_second"] = values["rows_loaded"] / seconds
+    await _update_run(ledger_id, **values)
+
+
+async def pipeline_status(session: AsyncSession, limit: int = 20) -> dict:
+    """
+    Runs in progress, with an ETA each, and the `limit` most recently started ones.
+
+    Abandoned runs (see `_describe`) are left out of the runs in progress.
+    """
+    running = await session.execute(
+        select(PipelineRun).where(PipelineRun.status == RUNNING).order_by(PipelineRun.id)
+    )
+    recent = await session.execute(select(PipelineRun).order_by(PipelineRun.id.desc()).limit(limit))
+    return {
+        "running": [run for run in map(_describe, running.scalars()) if run["status"] == RUNNING],
+        "recent": [_describe(run) for run in recent.scalars()],
+    }
+
+
+async def _report_progress(ledger_id: int, extractors: list[BaseExtractor] | None, stop: asyncio.Event):
+    """Refresh the run's progress (only its updated_at without `extractors`) until `stop` is set."""
+    interval = get_settings().pipeline_progress_seconds
+    expected = None
+    last = (time.perf_counter(), 0, None)  # Time, rows loaded and rows fetched at the last update
+    while True:
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(stop.wait(), interval)
+        if stop.is_set():
+            return
+        try:
+            if not extractors:
+                await _update_run(ledger_id, updated_at=datetime.utcnow())
+                continue
+            lead = extractors[0]
+            # Counted (one Socrata request) once fetching, when the filter and any watermark are
+            # known; a replay stays off the network and reports no ETA
+            if expected is None and lead.fetch_stats.batches and not lead.client.replay:
+                expected = await lead.client.get_record_count(lead.dataset_id, lead.fetching_where)
+            values = _progress(extractors)
+            now = time.perf_counter()
+            last_time, last_loaded, last_fetched = last
+            values["rows_per_second"] = (values["rows_loaded"] - last_loaded) / (now - last_time)
+
+            # The fetch paces the load, so extrapolate its recent rate over what is left
+            finish_at = None
+            fetched = values["fetched_rows"]
+            if expected is not None and last_fetched is not None and fetched > last_fetched:
+                fetch_rate = (fetched - last_fetched) / (now - last_time)
+                finish_at = datetime.utcnow() + timedelta(seconds=max(0, expected - fetched) / fetch_rate)
+            last = (now, values["rows_loaded"], fetched)
+
+            await _update_run(
+                ledger_id,
+                expected_rows=expected,
+                estimated_finish_at=finish_at,
+                raw_queued=sum(e.raw_queue.qsize() for e in extractors if e.raw_queue),
+                load_queued=sum(e.load_queue.qsize() for e in extractors if e.load_queue),
+                updated_at=datetime.utcnow(),
+                **values,
+            )
+        except Exception as e:
+            # Progress is informational; never let it stop the load
+            logger.warning(f"Could not record progress of run {ledger_id}: {e}")
+
+
+def _progress(extractors: list[BaseExtractor]) -> dict:
+    """Counters shared by every progress update."""
+    lead = extractors[0]
+    return {
+        "run_id": lead.run_id,  # Ties the run to its checkpoints (see check_no_running_full_refresh)
+        "rows_loaded": sum(e.records_loaded for e in extractors),
+        "bytes_downloaded": lead.client.bytes_downloaded,
+        "pages_fetched": lead.client.pages_fetched,
+        "fetched_rows": lead.records_fetched,
+    }
+
+
+def _describe(run: PipelineRun) -> dict:
+    """
+    A run as reported by the status endpoint, with an ETA while it is running.
+
+    A running row not updated for `STALE_INTERVALS` progress intervals
+    belongs to a process that died; it is reported as abandoned, ending
+    at its last update.
+    """
+    now = datetime.utcnow()
+    status, end = run.status, run.finished_at or now
+    stale_after = timedelta(seconds=STALE_INTERVALS * get_settings().pipeline_progress_seconds)
+    if status == RUNNING and run.updated_at and run.updated_at < now - stale_after:
+        status, end = ABANDONED, run.updated_at
+    eta = None
+    if status == RUNNING and run.estimated_finish_at:
+        eta = max(0.0, (run.estimated_finish_at - now).total_seconds())
+    return {
+        "id": run.id,
+        "parent_id": run.parent_id,
+        "run_id": run.run_id,
+        "dataset": run.dataset,
+        "full_refresh": run.full_refresh,
+        "status": status,
+        "started_at": run.started_at,
+        "finished_at": run.finished_at,
+        "updated_at": run.updated_at,
+        "elapsed_seconds": (end - run.started_at).total_seconds() if run.started_at else None,
+        "rows_loaded": run.rows_loaded,
+        "rows_per_second": run.rows_per_second,
+        "bytes_downloaded": run.bytes_downloaded,
+        "pages_fetched": run.pages_fetched,
+        "fetched_rows": run.fetched_rows,
+        "expected_rows": run.expected_rows,
+        "percent_fetched": (
+            round(100 * min(1, run.fetched_rows / run.expected_rows), 1)
+            if run.expected_rows and run.fetched_rows is not None
+            else None
+        ),
+        "queued_batches": {"raw": run.raw_queued, "transformed": run.load_queued},
+        "eta_seconds": eta,
+        "error": run.error,
+    }
+
+
+async def _update_run(ledger_id: int, **values):
+    async with AsyncSessionLocal() as session:
+        await session.execute(update(PipelineRun).where(PipelineRun.id == ledger_id).values(**values))
+        await session.commit()
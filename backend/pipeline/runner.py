@@ -1,9 +1,15 @@
 import asyncio
 import argparse
 import logging
+import os
+import socket
 from datetime import datetime
+from typing import Awaitable, Callable, TypeVar
+from uuid import uuid4
 
+from app.config import get_settings
 from pipeline.extractors import (
+    extract_and_load_shared,
     HPDViolationsExtractor,
     HPDRegistrationsExtractor,
     Complaints311Extractor,
@@ -11,10 +17,22 @@ from pipeline.extractors import (
     EvictionsExtractor,
     PLUTOExtractor,
 )
+from pipeline.extractors.archive import configure_archive
 from pipeline.extractors.hpd_registrations import (
     RegistrationContactsExtractor,
     BuildingsFromRegistrationsExtractor,
 )
+from pipeline.extractors.stages import run_stages
+from pipeline.jobs import queue
+from pipeline.ledger import track_run
+from pipeline.shards import (
+    claim_shard,
+    enqueue_shards,
+    fail_shard,
+    finish_shard,
+    heartbeat,
+    plan_shards,
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -22,6 +40,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 # Available datasets and their extractors
 EXTRACTORS = {
     "buildings": BuildingsFromRegistrationsExtractor,
@@ -46,44 +66,296 @@ LOAD_ORDER = [
     "evictions",
 ]
 
+# Datasets that must finish loading before another may start. Anything not
+# listed here is independent and can run concurrently in run_all.
+DEPENDENCIES = {
+    "pluto": ["buildings"],  # PLUTO only updates existing buildings
+    "registration_contacts": ["hpd_registrations"],  # FK to hpd_registrations
+}
+
+
+async def run_extractor(
+    name: str,
+    full_refresh: bool = False,
+    start_offset: int = 0,
+    start_after: str | None = None,
+    incremental: bool = True,
+    resume: bool = True,
+) -> int:
+    """
+    Run a single extractor with optional offset or keyset cursor for resumption.
 
-async def run_extractor(name: str, full_refresh: bool = False, start_offset: int = 0) -> int:
-    """Run a single extractor with optional offset for resumption."""
+    Unless `incremental` is False, non-full-refresh runs only fetch rows
+    changed since the extractor's last recorded watermark. Unless `resume`
+    is False (or a start position is given), a previous run that never
+    finished is continued from its last checkpoint.
+    """
     if name not in EXTRACTORS:
         raise ValueError(f"Unknown dataset: {name}. Available: {list(EXTRACTORS.keys())}")
 
     extractor_class = EXTRACTORS[name]
     extractor = extractor_class()
 
-    logger.info(f"Starting extractor: {name}" + (f" from offset {start_offset}" if start_offset else ""))
+    position = f" after {start_after}" if start_after else (f" from offset {start_offset}" if start_offset else "")
+    logger.info(f"Starting extractor: {name}{position}")
     start = datetime.now()
 
-    count = await extractor.extract_and_load(full_refresh=full_refresh, start_offset=start_offset)
+    count = await track_run(
+        name,
+        extractor.extract_and_load(
+            full_refresh=full_refresh,
+            start_offset=start_offset,
+            start_after=start_after,
+            incremental=incremental,
+            resume=resume,
+        ),
+        [extractor],
+        full_refresh,
+    )
 
     elapsed = (datetime.now() - start).total_seconds()
-    logger.info(f"Completed {name}: {count} records in {elapsed:.1f}s")
+    downloaded_mb = extractor.client.bytes_downloaded / 1_000_000
+    logger.info(f"Completed {name}: {count} records, {downloaded_mb:.1f} MB downloaded in {elapsed:.1f}s")
 
     return count
 
 
-async def run_all(full_refresh: bool = False):
-    """Run all extractors in order."""
-    logger.info("Starting full data pipeline")
+async def run_extractor_group(
+    names: list[str],
+    full_refresh: bool = False,
+    incremental: bool = True,
+    resume: bool = True,
+) -> int:
+    """
+    Run extractors that consume the same Socrata dataset in one pass.
+
+    The dataset is fetched once and every extractor transforms and loads it
+    into its own table. A single-name group is just `run_extractor`.
+    """
+    if len(names) == 1:
+        return await run_extractor(
+            names[0], full_refresh=full_refresh, incremental=incremental, resume=resume
+        )
+
+    extractors = [EXTRACTORS[name]() for name in names]
+    logger.info(f"Starting extractors with a shared fetch: {', '.join(names)}")
     start = datetime.now()
-    total = 0
 
-    for name in LOAD_ORDER:
-        try:
-            count = await run_extractor(name, full_refresh=full_refresh)
-            total += count
-        except Exception as e:
-            logger.error(f"Error in {name}: {e}")
-            raise
+    counts = await track_run(
+        ",".join(names),
+        extract_and_load_shared(
+            extractors, full_refresh=full_refresh, incremental=incremental, resume=resume
+        ),
+        extractors,
+        full_refresh,
+    )
+
+    elapsed = (datetime.now() - start).total_seconds()
+    downloaded_mb = extractors[0].client.bytes_downloaded / 1_000_000
+    logger.info(f"Completed {', '.join(names)}: {downloaded_mb:.1f} MB downloaded once in {elapsed:.1f}s")
+    for name, count in zip(names, counts):
+        logger.info(f"Completed {name}: {count} records in {elapsed:.1f}s")
+    return sum(counts)
+
+
+def group_shared_fetches(names: list[str]) -> list[list[str]]:
+    """
+    Group datasets whose extractors can be fed from a single Socrata fetch.
+
+    Datasets that depend on one another are never grouped, since a group
+    loads all of its members at the same time.
+    """
+    extractors = {name: EXTRACTORS[name]() for name in names}
+    groups: list[list[str]] = []
+    for name in names:
+        for group in groups:
+            related = any(
+                member in DEPENDENCIES.get(name, []) or name in DEPENDENCIES.get(member, [])
+                for member in group
+            )
+            if not related and all(extractors[member].can_share_fetch(extractors[name]) for member in group):
+                group.append(name)
+                break
+        else:
+            groups.append([name])
+    return groups
+
+
+async def run_all(
+    full_refresh: bool = False,
+    incremental: bool = True,
+    max_parallel: int | None = None,
+    resume: bool = True,
+):
+    """
+    Run all extractors, respecting DEPENDENCIES.
+
+    Extractors that share a Socrata dataset run as one group with a single
+    fetch. Independent groups run concurrently, at most `max_parallel` at a
+    time (default: `pipeline_max_parallel`). Unfinished runs are resumed
+    unless `resume` is False. All Socrata requests share one
+    process-wide rate limiter. If any group fails, the rest are cancelled
+    and the error is re-raised.
+    """
+    max_parallel = max_parallel or get_settings().pipeline_max_parallel
+    logger.info(f"Starting full data pipeline (max {max_parallel} extractors in parallel)")
+    start = datetime.now()
+    slots = asyncio.Semaphore(max_parallel)
+    tasks: dict[str, asyncio.Task] = {}
+
+    async def run_node(group: list[str]) -> int:
+        dependencies = {dep for name in group for dep in DEPENDENCIES.get(name, [])}
+        for dependency in dependencies:
+            await tasks[dependency]
+        async with slots:
+            try:
+                return await run_extractor_group(
+                    group, full_refresh=full_refresh, incremental=incremental, resume=resume
+                )
+            except Exception as e:
+                logger.error(f"Error in {', '.join(group)}: {e}")
+                raise
+
+    async def run_groups() -> list[int]:
+        # LOAD_ORDER lists dependencies first, so every task awaited above exists.
+        # Tasks are created here, inside the ledger's run_all run, so theirs are part of it.
+        group_tasks = []
+        for group in group_shared_fetches(LOAD_ORDER):
+            task = asyncio.create_task(run_node(group))
+            group_tasks.append(task)
+            for name in group:
+                tasks[name] = task
+        return await run_stages(*group_tasks)
+
+    counts = await track_run("all", run_groups(), full_refresh=full_refresh)
+    total = sum(counts)
 
     elapsed = (datetime.now() - start).total_seconds()
     logger.info(f"Pipeline complete: {total} total records in {elapsed:.1f}s")
 
 
+async def enqueue_job(names: list[str], shards: int) -> str:
+    """
+    Queue a sharded job loading `names`, each split into about `shards` shards.
+
+    Datasets that can share a fetch are sharded together. Dependent datasets
+    get a later stage, so workers only load them once every shard of their
+    dependencies is done. Returns the job id.
+    """
+    job_id = uuid4().hex
+
+    def stage(name: str) -> int:
+        dependencies = [dep for dep in DEPENDENCIES.get(name, []) if dep in names]
+        return 1 + max(stage(dep) for dep in dependencies) if dependencies else 0
+
+    for group in group_shared_fetches([name for name in LOAD_ORDER if name in names]):
+        clauses = await plan_shards(EXTRACTORS[group[0]](), shards)
+        await enqueue_shards(job_id, max(stage(name) for name in group), group, clauses)
+    logger.info(f"Queued job {job_id}; start workers with: python -m pipeline.runner --worker")
+    return job_id
+
+
+async def run_shard(shard) -> int:
+    """Load one claimed shard, heartbeating while it runs. Returns the records loaded."""
+    names = shard.datasets.split(",")
+    extractors = [EXTRACTORS[name]() for name in names]
+    for extractor in extractors:
+        extractor.shard_id = shard.id
+        extractor.shard_clause = shard.shard_where
+    logger.info(f"Loading shard {shard.id} of {', '.join(names)}: {shard.shard_where or 'all rows'}")
+
+    # A retried shard resumes from its own checkpoint
+    counts = await _with_heartbeat(
+        track_run(
+            f"{shard.datasets}#shard{shard.id}",
+            extract_and_load_shared(extractors, incremental=False, resume=True),
+            extractors,
+        ),
+        lambda: heartbeat(shard.id),
+    )
+    return sum(counts)
+
+
+async def run_job(job):
+    """Run a job queued through the admin API (see pipeline.jobs.queue), heartbeating while it runs."""
+    logger.info(f"Running job {job.id}: {queue.describe_job(job)}")
+    if job.kind == queue.EXTRACT and job.dataset:
+        work = run_extractor(job.dataset, full_refresh=job.full_refresh)
+    elif job.kind == queue.EXTRACT:
+        work = run_all(full_refresh=job.full_refresh)
+    elif job.kind == queue.ENTITY_RESOLUTION:
+        work = run_entity_resolution()
+    elif job.kind == queue.SCORING:
+        work = run_scoring()
+    else:
+        raise ValueError(f"Unknown job kind: {job.kind}")
+    await _with_heartbeat(work, lambda: queue.heartbeat_job(job.id))
+
+
+async def run_worker(worker: str | None = None, exit_when_idle: bool = False) -> int:
+    """
+    Run queued jobs and load queued shards until stopped.
+
+    Jobs triggered through the admin API (see pipeline.jobs.queue) are
+    claimed first, then shards of distributed extraction jobs (see
+    pipeline.shards). The worker runs in its own process, with its own
+    database engine and pool (`database_pool_size`), apart from the API.
+    With `exit_when_idle`, return once nothing is ready instead of polling
+    every `pipeline_worker_poll_seconds`. A failed shard is recorded and
+    retried later by any worker. Returns the number of jobs and shards done.
+    """
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Worker {worker} started")
+    done = 0
+    while True:
+        job = await queue.claim_job(worker)
+        if job is not None:
+            try:
+                await run_job(job)
+            except Exception as e:
+                logger.error(f"Job {job.id} failed: {e}")
+                await queue.fail_job(job.id, str(e))
+            else:
+                await queue.finish_job(job.id)
+                done += 1
+                logger.info(f"Job {job.id} done")
+            continue
+
+        shard = await claim_shard(worker)
+        if shard is None:
+            if exit_when_idle:
+                logger.info(f"Worker {worker} idle after {done} jobs and shards")
+                return done
+            await asyncio.sleep(get_settings().pipeline_worker_poll_seconds)
+            continue
+
+        try:
+            count = await run_shard(shard)
+        except Exception as e:
+            logger.error(f"Shard {shard.id} failed (attempt {shard.attempts}): {e}")
+            await fail_shard(shard.id, str(e))
+        else:
+            await finish_shard(shard.id, count)
+            done += 1
+            logger.info(f"Shard {shard.id} done: {count} records")
+
+
+async def _with_heartbeat(work: Awaitable[T], beat: Callable[[], Awaitable]) -> T:
+    """Await `work`, calling `beat` every quarter of `pipeline_shard_timeout_seconds` meanwhile."""
+
+    async def keep_alive():
+        interval = get_settings().pipeline_shard_timeout_seconds / 4
+        while True:
+            await asyncio.sleep(interval)
+            await beat()
+
+    task = asyncio.create_task(keep_alive())
+    try:
+        return await work
+    finally:
+        task.cancel()
+
+
 async def run_entity_resolution():
     """Run entity resolution to group owners into portfolios."""
     from app.services.entity_resolution import EntityResolutionService
@@ -113,7 +385,41 @@ def main():
         "--full-refresh",
         "-f",
         action="store_true",
-        help="Truncate and reload instead of upsert",
+        help="Reload into shadow tables and swap them in instead of upsert",
+    )
+    parser.add_argument(
+        "--no-incremental",
+        action="store_true",
+        help="Re-download the whole dataset instead of only rows changed since the last watermark",
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Start afresh instead of resuming an unfinished run from its last checkpoint",
+    )
+    parser.add_argument(
+        "--max-parallel",
+        "-p",
+        type=int,
+        default=None,
+        help="Maximum extractors to run concurrently with --dataset all (default: PIPELINE_MAX_PARALLEL)",
+    )
+    parser.add_argument(
+        "--archive-dir",
+        default=None,
+        help="Archive raw Socrata pages in this directory (default: SOCRATA_ARCHIVE_DIR)",
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Rebuild tables from the page archive without touching the network "
+        "(replays non-incremental runs)",
+    )
+    parser.add_argument(
+        "--auto-tune",
+        action="store_true",
+        help="Adapt batch sizes and commit intervals to measured write latency and log "
+        "the values picked per dataset",
     )
     parser.add_argument(
         "--entity-resolution",
@@ -134,21 +440,71 @@ def main():
         default=0,
         help="Start offset for resuming interrupted loads (e.g., 7600000)",
     )
+    parser.add_argument(
+        "--after",
+        "-a",
+        default=None,
+        help="Keyset cursor for resuming interrupted keyset-paged loads (e.g., row-abcd.efgh)",
+    )
     parser.add_argument(
         "--skip-extraction",
         action="store_true",
         help="Skip data extraction, only run entity resolution and/or scoring",
     )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=None,
+        help="Queue the dataset(s) as a job of this many shards per dataset for --worker "
+        "processes instead of extracting here",
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Run as a worker running queued admin jobs and loading queued shards until stopped",
+    )
+    parser.add_argument(
+        "--exit-when-idle",
+        action="store_true",
+        help="With --worker, exit once no job or shard is ready",
+    )
 
     args = parser.parse_args()
 
+    if args.archive_dir or args.replay:
+        configure_archive(args.archive_dir or get_settings().socrata_archive_dir, replay=args.replay)
+    if args.auto_tune:
+        get_settings().pipeline_auto_tune = True
+    # Incremental queries depend on the current watermark, so replays fetch in full
+    incremental = not (args.no_incremental or args.replay)
+
     async def execute():
+        if args.worker:
+            await run_worker(exit_when_idle=args.exit_when_idle)
+            return
+        if args.shards:
+            names = LOAD_ORDER if args.dataset == "all" else [args.dataset]
+            await enqueue_job(names, args.shards)
+            return
+
         # Skip extraction if --skip-extraction flag is set
         if not args.skip_extraction:
             if args.dataset == "all":
-                await run_all(full_refresh=args.full_refresh)
+                await run_all(
+                    full_refresh=args.full_refresh,
+                    incremental=incremental,
+                    max_parallel=args.max_parallel,
+                    resume=not args.no_resume,
+                )
             else:
-                await run_extractor(args.dataset, full_refresh=args.full_refresh, start_offset=args.offset)
+                await run_extractor(
+                    args.dataset,
+                    full_refresh=args.full_refresh,
+                    start_offset=args.offset,
+                    start_after=args.after,
+                    incremental=incremental,
+                    resume=not args.no_resume,
+                )
 
         if args.entity_resolution:
             await run_entity_resolution()
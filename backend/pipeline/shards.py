@@ -0,0 +1,176 @@
+"""
+Distributed extraction through a Postgres work queue.
+
+A sharded job splits datasets into shards: rows of `pipeline_shards` that
+each select part of a dataset with a SoQL filter (`plan_shards`). Any
+number of `python -m pipeline.runner --worker` processes, on any host that
+can reach the database, claim shards with SELECT ... FOR UPDATE SKIP
+LOCKED, load them and mark them done (see `pipeline.runner.run_worker`),
+so ingestion scales out without a message broker.
+
+Shards upsert into the live tables: a shard covers only part of a
+dataset, so it can't replace a table (full refresh) or advance the
+incremental watermark.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, exists, func, or_, select, update
+from sqlalchemy.orm import aliased
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.models.pipeline import PipelineShard
+from pipeline.extractors.base import BaseExtractor
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Socrata's row id: every dataset has it, and it orders rows stably
+SHARD_FIELD = ":id"
+
+
+async def plan_shards(extractor: BaseExtractor, shards: int) -> list[str | None]:
+    """
+    Split the extractor's dataset into about `shards` ranges of similar size.
+
+    The boundaries are the :id values at evenly spaced offsets, so every
+    shard is a range filter such as `:id >= 'a' AND :id < 'b'`. Returns a
+    single unfiltered shard (None) if the dataset is too small to split.
+    """
+    client = extractor.client
+    where = extractor.where_clause
+    total = await client.get_record_count(extractor.dataset_id, where)
+    if shards <= 1 or total < shards:
+        return [None]
+
+    boundaries = []
+    for n in range(1, shards):
+        value = await client.get_value_at(extractor.dataset_id, SHARD_FIELD, n * total // shards, where)
+        if value and value not in boundaries:
+            boundaries.append(value.replace("'", "''"))
+    if not boundaries:
+        return [None]
+
+    clauses = [f"{SHARD_FIELD} < '{boundaries[0]}'"]
+    clauses.extend(
+        f"{SHARD_FIELD} >= '{low}' AND {SHARD_FIELD} < '{high}'"
+        for low, high in zip(boundaries, boundaries[1:])
+    )
+    clauses.append(f"{SHARD_FIELD} >= '{boundaries[-1]}'")
+    return clauses
+
+
+async def enqueue_shards(
+    job_id: str, stage: int, datasets: list[str], clauses: list[str | None]
+) -> list[int]:
+    """Add one pending shard per SoQL filter in `clauses`. Returns the shard ids."""
+    async with AsyncSessionLocal() as session:
+        shards = [
+            PipelineShard(
+                job_id=job_id,
+                stage=stage,
+                datasets=",".join(datasets),
+                shard_where=clause,
+                status=PENDING,
+            )
+            for clause in clauses
+        ]
+        session.add_all(shards)
+        await session.commit()
+    logger.info(f"Queued {len(shards)} shards of {', '.join(datasets)} for job {job_id}")
+    return [shard.id for shard in shards]
+
+
+async def claim_shard(worker: str) -> PipelineShard | None:
+    """
+    Claim the next shard ready to load, or None if there is none.
+
+    Pending shards are claimable, and so are failed shards and running
+    shards without a recent heartbeat (their worker died) that still have
+    attempts left, once every shard of their job at an earlier stage is
+    done. SKIP LOCKED lets concurrent workers claim different shards
+    without waiting on each other.
+    """
+    settings = get_settings()
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=settings.pipeline_shard_timeout_seconds)
+
+    earlier = aliased(PipelineShard)
+    blocked = exists().where(
+        earlier.job_id == PipelineShard.job_id,
+        earlier.stage < PipelineShard.stage,
+        earlier.status != DONE,
+    )
+    claimable = or_(
+        PipelineShard.status == PENDING,
+        and_(
+            PipelineShard.attempts < settings.pipeline_shard_attempts,
+            or_(
+                PipelineShard.status == FAILED,
+                and_(PipelineShard.status == RUNNING, PipelineShard.heartbeat_at < stale),
+            ),
+        ),
+    )
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(PipelineShard)
+            .where(claimable, ~blocked)
+            .order_by(PipelineShard.id)
+            .limit(1)
+            .with_for_update(skip_locked=True, of=PipelineShard)
+        )
+        shard = result.scalar_one_or_none()
+        if shard is None:
+            return None
+
+        shard.status = RUNNING
+        shard.worker = worker
+        shard.attempts += 1
+        shard.error = None
+        shard.claimed_at = now
+        shard.heartbeat_at = now
+        await session.commit()
+    return shard
+
+
+async def heartbeat(shard_id: int):
+    """Record that the shard's worker is still loading it."""
+    await _update_shard(shard_id, heartbeat_at=datetime.utcnow())
+
+
+async def finish_shard(shard_id: int, rows_loaded: int):
+    """Mark a shard done."""
+    await _update_shard(
+        shard_id, status=DONE, rows_loaded=rows_loaded, finished_at=datetime.utcnow()
+    )
+
+
+async def fail_shard(shard_id: int, error: str):
+    """Mark a shard failed; it is retried while it has attempts left."""
+    await _update_shard(shard_id, status=FAILED, error=error, finished_at=datetime.utcnow())
+
+
+async def job_progress(job_id: str) -> dict[str, int]:
+    """Number of the job's shards in each status."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(PipelineShard.status, func.count())
+            .where(PipelineShard.job_id == job_id)
+            .group_by(PipelineShard.status)
+        )
+        return dict(result.all())
+
+
+async def _update_shard(shard_id: int, **values):
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(PipelineShard).where(PipelineShard.id == shard_id).values(**values)
+        )
+        await session.commit()
@@ -0,0 +1,60 @@
+"""Tests for the raw Socrata page archive."""
+
+import json
+
+import pytest
+
+from pipeline.extractors.archive import ArchiveMiss, PageArchive
+from pipeline.extractors.socrata import SocrataClient
+
+
+def test_archive_roundtrip(tmp_path):
+    """Test a saved page is found again by dataset, query and offset."""
+    archive = PageArchive(tmp_path)
+    params = {"$limit": 2, "$offset": 2, "$where": "bbl IS NOT NULL"}
+    body = json.dumps([{"id": "3"}, {"id": "4"}]).encode()
+
+    archive.save_page("test-ds", params, body, records=2)
+
+    assert PageArchive(tmp_path).load_page("test-ds", dict(params)) == body
+    with pytest.raises(ArchiveMiss):
+        archive.load_page("test-ds", {**params, "$offset": 4})
+
+
+def test_archive_deduplicates_identical_pages(tmp_path):
+    """Test identical bodies are stored once."""
+    archive = PageArchive(tmp_path)
+    body = b"[]"
+
+    archive.save_page("test-ds", {"$offset": 0}, body, records=0)
+    archive.save_page("other-ds", {"$offset": 0}, body, records=0)
+
+    assert len(list((tmp_path / "objects").rglob("*.json.gz"))) == 1
+
+
+@pytest.mark.asyncio
+async def test_client_replays_from_archive(tmp_path):
+    """Test a replaying client serves pages from the archive."""
+    archive = PageArchive(tmp_path)
+    client = SocrataClient()
+    client.page_size = 2
+    client.archive, client.replay = archive, True
+    archive.save_page(
+        "test-ds", {"$limit": 2, "$offset": 0}, json.dumps([{"id": "1"}]).encode(), records=1
+    )
+
+    records = [record async for record in client.fetch_all("test-ds")]
+
+    assert records == [{"id": "1"}]
+
+
+def test_archive_keeps_csv_pages_apart(tmp_path):
+    """Test a CSV page is not served for the same query's JSON page, nor the other way round."""
+    archive = PageArchive(tmp_path)
+    params = {"$limit": 2, "$offset": 0}
+
+    archive.save_page("test-ds", params, b'"id"\n"1"\n', records=None, fmt="csv")
+
+    assert PageArchive(tmp_path).load_page("test-ds", params, fmt="csv") == b'"id"\n"1"\n'
+    with pytest.raises(ArchiveMiss):
+        archive.load_page("test-ds", params)
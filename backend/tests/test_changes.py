@@ -0,0 +1,66 @@
+"""Tests for changed-BBL capture."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.hpd import HPDViolation
+from app.models.pipeline import PipelineChange
+from pipeline import changes
+from pipeline.extractors.copy_loader import CopyLoader
+from pipeline.extractors.hpd_registrations import (
+    BuildingsFromRegistrationsExtractor,
+    RegistrationContactsExtractor,
+)
+from pipeline.extractors.hpd_violations import HPDViolationsExtractor
+
+
+@pytest.fixture
+async def recorded_changes(async_engine, monkeypatch):
+    """Point the changes API at the test database, with changes from two runs."""
+    factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(changes, "AsyncSessionLocal", factory)
+    now = datetime.utcnow()
+    async with factory() as session:
+        session.add_all([
+            PipelineChange(run_id="old", extractor="HPDViolationsExtractor", bbl="1000010001",
+                           changed_at=now - timedelta(days=40)),
+            PipelineChange(run_id="new", extractor="HPDViolationsExtractor", bbl="1000010002", changed_at=now),
+            PipelineChange(run_id="new", extractor="Complaints311Extractor", bbl="1000010002", changed_at=now),
+            PipelineChange(run_id="new", extractor="Complaints311Extractor", bbl="2000010001", changed_at=now),
+        ])
+        await session.commit()
+    return now
+
+
+@pytest.mark.asyncio
+async def test_changed_bbls_filters(recorded_changes):
+    """Test changed BBLs are distinct and filtered by run, extractor and time."""
+    assert await changes.changed_bbls() == {"1000010001", "1000010002", "2000010001"}
+    assert await changes.changed_bbls(run_ids=["new"]) == {"1000010002", "2000010001"}
+    assert await changes.changed_bbls(extractors=["HPDViolationsExtractor"]) == {"1000010001", "1000010002"}
+    assert await changes.changed_bbls(since=recorded_changes - timedelta(days=1)) == {"1000010002", "2000010001"}
+
+
+@pytest.mark.asyncio
+async def test_prune_changes(recorded_changes):
+    """Test pruning deletes only changes recorded before the cutoff."""
+    assert await changes.prune_changes(recorded_changes - timedelta(days=30)) == 1
+    assert await changes.changed_bbls() == {"1000010002", "2000010001"}
+
+
+def test_merge_sql_returns_change_keys():
+    """Test a merge with a key column returns it for the rows it changed."""
+    loader = CopyLoader(HPDViolation.__table__, ["violation_id"], key_column="bbl")
+    loader.columns = ["violation_id", "bbl", "created_at"]
+
+    assert loader._merge_sql().endswith("RETURNING (xmax = 0) AS inserted, bbl")
+
+
+def test_change_columns():
+    """Test changes are keyed by BBL, or by registration for contacts."""
+    assert HPDViolationsExtractor().change_column == "bbl"
+    assert RegistrationContactsExtractor().change_column == "registration_id"
+    assert "owner_portfolio_id" in RegistrationContactsExtractor().derived_columns
+    assert "latitude" in BuildingsFromRegistrationsExtractor().derived_columns
@@ -0,0 +1,161 @@
+"""Tests for extraction checkpoints."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.pipeline import PipelineCheckpoint, PipelineRun
+from pipeline.extractors import base
+from pipeline.extractors.shadow import ShadowTable
+from pipeline.extractors.hpd_registrations import (
+    BuildingsFromRegistrationsExtractor,
+    HPDRegistrationsExtractor,
+)
+from pipeline.extractors.pluto import PLUTOExtractor
+
+
+@pytest.fixture
+def session_factory(async_engine, monkeypatch):
+    """Point the extractors' sessions at the test database."""
+    factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(base, "AsyncSessionLocal", factory)
+    return factory
+
+
+def make_checkpoint(extractor, run_id="run-1", offset=0, completed=False, updated_at=None):
+    """Create a checkpoint row for an extractor."""
+    return PipelineCheckpoint(
+        extractor=extractor.state_key,
+        dataset_id=extractor.dataset_id,
+        run_id=run_id,
+        full_refresh=True,
+        incremental=False,
+        replacing_table=extractor.model_class.__tablename__,
+        resume_offset=offset,
+        rows_loaded=offset,
+        updated_at=updated_at or datetime.utcnow(),
+        completed_at=datetime.utcnow() if completed else None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_unfinished_run_is_resumable(session_factory):
+    """Test every extractor's checkpoint from one unfinished run is returned in order."""
+    registrations = HPDRegistrationsExtractor()
+    buildings = BuildingsFromRegistrationsExtractor()
+    async with session_factory() as session:
+        session.add_all([make_checkpoint(buildings, offset=9000), make_checkpoint(registrations, offset=7000)])
+        await session.commit()
+
+    checkpoints = await base.load_unfinished_checkpoints([registrations, buildings])
+
+    assert [c.resume_offset for c in checkpoints] == [7000, 9000]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "buildings_run_id, completed",
+    [("run-1", True), ("run-2", False), (None, False)],
+)
+async def test_run_is_not_resumable(session_factory, buildings_run_id, completed):
+    """Test finished runs, mismatched runs and missing checkpoints are not resumed."""
+    registrations = HPDRegistrationsExtractor()
+    buildings = BuildingsFromRegistrationsExtractor()
+    async with session_factory() as session:
+        session.add(make_checkpoint(registrations, completed=completed))
+        if buildings_run_id:
+            session.add(make_checkpoint(buildings, run_id=buildings_run_id, completed=completed))
+        await session.commit()
+
+    assert await base.load_unfinished_checkpoints([registrations, buildings]) is None
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_progress_and_finish(session_factory):
+    """Test progress is saved for the current run and finishing marks it complete."""
+    extractor = HPDRegistrationsExtractor()
+    extractor.run_id = "run-1"
+    async with session_factory() as session:
+        session.add(make_checkpoint(extractor))
+        await session.commit()
+
+        extractor.records_loaded = 1500
+        await extractor._save_checkpoint(session, 2000, None)
+        await session.commit()
+        assert (await base.load_unfinished_checkpoints([extractor]))[0].resume_offset == 2000
+
+        await extractor._finish_checkpoint(session)
+        await session.commit()
+
+    assert await base.load_unfinished_checkpoints([extractor]) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "checkpoint_age, ledger_age, running",
+    [
+        (timedelta(seconds=5), None, True),  # Still committing
+        (timedelta(hours=2), timedelta(seconds=5), True),  # Building indexes, ledger still refreshed
+        (timedelta(hours=2), timedelta(hours=2), False),  # Abandoned
+        (timedelta(hours=2), None, False),  # Abandoned, run outside the ledger
+    ],
+)
+async def test_running_full_refresh_is_detected(session_factory, checkpoint_age, ledger_age, running):
+    """Test an unfinished full refresh counts as running until its checkpoint and ledger row go stale."""
+    extractor = HPDRegistrationsExtractor()
+    now = datetime.utcnow()
+    async with session_factory() as session:
+        session.add(make_checkpoint(extractor, updated_at=now - checkpoint_age))
+        if ledger_age:
+            session.add(
+                PipelineRun(dataset="hpd_registrations", run_id="run-1", status="running", updated_at=now - ledger_age)
+            )
+        await session.commit()
+
+    if running:
+        with pytest.raises(RuntimeError, match="Full refresh still running for hpd_registrations by HPDRegistrationsExtractor"):
+            await base.check_no_running_full_refresh([extractor])
+    else:
+        await base.check_no_running_full_refresh([extractor])
+
+
+@pytest.mark.asyncio
+async def test_load_leaves_running_full_refresh_alone(session_factory, monkeypatch):
+    """Test an incremental load refuses to start, without dropping the shadow a running full refresh loads."""
+    extractor = HPDRegistrationsExtractor()
+    dropped = []
+
+    async def drop(shadow, session):
+        dropped.append(shadow.name)
+
+    monkeypatch.setattr(ShadowTable, "drop", drop)
+    async with session_factory() as session:
+        session.add(make_checkpoint(extractor))
+        await session.commit()
+
+    with pytest.raises(RuntimeError, match="not starting another load"):
+        await base.extract_and_load_shared([extractor], incremental=True, resume=True)
+
+    assert dropped == []
+    assert (await base.load_unfinished_checkpoints([extractor]))[0].run_id == "run-1"
+
+
+@pytest.mark.asyncio
+async def test_other_writers_of_a_table_wait_for_its_full_refresh(session_factory, monkeypatch):
+    """Test PLUTO, which updates buildings in place, won't start or drop the shadow while buildings is reloaded."""
+    dropped = []
+
+    async def drop(shadow, session):
+        dropped.append(shadow.name)
+
+    monkeypatch.setattr(ShadowTable, "drop", drop)
+    async with session_factory() as session:
+        session.add(make_checkpoint(BuildingsFromRegistrationsExtractor()))
+        await session.commit()
+
+    with pytest.raises(RuntimeError, match="Full refresh still running for buildings"):
+        await base.extract_and_load_shared([PLUTOExtractor()], incremental=True, resume=True)
+    await base.check_no_running_full_refresh([HPDRegistrationsExtractor()])  # Other tables load as usual
+
+    assert dropped == []
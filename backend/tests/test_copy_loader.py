@@ -0,0 +1,127 @@
+"""Tests for the COPY-based bulk loader."""
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models.complaints import Complaint311
+from app.models.hpd import HPDViolation
+from pipeline.extractors.complaints_311 import Complaints311Extractor
+from pipeline.extractors.copy_loader import CopyLoader, CsvCopyLoader, content_hash_sql, hashed_insert
+
+
+def test_resolve_columns_includes_python_defaults():
+    """Test staged columns cover transformed fields plus Python-side defaults."""
+    loader = CopyLoader(HPDViolation.__table__, ["violation_id"])
+
+    columns = loader._resolve_columns({"violation_id": 1, "bbl": "1000010001"})
+
+    assert columns == ["violation_id", "bbl", "created_at"]
+
+
+def test_merge_sql_keeps_last_staged_row():
+    """Test merge deduplicates staged rows by key and upserts the rest."""
+    loader = CopyLoader(HPDViolation.__table__, ["violation_id"])
+    loader.columns = ["violation_id", "bbl", "created_at"]
+
+    sql = loader._merge_sql()
+
+    assert sql.startswith("INSERT INTO hpd_violations (violation_id, bbl, created_at)")
+    assert "SELECT DISTINCT ON (violation_id)" in sql
+    assert "ORDER BY violation_id, _staged_seq DESC" in sql
+    assert "ON CONFLICT (violation_id) DO UPDATE SET bbl = EXCLUDED.bbl" in sql
+    assert sql.endswith("RETURNING (xmax = 0) AS inserted")
+
+
+def test_merge_sql_skips_unchanged_rows():
+    """Test merge only overwrites rows whose content hash differs."""
+    loader = CopyLoader(HPDViolation.__table__, ["violation_id"])
+    loader.columns = ["violation_id", "bbl", "content_hash", "created_at"]
+
+    sql = loader._merge_sql()
+
+    assert "WHERE hpd_violations.content_hash IS DISTINCT FROM EXCLUDED.content_hash" in sql
+
+
+def test_csv_merge_sql_casts_mapped_fields():
+    """Test CSV merges cast mapped fields, apply expressions and skip NULL keys."""
+    loader = CsvCopyLoader(
+        Complaint311.__table__,
+        ["unique_key"],
+        ["unique_key", "bbl", "created_date"],
+        {"bbl": "bbl", "created_date": "created_date"},
+        {"unique_key": "CAST(unique_key AS integer)"},
+    )
+
+    sql, params = loader._merge_sql()
+
+    assert sql.startswith("INSERT INTO complaints_311 (unique_key, bbl, created_date, created_at)")
+    assert "CAST(NULLIF(\"bbl\", '') AS VARCHAR(10)) AS bbl" in sql
+    assert "CAST(NULLIF(\"created_date\", '') AS TIMESTAMP WITHOUT TIME ZONE)" in sql
+    assert "WHERE CAST(unique_key AS integer) IS NOT NULL" in sql
+    assert "ON CONFLICT (unique_key) DO UPDATE SET bbl = EXCLUDED.bbl" in sql
+    assert set(params) == {"created_at"}
+
+
+def test_csv_quote_escapes_system_fields():
+    """Test system field names can't be mistaken for bind parameters."""
+    assert CsvCopyLoader.quote(":updated_at") == '"\\:updated_at"'
+
+
+def test_complaints_csv_mapping_covers_transform():
+    """Test the 311 CSV mapping produces every column transform_record does."""
+    extractor = Complaints311Extractor()
+    record = extractor.transform_record({"unique_key": "1"})
+
+    mapped = set(extractor.csv_columns) | set(extractor.csv_expressions)
+
+    assert mapped == set(record)
+    assert set(extractor.csv_columns.values()) <= set(extractor.select_clause.split(","))
+
+
+@pytest.mark.asyncio
+async def test_replayed_full_refresh_loads_csv_pages(monkeypatch):
+    """Test a replayed full refresh takes the CSV path, whose pages are archived, like the run it replays."""
+    extractor = Complaints311Extractor()
+    extractor.client.settings = extractor.client.settings.model_copy(update={"socrata_csv_full_refresh": True})
+    extractor.client.replay = True
+    loads = []
+
+    async def extract_and_load_csv(start_offset=0, resume=False):
+        loads.append(start_offset)
+        return 0
+
+    monkeypatch.setattr(extractor, "extract_and_load_csv", extract_and_load_csv)
+    await extractor.extract_and_load(full_refresh=True)
+
+    assert loads == [0]
+
+
+def test_every_load_path_hashes_rows_alike():
+    """Test upserts and both COPY loaders of 311 complaints compute the same content_hash and skip unchanged rows."""
+    extractor = Complaints311Extractor()
+    table = extractor.model_class.__table__
+    hash_exclude = extractor.derived_columns
+    record = extractor.transform_record({"unique_key": "1"})
+    json_loader = CopyLoader(table, ["unique_key"], hash_exclude=hash_exclude)
+    json_loader.columns = json_loader._resolve_columns(record)
+    csv_loader = CsvCopyLoader(
+        table,
+        ["unique_key"],
+        extractor.select_clause.split(","),
+        extractor.csv_columns,
+        extractor.csv_expressions,
+        hash_exclude=hash_exclude,
+    )
+
+    json_sql = json_loader._merge_sql()
+    csv_sql, _ = csv_loader._merge_sql()
+    upsert_sql = str(hashed_insert(table, [record], hash_exclude).compile(dialect=postgresql.dialect()))
+
+    assert "content_hash" not in record and "content_hash" not in json_loader.columns  # Computed in SQL
+    expected = content_hash_sql(table, sorted(set(record) - hash_exclude))
+    assert expected.startswith("hashtextextended(CAST(ROW(CAST(agency AS VARCHAR(20)), ")
+    assert f"{expected} AS content_hash" in json_sql
+    assert f"{expected} AS content_hash" in csv_sql
+    assert upsert_sql.startswith("INSERT INTO complaints_311 (") and f", {expected} \nFROM (VALUES" in upsert_sql
+    assert csv_sql.startswith("INSERT INTO complaints_311 (") and ", content_hash) SELECT" in csv_sql
+    assert csv_sql.endswith("WHERE complaints_311.content_hash IS DISTINCT FROM EXCLUDED.content_hash")
@@ -0,0 +1,48 @@
+"""Tests for incremental decoding of Socrata JSON responses."""
+
+from pipeline.extractors.decoding import RecordStreamDecoder
+
+
+def decode_in_chunks(body: bytes, chunk_size: int) -> list[dict]:
+    decoder = RecordStreamDecoder()
+    records = []
+    for i in range(0, len(body), chunk_size):
+        records.extend(decoder.feed(body[i:i + chunk_size]))
+    records.extend(decoder.close())
+    return records
+
+
+def test_decodes_line_delimited_records_across_chunks():
+    """Test Socrata's one-record-per-line layout decodes across chunk boundaries."""
+    body = b'[{"a":"1","b":"x,y"}\n,{"a":"2","location":{"lat":"40.7"}}\n,{"a":"3"}]\n'
+
+    for chunk_size in (1, 7, len(body)):
+        assert decode_in_chunks(body, chunk_size) == [
+            {"a": "1", "b": "x,y"},
+            {"a": "2", "location": {"lat": "40.7"}},
+            {"a": "3"},
+        ]
+
+
+def test_decodes_records_yielded_before_body_ends():
+    """Test complete lines are decoded without waiting for the rest of the body."""
+    decoder = RecordStreamDecoder()
+
+    assert decoder.feed(b'[{"a":"1"}\n,{"a":') == [{"a": "1"}]
+    assert decoder.feed(b'"2"}\n]') == [{"a": "2"}]
+    assert decoder.close() == []
+
+
+def test_decodes_pretty_printed_and_compact_bodies():
+    """Test bodies that are not one record per line still decode."""
+    pretty = b'[\n  {\n    "a": "1",\n    "b": "2"\n  },\n  {\n    "a": "3"\n  }\n]\n'
+    compact = b'[{"a":"1"},{"a":"2"}]'
+
+    assert decode_in_chunks(pretty, 5) == [{"a": "1", "b": "2"}, {"a": "3"}]
+    assert decode_in_chunks(compact, 4) == [{"a": "1"}, {"a": "2"}]
+
+
+def test_decodes_empty_body():
+    """Test an empty page decodes to no records."""
+    assert decode_in_chunks(b"[]\n", 2) == []
+    assert decode_in_chunks(b"[\n]\n", 2) == []
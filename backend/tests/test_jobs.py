@@ -0,0 +1,105 @@
+"""Tests for admin-triggered pipeline jobs run by workers."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.pipeline import PipelineJob
+from pipeline import runner, shards
+from pipeline.jobs import queue
+
+
+@pytest.fixture
+def session_factory(async_engine, monkeypatch):
+    """Point the job and shard queues' sessions at the test database."""
+    factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(queue, "AsyncSessionLocal", factory)
+    monkeypatch.setattr(shards, "AsyncSessionLocal", factory)
+    return factory
+
+
+@pytest.mark.asyncio
+async def test_trigger_queues_job_without_running_it(client: AsyncClient, monkeypatch):
+    """Test admin triggers only queue jobs, and a pending job isn't queued twice."""
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("the API must not run pipeline work")
+
+    monkeypatch.setattr(runner, "run_all", fail)
+    monkeypatch.setattr(runner, "run_extractor", fail)
+
+    first = (await client.post("/admin/pipeline/trigger", params={"full_refresh": True})).json()
+    again = (await client.post("/admin/pipeline/trigger", params={"full_refresh": True})).json()
+    violations = (await client.post("/admin/pipeline/trigger", params={"dataset": "hpd_violations"})).json()
+    scoring = (await client.post("/admin/pipeline/scoring")).json()
+
+    assert (first["kind"], first["dataset"], first["full_refresh"], first["status"]) == (
+        queue.EXTRACT, None, True, queue.QUEUED,
+    )
+    assert again["job_id"] == first["job_id"]
+    assert again["message"] == "Already queued: extract all (full refresh)"
+    assert violations["dataset"] == "hpd_violations" and violations["job_id"] != first["job_id"]
+    assert scoring["kind"] == queue.SCORING
+
+    job = (await client.get(f"/admin/pipeline/jobs/{scoring['job_id']}")).json()
+    status = (await client.get("/admin/pipeline/status")).json()
+    assert job["status"] == queue.QUEUED
+    assert [j["job_id"] for j in status["jobs"]] == [scoring["job_id"], violations["job_id"], first["job_id"]]
+    assert (await client.get("/admin/pipeline/jobs/999")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_trigger_rejects_unknown_dataset(client: AsyncClient):
+    """Test an unknown dataset is reported instead of queued."""
+    response = await client.post("/admin/pipeline/trigger", params={"dataset": "nope"})
+
+    assert "Unknown dataset" in response.json()["error"]
+
+
+@pytest.mark.asyncio
+async def test_worker_runs_queued_jobs(session_factory, monkeypatch):
+    """Test a worker runs each queued job once, recording success and failure."""
+    calls = []
+
+    async def fake_run_all(full_refresh=False):
+        calls.append(("all", full_refresh))
+
+    async def fake_run_scoring():
+        calls.append(("scoring",))
+        raise RuntimeError("scores table locked")
+
+    monkeypatch.setattr(runner, "run_all", fake_run_all)
+    monkeypatch.setattr(runner, "run_scoring", fake_run_scoring)
+    async with session_factory() as session:
+        extract, _ = await queue.submit_job(session, queue.EXTRACT, full_refresh=True)
+        scoring, _ = await queue.submit_job(session, queue.SCORING)
+
+    assert await runner.run_worker("w1", exit_when_idle=True) == 1
+
+    assert calls == [("all", True), ("scoring",)]
+    async with session_factory() as session:
+        extract = await session.get(PipelineJob, extract.id)
+        scoring = await session.get(PipelineJob, scoring.id)
+    assert (extract.status, extract.worker, extract.finished_at is not None) == (queue.SUCCEEDED, "w1", True)
+    assert (scoring.status, scoring.error) == (queue.FAILED, "scores table locked")
+
+
+@pytest.mark.asyncio
+async def test_stale_running_job_is_reclaimed(session_factory):
+    """Test a job whose worker stopped heartbeating is claimed by another worker."""
+    async with session_factory() as session:
+        job, created = await queue.submit_job(session, queue.ENTITY_RESOLUTION)
+    assert created
+    await queue.claim_job("dead")
+    assert await queue.claim_job("w") is None
+
+    async with session_factory() as session:
+        stuck = await session.get(PipelineJob, job.id)
+        stuck.heartbeat_at = datetime.utcnow() - timedelta(hours=1)
+        await session.commit()
+
+    reclaimed = await queue.claim_job("w")
+
+    assert (reclaimed.id, reclaimed.worker, reclaimed.attempts) == (job.id, "w", 2)
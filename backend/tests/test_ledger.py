@@ -0,0 +1,206 @@
+"""Tests for the pipeline run ledger."""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.pipeline import PipelineRun
+from pipeline import ledger
+from pipeline.extractors.evictions import EvictionsExtractor
+
+
+@pytest.fixture
+def session_factory(async_engine, monkeypatch):
+    """Point the ledger's sessions at the test database."""
+    factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(ledger, "AsyncSessionLocal", factory)
+    return factory
+
+
+async def load_runs(session_factory) -> list[PipelineRun]:
+    """All ledger rows, in the order they were started."""
+    async with session_factory() as session:
+        return list((await session.execute(select(PipelineRun).order_by(PipelineRun.id))).scalars())
+
+
+class FakeClient:
+    """Socrata client stand-in with transfer counters and a record count."""
+
+    def __init__(self, count, replay=False):
+        self.count = count
+        self.replay = replay
+        self.counted = 0
+        self.bytes_downloaded = 0
+        self.pages_fetched = 0
+
+    async def get_record_count(self, dataset_id, where=None):
+        self.counted += 1
+        return self.count
+
+
+@pytest.mark.asyncio
+async def test_track_run_records_children_and_outcome(session_factory):
+    """Test runs started inside a parent run point at it, and each records how it ended."""
+    extractor = EvictionsExtractor()
+    extractor.client = FakeClient(0)
+
+    async def load():
+        extractor.run_id = "run-1"
+        extractor.records_loaded = 42
+        return 42
+
+    async def fail():
+        raise RuntimeError("socrata down")
+
+    async def run_all():
+        count = await ledger.track_run("evictions", load(), [extractor])
+        with pytest.raises(RuntimeError):
+            await ledger.track_run("pluto", fail(), [EvictionsExtractor()])
+        return count
+
+    assert await ledger.track_run("all", run_all()) == 42
+
+    parent, evictions, pluto = await load_runs(session_factory)
+    assert (parent.dataset, parent.parent_id, parent.status) == ("all", None, ledger.SUCCEEDED)
+    assert (evictions.parent_id, evictions.status, evictions.run_id) == (parent.id, ledger.SUCCEEDED, "run-1")
+    assert evictions.rows_loaded == 42 and evictions.finished_at is not None
+    assert (pluto.parent_id, pluto.status, pluto.error) == (parent.id, ledger.FAILED, "socrata down")
+
+
+@pytest.mark.asyncio
+async def test_progress_is_reported_while_loading(session_factory, monkeypatch):
+    """Test a running load's row is refreshed with its counters, queue depths and an ETA."""
+    monkeypatch.setattr(ledger.get_settings(), "pipeline_progress_seconds", 0.05)
+    extractor = EvictionsExtractor()
+    extractor.client = FakeClient(1000)
+    extractor.raw_queue = asyncio.Queue()
+    extractor.raw_queue.put_nowait("batch")
+    snapshots = []
+
+    async def load():
+        for n in range(1, 11):
+            extractor.fetch_stats.record(50, 0.0)
+            extractor.records_fetched = extractor.records_loaded = 50 * n
+            extractor.client.pages_fetched = n
+            await asyncio.sleep(0.02)
+            snapshots.extend(await load_runs(session_factory))
+        return extractor.records_loaded
+
+    await ledger.track_run("evictions", load(), [extractor])
+
+    live = snapshots[-1]
+    assert live.status == ledger.RUNNING
+    assert (live.expected_rows, live.raw_queued, live.load_queued) == (1000, 1, 0)
+    assert live.pages_fetched >= 3
+    assert live.rows_per_second > 0
+    assert live.estimated_finish_at > live.updated_at
+    [finished] = await load_runs(session_factory)
+    assert (finished.rows_loaded, finished.raw_queued, finished.estimated_finish_at) == (500, None, None)
+
+
+@pytest.mark.asyncio
+async def test_replay_progress_stays_offline(session_factory, monkeypatch):
+    """Test a replayed load reports progress without requesting a record count, so without an ETA."""
+    monkeypatch.setattr(ledger.get_settings(), "pipeline_progress_seconds", 0.02)
+    extractor = EvictionsExtractor()
+    extractor.client = FakeClient(1000, replay=True)
+
+    async def load():
+        for n in range(1, 6):
+            extractor.fetch_stats.record(50, 0.0)
+            extractor.records_fetched = extractor.records_loaded = 50 * n
+            await asyncio.sleep(0.02)
+        return await load_runs(session_factory)
+
+    [live] = await ledger.track_run("evictions", load(), [extractor])
+
+    assert extractor.client.counted == 0
+    assert live.rows_loaded > 0
+    assert (live.expected_rows, live.estimated_finish_at) == (None, None)
+
+
+@pytest.mark.asyncio
+async def test_status_endpoint(client: AsyncClient, db_session: AsyncSession):
+    """Test the status endpoint reports running runs with an ETA, then recent runs."""
+    now = datetime.utcnow()
+    db_session.add_all([
+        PipelineRun(
+            dataset="pluto",
+            status=ledger.SUCCEEDED,
+            started_at=now - timedelta(hours=2),
+            finished_at=now - timedelta(hours=1),
+            rows_loaded=850000,
+        ),
+        PipelineRun(
+            dataset="hpd_violations",
+            status=ledger.RUNNING,
+            started_at=now - timedelta(minutes=5),
+            rows_loaded=300000,
+            rows_per_second=1000.0,
+            fetched_rows=300000,
+            expected_rows=1200000,
+            estimated_finish_at=now + timedelta(minutes=15),
+            raw_queued=3,
+            load_queued=8,
+        ),
+    ])
+    await db_session.flush()
+
+    response = await client.get("/admin/pipeline/status")
+
+    assert response.status_code == 200
+    data = response.json()
+    [running] = data["running"]
+    assert running["dataset"] == "hpd_violations"
+    assert running["percent_fetched"] == 25.0
+    assert running["queued_batches"] == {"raw": 3, "transformed": 8}
+    assert 800 < running["eta_seconds"] <= 900
+    assert [run["dataset"] for run in data["recent"]] == ["hpd_violations", "pluto"]
+    assert data["recent"][1]["eta_seconds"] is None
+    assert data["recent"][1]["elapsed_seconds"] == 3600
+
+
+@pytest.mark.asyncio
+async def test_status_reports_stale_running_run_as_abandoned(client: AsyncClient, db_session: AsyncSession):
+    """Test a running row no longer updated (its process was killed) is reported as abandoned, not running."""
+    now = datetime.utcnow()
+    interval = ledger.get_settings().pipeline_progress_seconds
+    last_update = now - timedelta(seconds=(ledger.STALE_INTERVALS + 1) * interval)
+    db_session.add_all([
+        PipelineRun(
+            dataset="acris",
+            status=ledger.RUNNING,
+            started_at=last_update - timedelta(minutes=10),
+            updated_at=last_update,
+            estimated_finish_at=now + timedelta(minutes=15),
+        ),
+        PipelineRun(dataset="evictions", status=ledger.RUNNING, started_at=now, updated_at=now),
+    ])
+    await db_session.flush()
+
+    data = (await client.get("/admin/pipeline/status")).json()
+
+    assert [run["dataset"] for run in data["running"]] == ["evictions"]
+    evictions, acris = data["recent"]
+    assert (evictions["status"], acris["status"]) == (ledger.RUNNING, ledger.ABANDONED)
+    assert acris["eta_seconds"] is None
+    assert acris["elapsed_seconds"] == 600
+
+
+@pytest.mark.asyncio
+async def test_parent_run_is_kept_fresh(session_factory, monkeypatch):
+    """Test a run_all row, which has no progress of its own, is still updated while its runs load."""
+    monkeypatch.setattr(ledger.get_settings(), "pipeline_progress_seconds", 0.02)
+
+    async def run_all():
+        await asyncio.sleep(0.2)
+        return await load_runs(session_factory)
+
+    [parent] = await ledger.track_run("all", run_all())
+
+    assert parent.status == ledger.RUNNING
+    assert (parent.updated_at - parent.started_at).total_seconds() >= 0.05
@@ -0,0 +1,96 @@
+"""Tests for owner name and address normalization."""
+
+import pytest
+
+from app.services.entity_resolution import EntityResolutionService
+from app.utils.normalize import is_corporate_name, normalize_address, normalize_name
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("Acme Holdings LLC", "ACME HOLDINGS"),
+        ("ACME HOLDINGS, INC.", "ACME HOLDINGS"),
+        ("Smith & Co", "SMITH"),
+        ("Company Towers Corporation", "TOWERS"),
+        ("O'Brien-Smith L.P.", "OBRIENSMITH LP"),  # Dotted suffix at the end is kept
+        ("ACME L.L.C.HOLDINGS", "ACME HOLDINGS"),
+        ("  John   Q  Public ", "JOHN Q PUBLIC"),
+        ("", ""),
+        (None, ""),
+    ],
+)
+def test_normalize_name(name, expected):
+    """Test names match the original suffix/punctuation normalization."""
+    assert normalize_name(name) == expected
+
+
+@pytest.mark.parametrize(
+    "address, expected",
+    [
+        ("123 West 42nd Street", "123 WEST 42 ST"),
+        ("5 Fifth Avenue, Suite 200", "5 FIFTH AVE"),
+        ("10 Main St Apartment 4B", "10 MAIN ST"),
+        ("77 Court Road Floor 3-A", "77 CT RD"),
+        ("1 Place Blvd FLOOR", "1 PL BLVD FL"),  # Designator without a unit is kept
+        ("99 Flatbush Ave", "99 AVE"),  # Designator prefixes swallow the word
+        ("12 BROADWAY#5", "12 BROADWAY"),
+        ("12 BROADWAY #5", "12 BROADWAY 5"),
+        ("", ""),
+    ],
+)
+def test_normalize_address(address, expected):
+    """Test addresses match the original sequential regex normalization."""
+    assert normalize_address(address) == expected
+
+
+def test_normalization_is_memoized():
+    """Test repeated values are served from the LRU memo."""
+    normalize_address.cache_clear()
+
+    normalize_address("1 Main Street")
+    normalize_address("1 Main Street")
+
+    assert normalize_address.cache_info().hits == 1
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("ACME HOLDINGS LLC", True),
+        ("Acme Holdings L.L.C.", True),
+        ("PRINCE STREET ASSOCIATES", False),
+        ("JOHN SMITH", False),
+    ],
+)
+def test_is_corporate_name(name, expected):
+    """Test corporate suffixes are matched as whole words."""
+    assert is_corporate_name(name) is expected
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        # Counted as corporate only since matching whole suffix words
+        ("ACME HOLDINGS CO", True),
+        ("ACME REALTY COMPANY", True),
+        ("ACME CORPORATION", True),
+        ("ACME INCORPORATED", True),
+        ("ACME PROPERTIES LIMITED", True),
+        ("SMITH & JONES P.C.", True),
+        ("PARK SLOPE CO-OP", True),
+        # Counted as corporate before, when suffixes matched inside words
+        ("PRINCE STREET ASSOCIATES", False),
+        ("HELP HOUSING FUND", False),
+        ("CORPUS REALTY", False),
+        ("LINC REALTY", False),
+        # Corporate either way
+        ("ACME L.P.", True),
+        ("ACME CORP", True),
+        ("ACME LTD", True),
+        ("ACME PLLC", True),
+    ],
+)
+def test_portfolio_llc_flag(name, expected):
+    """Test which owner names flag a portfolio as an LLC (worth 30 points of its score)."""
+    assert EntityResolutionService._is_llc_name(name) is expected
@@ -0,0 +1,188 @@
+"""Tests for PLUTO's set-based building enrichment."""
+
+import re
+
+import pytest
+from sqlalchemy import literal_column, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.building import Building
+from pipeline.extractors import base
+from pipeline.extractors.hpd_registrations import BuildingsFromRegistrationsExtractor
+from pipeline.extractors.pluto import PLUTOExtractor
+
+FIELDS = ["residential_units", "total_units", "year_built", "latitude", "longitude"]
+
+
+class ScalarResult:
+    """Result stand-in returning the given RETURNING values."""
+
+    def __init__(self, values):
+        self.values = values
+
+    def scalars(self):
+        return iter(self.values)
+
+
+class RecordingSession:
+    """Session stand-in recording each statement, answering the UPDATE with the given changed BBLs."""
+
+    def __init__(self, changed=()):
+        self.changed = list(changed)
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        sql = " ".join(str(statement.compile(dialect=postgresql.dialect())).split())
+        sql = sql.replace("( ", "(").replace(" )", ")")
+        self.statements.append((sql, params))
+        return ScalarResult(self.changed if sql.startswith("UPDATE buildings") else [])
+
+
+def record(bbl, **values):
+    """A transformed PLUTO record, all fields set unless given."""
+    fields = {"residential_units": 10, "total_units": 12, "year_built": 1920, "latitude": 40.7, "longitude": -74.0}
+    fields.update(values)
+    return {"bbl": bbl, **fields}
+
+
+@pytest.mark.asyncio
+async def test_update_is_one_set_based_statement():
+    """Test a batch is applied by one UPDATE joined on BBL that only touches buildings it changes."""
+    session = RecordingSession()
+
+    await PLUTOExtractor()._upsert_batch(session, [record("1000010001"), record("1000010002")])
+
+    [(sql, _)] = session.statements
+    assert sql.startswith("UPDATE buildings b SET")
+    assert "FROM unnest(" in sql and "AS s(bbl, " + ", ".join(FIELDS) + ")" in sql
+    assert "WHERE b.bbl = s.bbl" in sql
+    assert sql.endswith("RETURNING b.bbl")
+
+
+@pytest.mark.asyncio
+async def test_empty_pluto_fields_keep_current_values():
+    """Test every field PLUTO sets falls back to the building's value where PLUTO has none."""
+    session = RecordingSession()
+
+    await PLUTOExtractor()._upsert_batch(session, [record("1000010001")])
+
+    [(sql, _)] = session.statements
+    assigned = re.findall(r"(\w+) = COALESCE\(s\.(\w+), b\.(\w+)\)", sql.split(" FROM ")[0])
+    assert assigned == [(field, field, field) for field in FIELDS]
+    assert "updated_at = NOW()" in sql
+
+
+@pytest.mark.asyncio
+async def test_unchanged_buildings_are_not_rewritten():
+    """Test the UPDATE only matches buildings whose fields differ from the merged values."""
+    session = RecordingSession()
+
+    await PLUTOExtractor()._upsert_batch(session, [record("1000010001")])
+
+    [(sql, _)] = session.statements
+    current = "(" + ", ".join(f"b.{field}" for field in FIELDS) + ")"
+    merged = "(" + ", ".join(f"COALESCE(s.{field}, b.{field})" for field in FIELDS) + ")"
+    assert f"AND {current} IS DISTINCT FROM {merged}" in sql
+
+
+@pytest.mark.asyncio
+async def test_batch_is_passed_as_arrays_deduplicated_by_bbl():
+    """Test records are sent as one array per column, keeping the last record for a repeated BBL."""
+    session = RecordingSession()
+
+    await PLUTOExtractor()._upsert_batch(
+        session, [record("1000010001"), record("1000010002", year_built=None), record("1000010001", year_built=1925)]
+    )
+
+    [(_, params)] = session.statements
+    assert params["bbl"] == ["1000010001", "1000010002"]
+    assert params["year_built"] == [1925, None]
+    assert set(params) == {"bbl", *FIELDS}
+
+
+@pytest.mark.asyncio
+async def test_changed_buildings_are_counted_and_recorded():
+    """Test buildings returned by the UPDATE count as updated and are recorded; the rest as unchanged."""
+    extractor = PLUTOExtractor()
+    extractor.run_id = "run-1"
+    session = RecordingSession(changed=["1000010001"])
+
+    counts = await extractor._upsert_batch(session, [record("1000010001"), record("1000010002")])
+
+    assert counts == (0, 1, 1)
+    [_, (changes_sql, changes)] = session.statements
+    assert "INSERT INTO pipeline_changes" in changes_sql and changes["bbls"] == ["1000010001"]
+
+
+@pytest.mark.asyncio
+async def test_no_changes_records_nothing():
+    """Test a batch that changes no building counts all as unchanged and records no changes."""
+    extractor = PLUTOExtractor()
+    extractor.run_id = "run-1"
+    session = RecordingSession()
+
+    counts = await extractor._upsert_batch(session, [record("1000010001")])
+
+    assert counts == (0, 0, 1)
+    assert len(session.statements) == 1
+
+
+class FakeClient:
+    """Socrata client stand-in serving fixed batches and recording each fetch's $where."""
+
+    def __init__(self, batches):
+        self.batches = batches
+        self.wheres = []
+        self.bytes_downloaded = 0
+        self.pages_fetched = 0
+
+    async def project_select(self, dataset_id, select):
+        return select
+
+    include_fields = staticmethod(base.SocrataClient.include_fields)
+
+    async def fetch_batch(self, dataset_id, batch_size=1000, where=None, **kwargs):
+        self.wheres.append(where)
+        for batch in self.batches:
+            yield batch
+
+
+@pytest.mark.asyncio
+async def test_buildings_load_keeps_pluto_fields(async_engine, monkeypatch):
+    """Test reloading a changed registration, then an incremental PLUTO run, keeps the building's PLUTO fields."""
+    factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(base, "AsyncSessionLocal", factory)
+    # SQLite has no xmax or hashtextextended
+    monkeypatch.setattr(base, "literal_column", lambda sql: literal_column("1"))
+    monkeypatch.setattr(BuildingsFromRegistrationsExtractor, "hash_content", False)
+    async with factory() as session:
+        session.add(Building(
+            bbl="1000010001", borough="Manhattan", block=1, lot=1, street_name="BROADWAY",
+            total_units=12, residential_units=10, year_built=1920, latitude=40.7, longitude=-74.0,
+        ))
+        await session.commit()
+
+    buildings = BuildingsFromRegistrationsExtractor()
+    registration = {"boroid": "1", "block": "1", "lot": "1", "streetname": "LOWER BROADWAY", "totalunits": "8"}
+    async with factory() as session:
+        await buildings._upsert_batch(session, buildings._transform_batch([registration]))
+        await session.commit()
+
+    pluto = PLUTOExtractor()
+    pluto.client = FakeClient([[{"bbl": "1000020001.00000000", "yearbuilt": "1931"}]])
+    applied = []
+
+    async def upsert_batch(session, records):  # PLUTO's UPDATE needs Postgres (see tests above)
+        applied.extend(records)
+
+    monkeypatch.setattr(pluto, "_upsert_batch", upsert_batch)
+    await base.extract_and_load_shared([pluto], incremental=True)
+
+    async with factory() as session:
+        building = await session.scalar(select(Building))
+    assert building.street_name == "LOWER BROADWAY"
+    assert (building.latitude, building.longitude, building.year_built) == (40.7, -74.0, 1920)
+    assert (building.total_units, building.residential_units) == (12, 10)
+    assert pluto.client.wheres == [None]  # Every lot is re-read, not just recently updated ones
+    assert [record["bbl"] for record in applied] == ["1000020001"]
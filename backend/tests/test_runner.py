@@ -0,0 +1,120 @@
+"""Tests for the pipeline runner."""
+
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from pipeline import ledger, runner
+from pipeline.extractors import base
+
+
+@pytest.fixture(autouse=True)
+def ledger_sessions(async_engine, monkeypatch):
+    """Record the runs' ledger rows in the test database."""
+    factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(ledger, "AsyncSessionLocal", factory)
+
+
+@pytest.mark.asyncio
+async def test_run_all_respects_dependencies(monkeypatch):
+    """Test dependent datasets start only after their dependencies finish."""
+    finished: list[str] = []
+    started: dict[str, list[str]] = {}
+    running = 0
+    peak = 0
+
+    async def fake_run_extractor_group(names, full_refresh=False, incremental=True, resume=True):
+        nonlocal running, peak
+        for name in names:
+            started[name] = list(finished)
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        finished.extend(names)
+        return len(names)
+
+    monkeypatch.setattr(runner, "run_extractor_group", fake_run_extractor_group)
+
+    await runner.run_all(max_parallel=3)
+
+    assert sorted(finished) == sorted(runner.LOAD_ORDER)
+    for name, dependencies in runner.DEPENDENCIES.items():
+        assert set(dependencies) <= set(started[name])
+    assert 1 < peak <= 3
+
+
+@pytest.mark.asyncio
+async def test_run_all_stops_on_failure(monkeypatch):
+    """Test a failing extractor cancels the rest and re-raises."""
+
+    async def fake_run_extractor_group(names, full_refresh=False, incremental=True, resume=True):
+        if "hpd_registrations" in names:
+            raise RuntimeError("socrata down")
+        await asyncio.sleep(0.05)
+        return 1
+
+    monkeypatch.setattr(runner, "run_extractor_group", fake_run_extractor_group)
+
+    with pytest.raises(RuntimeError, match="socrata down"):
+        await runner.run_all(max_parallel=2)
+
+
+def test_group_shared_fetches():
+    """Test extractors of the same dataset are grouped unless one depends on the other."""
+    groups = runner.group_shared_fetches(runner.LOAD_ORDER)
+
+    assert ["buildings", "hpd_registrations"] in groups
+    assert sorted(name for group in groups for name in group) == sorted(runner.LOAD_ORDER)
+    for group in groups:
+        for name in group:
+            assert not set(runner.DEPENDENCIES.get(name, [])) & set(group)
+
+
+@pytest.mark.asyncio
+async def test_shared_fetch_keeps_the_order_a_member_needs(async_engine, monkeypatch):
+    """Test registrations fetched for buildings too stay newest first, and conflicting orders aren't shared."""
+    monkeypatch.setattr(base, "AsyncSessionLocal", async_sessionmaker(async_engine, class_=AsyncSession))
+    orders = []
+
+    class FakeClient:
+        bytes_downloaded = pages_fetched = 0
+
+        async def project_select(self, dataset_id, select):
+            return select
+
+        include_fields = staticmethod(base.SocrataClient.include_fields)
+
+        async def fetch_batch(self, dataset_id, batch_size=1000, order=None, **kwargs):
+            orders.append(order)
+            return
+            yield
+
+    extractors = [runner.EXTRACTORS[name]() for name in ["buildings", "hpd_registrations"]]
+    for extractor in extractors:
+        extractor.client = FakeClient()
+        monkeypatch.setattr(type(extractor), "replaces_table", False)  # SQLite can't shadow
+
+    await base.extract_and_load_shared(extractors, incremental=False)
+
+    assert orders == ["lastregistrationdate DESC"]
+    monkeypatch.setattr(runner.BuildingsFromRegistrationsExtractor, "order_clause", "bbl")
+    assert ["buildings", "hpd_registrations"] not in runner.group_shared_fetches(["buildings", "hpd_registrations"])
+
+
+@pytest.mark.asyncio
+async def test_run_extractor_passes_resume(monkeypatch):
+    """Test run_extractor hands the resume flag to the extractor unchanged."""
+    calls = []
+
+    async def fake_extract_and_load(self, **kwargs):
+        calls.append(kwargs)
+        return 0
+
+    monkeypatch.setattr(runner.EvictionsExtractor, "extract_and_load", fake_extract_and_load)
+
+    await runner.run_extractor("evictions")
+    await runner.run_extractor("evictions", start_offset=100, resume=False)
+
+    assert [call["resume"] for call in calls] == [True, False]
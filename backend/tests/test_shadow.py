@@ -0,0 +1,154 @@
+"""Tests for full refreshes through shadow tables."""
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from pipeline.extractors.hpd_registrations import BuildingsFromRegistrationsExtractor
+from pipeline.extractors.hpd_violations import HPDViolationsExtractor
+from pipeline.extractors.pluto import PLUTOExtractor
+from pipeline.extractors.shadow import ShadowTable
+
+
+class RecordingResult:
+    """Result stand-in for a statement that returned no rows."""
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return []
+
+    def __iter__(self):
+        return iter([])
+
+
+class RecordingSession:
+    """Session stand-in that records executed statements."""
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(statement)
+        return RecordingResult()
+
+
+def test_shadow_target_mirrors_table():
+    """Test the shadow target has the live table's columns and key under its own name."""
+    table = HPDViolationsExtractor().model_class.__table__
+
+    shadow = ShadowTable(table)
+
+    assert shadow.target.name == "hpd_violations_shadow"
+    assert [c.name for c in shadow.target.columns] == [c.name for c in table.columns]
+    assert [c.name for c in shadow.target.primary_key] == ["violation_id"]
+
+
+@pytest.mark.asyncio
+async def test_full_refresh_writes_to_shadow_table():
+    """Test upserts go to the shadow table while a full refresh is loading."""
+    extractor = HPDViolationsExtractor()
+    session = RecordingSession()
+    extractor.shadow = ShadowTable(extractor.model_class.__table__)
+
+    await extractor._upsert_batch(session, [{"violation_id": 1, "bbl": "1000010001"}])
+
+    sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("INSERT INTO hpd_violations_shadow ")
+
+
+def test_pluto_updates_buildings_in_place():
+    """Test PLUTO, which only enriches existing buildings, never replaces the table."""
+    assert HPDViolationsExtractor().replaces_table
+    assert not PLUTOExtractor().replaces_table
+
+
+@pytest.mark.asyncio
+async def test_upsert_skips_unchanged_rows():
+    """Test hashed records only overwrite rows whose content hash differs."""
+    extractor = HPDViolationsExtractor()
+    session = RecordingSession()
+
+    counts = await extractor._upsert_batch(
+        session, [{"violation_id": 1, "bbl": "1000010001"}]
+    )
+
+    sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+    assert "WHERE hpd_violations.content_hash IS DISTINCT FROM excluded.content_hash" in sql
+    assert "RETURNING xmax = 0" in sql
+    assert counts == (0, 0, 1)
+
+
+@pytest.mark.asyncio
+async def test_index_statements_target_shadow(monkeypatch):
+    """Test the live table's indexes are recreated under shadow names on the shadow table."""
+    shadow = ShadowTable(HPDViolationsExtractor().model_class.__table__)
+
+    async def indexes(session):
+        return [
+            ("idx_hpd_violations_bbl", False, "CREATE INDEX idx_hpd_violations_bbl ON public.hpd_violations USING btree (bbl)"),
+        ]
+
+    monkeypatch.setattr(shadow, "_indexes", indexes)
+
+    assert await shadow.index_statements(RecordingSession()) == [
+        (
+            "idx_hpd_violations_bbl",
+            "CREATE INDEX IF NOT EXISTS idx_hpd_violations_bbl_shadow ON hpd_violations_shadow USING btree (bbl)",
+        )
+    ]
+
+
+@pytest.mark.asyncio
+async def test_finish_shadow_analyzes_and_times_steps(monkeypatch):
+    """Test a reloaded table is analyzed before the swap and each step's timing is saved with the run."""
+    extractor = HPDViolationsExtractor()
+    extractor.run_id = "run-1"
+    extractor.shadow = ShadowTable(extractor.model_class.__table__)
+    session = RecordingSession()
+
+    async def build_indexes():
+        pass
+
+    monkeypatch.setattr(extractor, "_build_shadow_indexes", build_indexes)
+
+    await extractor._finish_shadow(session)
+    await extractor._save_steps(session)
+
+    assert "ANALYZE hpd_violations_shadow" in [str(s) for s in session.statements]
+    assert [step for step, _, _, _ in extractor.step_timings] == []
+    saved = session.statements[-1].compile(dialect=postgresql.dialect()).params
+    assert [saved[f"step_m{n}"] for n in range(3)] == ["build_indexes", "record_changes", "analyze"]
+
+
+@pytest.mark.asyncio
+async def test_full_refresh_keeps_preserved_columns(async_engine):
+    """Test a reloaded buildings shadow takes PLUTO's fields from the live rows with the same BBL."""
+    extractor = BuildingsFromRegistrationsExtractor()
+    shadow = ShadowTable(extractor.model_class.__table__)
+    async with async_engine.begin() as conn:
+        await conn.execute(text(f"CREATE TABLE {shadow.name} AS SELECT * FROM buildings WHERE 0"))  # No indexes
+        await conn.execute(extractor.model_class.__table__.insert().values(
+            bbl="1000010001", borough="Manhattan", block=1, lot=1, total_units=12, year_built=1920, latitude=40.7,
+        ))
+        await conn.execute(shadow.target.insert().values([
+            {"bbl": "1000010001", "borough": "Manhattan", "block": 1, "lot": 1, "total_units": 8},
+            {"bbl": "1000010002", "borough": "Manhattan", "block": 1, "lot": 2, "total_units": 5},
+        ]))
+    session_factory = async_sessionmaker(async_engine, class_=AsyncSession)
+
+    async with session_factory() as session:
+        await shadow.copy_columns(
+            session, sorted(extractor.preserved_columns), extractor.get_primary_key_columns()
+        )
+        rows = (await session.execute(
+            select(shadow.target.c.bbl, shadow.target.c.total_units, shadow.target.c.year_built,
+                   shadow.target.c.latitude).order_by(shadow.target.c.bbl)
+        )).all()
+
+    assert [tuple(row) for row in rows] == [
+        ("1000010001", 12, 1920, 40.7),
+        ("1000010002", 5, None, None),  # New buildings keep what the reload gave them
+    ]
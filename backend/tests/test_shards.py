@@ -0,0 +1,231 @@
+"""Tests for the sharded extraction work queue."""
+
+import asyncio
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.pipeline import PipelineShard
+from pipeline import shards
+from pipeline.extractors import base
+from pipeline.extractors.complaints_311 import Complaints311Extractor
+from pipeline.extractors.hpd_violations import HPDViolationsExtractor
+
+
+@pytest.fixture
+def session_factory(async_engine, monkeypatch):
+    """Point the work queue's sessions at the test database."""
+    factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(shards, "AsyncSessionLocal", factory)
+    return factory
+
+
+class FakeClient:
+    """Socrata client over a sorted list of row ids."""
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    async def get_record_count(self, dataset_id, where=None):
+        return len(self.ids)
+
+    async def get_value_at(self, dataset_id, field, offset, where=None):
+        return self.ids[offset]
+
+
+@pytest.mark.asyncio
+async def test_plan_shards_splits_on_row_ids():
+    """Test shards are contiguous :id ranges covering the whole dataset."""
+    extractor = HPDViolationsExtractor()
+    extractor.client = FakeClient([f"row-{n:02d}" for n in range(12)])
+
+    clauses = await shards.plan_shards(extractor, 3)
+
+    assert clauses == [
+        ":id < 'row-04'",
+        ":id >= 'row-04' AND :id < 'row-08'",
+        ":id >= 'row-08'",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_plan_shards_keeps_small_datasets_whole():
+    """Test a dataset with fewer rows than shards is a single unfiltered shard."""
+    extractor = HPDViolationsExtractor()
+    extractor.client = FakeClient(["a", "b"])
+
+    assert await shards.plan_shards(extractor, 4) == [None]
+
+
+def test_shard_clause_narrows_fetch_where():
+    """Test a shard's filter is combined with the extractor's own filter."""
+    extractor = HPDViolationsExtractor()
+    assert extractor.fetch_where == extractor.where_clause
+
+    extractor.shard_id = 7
+    extractor.shard_clause = ":id < 'x'"
+
+    assert ":id < 'x'" in extractor.fetch_where
+    assert extractor.checkpoint_key == f"{extractor.state_key}#shard7"
+
+
+@pytest.mark.asyncio
+async def test_shards_are_claimed_in_order_once(session_factory):
+    """Test workers claim pending shards in order and never the same one twice."""
+    ids = await shards.enqueue_shards("job", 0, ["hpd_violations"], ["a", "b"])
+
+    first = await shards.claim_shard("w1")
+    second = await shards.claim_shard("w2")
+
+    assert [first.id, second.id] == ids
+    assert (first.worker, first.status, first.attempts) == ("w1", shards.RUNNING, 1)
+    assert await shards.claim_shard("w3") is None
+
+
+@pytest.mark.asyncio
+async def test_later_stage_waits_for_earlier_stage(session_factory):
+    """Test a dependent stage is only claimable once the earlier stage is done."""
+    await shards.enqueue_shards("job", 1, ["buildings"], [None])
+    [registrations] = await shards.enqueue_shards("job", 0, ["hpd_registrations"], [None])
+    await shards.enqueue_shards("other", 0, ["evictions"], [None])
+
+    assert (await shards.claim_shard("w")).id == registrations
+    assert (await shards.claim_shard("w")).datasets == "evictions"
+    assert await shards.claim_shard("w") is None
+
+    await shards.finish_shard(registrations, 10)
+
+    assert (await shards.claim_shard("w")).datasets == "buildings"
+
+
+@pytest.mark.asyncio
+async def test_failed_shard_is_retried_until_attempts_run_out(session_factory, monkeypatch):
+    """Test a failed shard is reclaimed while it has attempts left."""
+    monkeypatch.setattr(shards.get_settings(), "pipeline_shard_attempts", 2)
+    [shard_id] = await shards.enqueue_shards("job", 0, ["evictions"], [None])
+
+    await shards.claim_shard("w")
+    await shards.fail_shard(shard_id, "timed out")
+    retry = await shards.claim_shard("w")
+    await shards.fail_shard(shard_id, "timed out")
+
+    assert (retry.id, retry.attempts, retry.error) == (shard_id, 2, None)
+    assert await shards.claim_shard("w") is None
+    assert await shards.job_progress("job") == {shards.FAILED: 1}
+
+
+@pytest.mark.asyncio
+async def test_stale_running_shard_is_reclaimed(session_factory):
+    """Test a shard whose worker stopped heartbeating goes to another worker."""
+    [shard_id] = await shards.enqueue_shards("job", 0, ["evictions"], [None])
+    await shards.claim_shard("dead")
+    assert await shards.claim_shard("w") is None
+
+    async with session_factory() as session:
+        shard = await session.get(PipelineShard, shard_id)
+        shard.heartbeat_at = datetime.utcnow() - timedelta(hours=1)
+        await session.commit()
+
+    reclaimed = await shards.claim_shard("w")
+    await shards.finish_shard(shard_id, 42)
+
+    assert (reclaimed.worker, reclaimed.attempts) == ("w", 2)
+    assert await shards.job_progress("job") == {shards.DONE: 1}
+
+
+class Result:
+    """Rows of a statement run by a StagingSession."""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+
+    def scalars(self):
+        return iter(self.rows)
+
+    def one(self):
+        return self.rows[0]
+
+
+class StagingSession:
+    """
+    Session (and asyncpg connection) over staging tables shared by concurrent loads.
+
+    Every call yields to the event loop, so loads gathered together interleave.
+    """
+
+    def __init__(self, tables, merged, unfinished_runs):
+        self.tables = tables
+        self.merged = merged
+        self.unfinished_runs = unfinished_runs
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        await asyncio.sleep(0)
+
+    async def connection(self):
+        return self
+
+    async def get_raw_connection(self):
+        return self
+
+    @property
+    def driver_connection(self):
+        return self
+
+    async def copy_records_to_table(self, table, records, columns):
+        await asyncio.sleep(0)
+        self.tables[table].extend(dict(zip(columns, record)) for record in records)
+
+    async def execute(self, statement, params=None):
+        await asyncio.sleep(0)
+        sql = str(statement)
+        words = sql.split()
+        if sql.startswith("SELECT tablename FROM pg_tables"):
+            return Result(self.tables)
+        if "FROM pipeline_checkpoints" in sql:
+            return Result(self.unfinished_runs)
+        if sql.startswith("DROP TABLE IF EXISTS"):
+            self.tables.pop(words[4], None)
+        elif sql.startswith("CREATE UNLOGGED TABLE"):
+            self.tables[words[3]] = []
+        elif sql.startswith("TRUNCATE TABLE"):
+            self.tables[words[2]].clear()
+        elif sql.startswith("WITH merged AS"):
+            staged = self.tables[re.search(r"FROM (\w+) ORDER BY", sql).group(1)]
+            self.merged.extend(row["unique_key"] for row in staged)
+            return Result([(len(staged), 0, [row["bbl"] for row in staged])])
+        return Result()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_shards_stage_into_their_own_tables(monkeypatch):
+    """Test two shards of one dataset staged and merged at the same time both merge all their rows."""
+    extractors = [Complaints311Extractor(), Complaints311Extractor()]
+    for shard_id, extractor in enumerate(extractors, 1):
+        extractor.shard_id = shard_id
+        extractor.run_id = f"{shard_id}" * 32
+        extractor.commit_interval = 2
+    tables = {"complaints_311_staging_deadbeefdead": []}  # Left behind by a killed run
+    merged = []
+    unfinished_runs = [extractor.run_id for extractor in extractors]
+    monkeypatch.setattr(base, "AsyncSessionLocal", lambda: StagingSession(tables, merged, unfinished_runs))
+
+    async def load(extractor, keys):
+        load_queue = asyncio.Queue()
+        for offset, key in enumerate(keys):
+            load_queue.put_nowait(([{"unique_key": key, "bbl": "1000010001"}], offset, None))
+        load_queue.put_nowait(None)
+        await extractor._write_stage(0, asyncio.Queue(), load_queue)
+
+    await asyncio.gather(load(extractors[0], range(0, 5)), load(extractors[1], range(100, 105)))
+
+    assert extractors[0].staging_table() != extractors[1].staging_table()
+    assert sorted(merged) == [*range(0, 5), *range(100, 105)]
+    assert tables == {}  # Both loads dropped their own tables; the orphan was cleaned up
@@ -0,0 +1,320 @@
+"""Tests for the Socrata API client."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from pipeline.extractors.archive import ArchiveMiss, PageArchive
+from pipeline.extractors.complaints_311 import Complaints311Extractor
+from pipeline.extractors.socrata import RateLimiter, SocrataClient, is_retryable, parse_retry_after
+
+
+def make_client(total_rows: int, page_size: int = 10, prefetch_pages: int = 3) -> SocrataClient:
+    """Create a client whose page fetches are served from an in-memory dataset."""
+    client = SocrataClient()
+    client.page_size = page_size
+    client.prefetch_pages = prefetch_pages
+    client.stream_decode = False  # Serve whole pages from fake_fetch_page
+    client.requested_offsets = []
+
+    async def fake_fetch_page(http_client, dataset_id, offset, where=None, select=None, order=None):
+        client.requested_offsets.append(offset)
+        # Delay even pages so later pages finish first
+        await asyncio.sleep(0.005 if (offset // page_size) % 2 == 0 else 0)
+        return [{"id": i} for i in range(offset, min(offset + page_size, total_rows))]
+
+    client._fetch_page = fake_fetch_page
+    return client
+
+
+@pytest.mark.asyncio
+async def test_fetch_pages_yields_pages_in_offset_order():
+    """Test prefetched pages are yielded in offset order."""
+    client = make_client(total_rows=45)
+
+    pages = [page async for page in client.fetch_pages("test-ds")]
+
+    assert [page[0]["id"] for page in pages] == [0, 10, 20, 30, 40]
+    assert sum(len(page) for page in pages) == 45
+
+
+@pytest.mark.asyncio
+async def test_fetch_pages_stops_on_empty_page():
+    """Test an exact multiple of the page size stops at the first empty page."""
+    client = make_client(total_rows=30)
+
+    records = [record async for record in client.fetch_all("test-ds")]
+
+    assert [r["id"] for r in records] == list(range(30))
+
+
+@pytest.mark.asyncio
+async def test_fetch_pages_bounds_requests_in_flight():
+    """Test no more than prefetch_pages requests are issued past the end."""
+    client = make_client(total_rows=5, prefetch_pages=3)
+
+    records = [record async for record in client.fetch_all("test-ds", start_offset=0)]
+
+    assert len(records) == 5
+    assert len(client.requested_offsets) <= 3
+
+
+@pytest.mark.asyncio
+async def test_prefetched_pages_are_streamed(monkeypatch):
+    """Test the default prefetching fetch streams pages, decoding later pages only a few chunks ahead."""
+    client = SocrataClient()
+    assert client.prefetch_pages > 1 and client.stream_decode  # The default configuration
+    client.page_size = 8
+    pulled = []  # Rows read from the response bodies, in order
+
+    def respond(request):
+        offset = int(request.url.params["$offset"])
+
+        async def body():
+            yield b"["
+            for i in range(offset, min(offset + client.page_size, 20)):
+                pulled.append(i)
+                yield (b"," if i > offset else b"") + b'{"id":%d}\n' % i
+            yield b"]\n"
+
+        return httpx.Response(200, content=body())
+
+    transport = httpx.MockTransport(respond)
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: real_client(transport=transport, **kwargs))
+
+    pages = client.fetch_pages("test-ds")
+    chunks = [await pages.__anext__()]
+    await asyncio.sleep(0.05)  # Let the prefetched pages run ahead
+    read_ahead = [i for i in pulled if i >= client.page_size]
+    chunks.extend([chunk async for chunk in pages])
+
+    assert [r["id"] for chunk in chunks for r in chunk] == list(range(20))
+    assert len(chunks) > client.pages_fetched == 3
+    assert 0 < len(read_ahead) <= 2 * (SocrataClient.PREFETCH_CHUNKS + 1)
+
+
+@pytest.mark.asyncio
+async def test_record_count_is_not_counted_as_downloaded(monkeypatch):
+    """Test a progress count request doesn't add to the bytes the load downloaded."""
+    client = SocrataClient()
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=b'[{"count":"1200"}]'))
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: real_client(transport=transport, **kwargs))
+
+    assert await client.get_record_count("test-ds", "bbl IS NOT NULL") == 1200
+    assert client.bytes_downloaded == 0
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_advance_cursor():
+    """Test keyset pagination filters on the last key seen and orders by the key."""
+    client = SocrataClient()
+    client.page_size = 2
+    client.stream_decode = False
+    rows = [{":id": f"row-{i}", "value": i} for i in range(5)]
+    requests = []
+
+    async def fake_fetch_page(http_client, dataset_id, offset, where=None, select=None, order=None):
+        requests.append((where, select, order))
+        after = where.split("> '")[1].rstrip("'") if where else None
+        remaining = [r for r in rows if after is None or r[":id"] > after]
+        return remaining[:client.page_size]
+
+    client._fetch_page = fake_fetch_page
+
+    pages = [
+        page
+        async for page in client.fetch_pages(
+            "test-ds", where="value >= 0", select="value", keyset=":id", start_after="row-0"
+        )
+    ]
+
+    assert [r["value"] for page in pages for r in page] == [1, 2, 3, 4]
+    assert requests[0] == ("(value >= 0) AND :id > 'row-0'", "value,:id", ":id")
+    assert requests[-1][0] == "(value >= 0) AND :id > 'row-4'"
+
+
+@pytest.mark.asyncio
+async def test_project_select_drops_missing_fields():
+    """Test fields the dataset lacks are dropped from the projection."""
+    client = SocrataClient()
+    client._field_names["test-ds"] = {"boroid", "block", "lot"}
+
+    select = await client.project_select("test-ds", "boroid,boro,block,lot,:id")
+
+    assert select == "boroid,block,lot,:id"
+
+
+@pytest.mark.asyncio
+async def test_project_select_without_metadata():
+    """Test no projection is applied when column metadata is unavailable."""
+    client = SocrataClient()
+    client._field_names["test-ds"] = None
+
+    assert await client.project_select("test-ds", "boroid,block") is None
+
+
+@pytest.mark.asyncio
+async def test_complaints_filter_ignores_complaint_type_case():
+    """Test the 311 $where matches housing complaint types whatever their case."""
+    extractor = Complaints311Extractor()
+    requests = []
+
+    def respond(request):
+        requests.append(request)
+        return httpx.Response(200, content=b"[]")
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(respond)) as http_client:
+        await extractor.client._fetch_page(http_client, "test-ds", 0, where=extractor.fetch_where)
+
+    where = requests[0].url.params["$where"]
+    assert where.startswith("upper(complaint_type) in ('HEAT/HOT WATER', ")
+    assert "'RODENT'" in where and "'PAINT - LOSS OF COVERAGE OR PEELING'" in where
+    assert where.endswith(") AND bbl IS NOT NULL")
+
+
+@pytest.mark.asyncio
+async def test_stream_page_decodes_line_delimited_body():
+    """Test a streamed page yields every record of a Socrata line-delimited body."""
+    client = SocrataClient()
+    body = b'[{"id":"1"}\n,{"id":"2"}\n,{"id":"3"}]\n'
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+
+    async with httpx.AsyncClient(transport=transport) as http_client:
+        chunks = [chunk async for chunk in client._stream_page(http_client, "test-ds", 0)]
+
+    assert [r["id"] for chunk in chunks for r in chunk] == ["1", "2", "3"]
+
+
+@pytest.mark.asyncio
+async def test_stream_csv_requests_csv_export():
+    """Test CSV pages come from the .csv endpoint with the CSV page size."""
+    client = SocrataClient()
+    client.csv_page_size = 500
+    body = b'"unique_key","bbl"\n"1","1000010001"\n'
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, content=body)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+        chunks = [
+            chunk
+            async for chunk in client.stream_csv(
+                http_client, "test-ds", offset=1000, select="unique_key,bbl", order=":id"
+            )
+        ]
+
+    assert b"".join(chunks) == body
+    assert requests[0].url.path == "/resource/test-ds.csv"
+    assert requests[0].url.params["$limit"] == "500"
+    assert requests[0].url.params["$offset"] == "1000"
+    assert requests[0].url.params["$order"] == ":id"
+
+
+@pytest.mark.asyncio
+async def test_stream_csv_replays_archived_pages(tmp_path):
+    """Test a streamed CSV page is archived and served again by a replaying client offline."""
+    body = b'"unique_key","bbl"\n"1","1000010001"\n'
+    archive = PageArchive(tmp_path)
+    client = SocrataClient()
+    client.archive, client.replay = archive, False
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+    async with httpx.AsyncClient(transport=transport) as http:
+        fetched = [chunk async for chunk in client.stream_csv(http, "test-ds", select="unique_key,bbl")]
+
+    replaying = SocrataClient()
+    replaying.archive, replaying.replay = archive, True
+
+    def offline(request):
+        raise AssertionError(f"Replay requested {request.url}")
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(offline)) as http:
+        replayed = [chunk async for chunk in replaying.stream_csv(http, "test-ds", select="unique_key,bbl")]
+        with pytest.raises(ArchiveMiss):
+            [chunk async for chunk in replaying.stream_csv(http, "test-ds", offset=1000, select="unique_key,bbl")]
+
+    assert b"".join(fetched) == b"".join(replayed) == body
+    assert replaying.pages_fetched == 1
+
+
+def test_rate_limiter_adapts_to_responses():
+    """Test healthy responses raise the rate up to the ceiling and throttling halves it."""
+    limiter = RateLimiter(10, min_rate=2, max_rate=11)
+
+    for _ in range(50):
+        limiter.observe(httpx.Response(200))
+    assert limiter.rate == 11
+
+    limiter.observe(httpx.Response(503))
+    limiter.observe(httpx.Response(429))
+    assert limiter.rate == 2.75
+    limiter.observe(httpx.Response(429))
+    assert limiter.rate == 2
+    assert limiter.throttled == 3
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_holds_requests_for_retry_after():
+    """Test a Retry-After header pauses the next acquire until it has passed."""
+    limiter = RateLimiter(1000)
+    limiter.observe(httpx.Response(429, headers={"Retry-After": "0.05"}))
+
+    started = asyncio.get_running_loop().time()
+    await limiter.acquire()
+
+    assert asyncio.get_running_loop().time() - started >= 0.04
+    assert limiter.blocked_until is None
+
+
+def test_parse_retry_after():
+    """Test Retry-After is read as delay-seconds or an HTTP date."""
+    assert parse_retry_after(httpx.Response(429, headers={"Retry-After": "30"})) == 30
+    assert parse_retry_after(httpx.Response(429, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0
+    assert parse_retry_after(httpx.Response(429, headers={"Retry-After": "soon"})) is None
+    assert parse_retry_after(httpx.Response(429)) is None
+
+
+@pytest.mark.parametrize("status, expected", [(429, True), (500, True), (503, True), (400, False), (404, False)])
+def test_only_throttling_statuses_are_retried(status, expected):
+    """Test 429 and 5xx responses are retried, other client errors are not."""
+    request = httpx.Request("GET", "https://example.com")
+    error = httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+    assert is_retryable(error) is expected
+
+
+@pytest.mark.asyncio
+async def test_page_request_retries_after_throttling():
+    """Test a 429 with Retry-After is retried and slows the shared limiter."""
+    client = SocrataClient()
+    client.rate_limiter = RateLimiter(100, max_rate=100)
+    responses = [httpx.Response(429, headers={"Retry-After": "0"}), httpx.Response(200, content=b"[]")]
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(lambda request: responses.pop(0))) as http_client:
+        body = await client._get_page_body(http_client, "test-ds", {})
+
+    assert body == b"[]"
+    assert client.rate_limiter.throttled == 1
+    assert client.rate_limiter.rate < 100
+
+
+@pytest.mark.asyncio
+async def test_page_request_does_not_retry_bad_requests():
+    """Test a 400 (e.g. an invalid SoQL query) fails without retrying."""
+    client = SocrataClient()
+    client.rate_limiter = RateLimiter(100)
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(400)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+        with pytest.raises(httpx.HTTPStatusError):
+            await client._get_page_body(http_client, "test-ds", {})
+
+    assert len(requests) == 1
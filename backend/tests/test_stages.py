@@ -0,0 +1,41 @@
+"""Tests for extraction pipeline stage helpers."""
+
+import asyncio
+
+import pytest
+
+from pipeline.extractors.stages import StageStats, run_stages
+
+
+def test_stage_stats_rate():
+    """Test throughput is computed over busy time."""
+    stats = StageStats("write")
+    stats.record(1000, 0.5)
+    stats.record(1000, 1.5)
+
+    assert stats.records == 2000
+    assert stats.batches == 2
+    assert stats.rate == 1000
+    assert str(stats).startswith("write: 2000 records in 2 batches")
+
+
+def test_stage_stats_idle():
+    """Test an idle stage reports zero throughput."""
+    assert StageStats("fetch").rate == 0.0
+
+
+@pytest.mark.asyncio
+async def test_run_stages_cancels_blocked_stages_on_failure():
+    """Test a failing stage cancels stages blocked on a queue and re-raises."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+    async def producer():
+        while True:
+            await queue.put(object())
+
+    async def consumer():
+        await queue.get()
+        raise RuntimeError("write failed")
+
+    with pytest.raises(RuntimeError, match="write failed"):
+        await asyncio.wait_for(run_stages(producer(), consumer()), timeout=1)
@@ -0,0 +1,123 @@
+"""Tests for column-oriented batch transforms."""
+
+import asyncio
+
+import pytest
+
+from pipeline.extractors.base import BaseExtractor
+from pipeline.extractors.columns import ColumnBatch
+from pipeline.extractors.complaints_311 import Complaints311Extractor
+from pipeline.extractors.hpd_registrations import RegistrationContactsExtractor
+from pipeline.extractors.hpd_violations import HPDViolationsExtractor
+
+
+HPD_RECORDS = [
+    {
+        "violationid": "12345",
+        "boroid": "1",
+        "block": "42",
+        "lot": "7",
+        "buildingid": "99",
+        "inspectiondate": "2024-01-15T00:00:00.000",
+        "novissueddate": "2024-01-16",
+        "currentstatusdate": "not a date",
+        "class": "C",
+    },
+    {"violationid": "", "boroid": "1", "block": "1", "lot": "1"},  # No id: skipped
+    {"violationid": "123.0", "boro": "3", "block": "x", "lot": "1"},  # Bad BBL: skipped
+    {"violationid": "777", "boro": "2", "block": "00100", "lot": "0020", "novid": "5.0"},
+]
+
+COMPLAINT_RECORDS = [
+    {
+        "unique_key": "1",
+        "bbl": "1000420007",
+        "created_date": "2024-01-01T08:00:00.000",
+        "closed_date": "2024-01-03T07:00:00.000",
+        "complaint_type": "HEAT/HOT WATER",
+    },
+    {"unique_key": "abc"},  # Bad id: skipped
+    {"unique_key": "2", "bbl": "", "created_date": "2024-01-01T00:00:00.000"},
+]
+
+
+@pytest.mark.parametrize(
+    "extractor_class, records",
+    [
+        (HPDViolationsExtractor, HPD_RECORDS),
+        (Complaints311Extractor, COMPLAINT_RECORDS),
+    ],
+)
+def test_transform_batch_matches_transform_record(extractor_class, records):
+    """Test the batch transform produces exactly what transform_record does."""
+    extractor = extractor_class()
+    expected = [r for r in (extractor.transform_record(record) for record in records) if r]
+
+    batch = extractor.transform_batch(records)
+
+    assert isinstance(batch, ColumnBatch)
+    assert batch.to_records() == expected
+
+
+def test_transform_batch_falls_back_to_records():
+    """Test extractors without a batch transform use transform_record."""
+    extractor = HPDViolationsExtractor()
+    extractor.transform_batch = lambda records: None
+
+    transformed = extractor._transform_batch(HPD_RECORDS)
+
+    assert [r["violation_id"] for r in transformed] == [12345, 777]
+
+
+def test_column_batch_filter_and_rows():
+    """Test filtering keeps columns aligned and rows follow the requested order."""
+    batch = ColumnBatch({"a": [1, 2, 3], "b": ["x", "y", "z"]})
+
+    kept = batch.filter([True, False, True])
+
+    assert len(kept) == 2
+    assert list(kept.rows(["b", "a"])) == [("x", 1), ("z", 3)]
+
+
+def test_column_batch_rejects_ragged_columns():
+    """Test columns of different lengths are rejected."""
+    with pytest.raises(ValueError):
+        ColumnBatch({"a": [1, 2], "b": [1]})
+
+
+def test_bulk_helpers_match_scalar_helpers():
+    """Test bulk parsing and coercion agree with the per-value helpers."""
+    dates = ["2024-01-15T00:00:00.000", "2024-01-15T00:00:00.000", None, "bad", "2024-02-01"]
+    ints = ["12", "0012", "3.7", "", None, "x", 5]
+
+    assert BaseExtractor.parse_dates(dates) == [BaseExtractor.parse_date(d) for d in dates]
+    assert BaseExtractor.safe_ints(ints) == [BaseExtractor.safe_int(i) for i in ints]
+    assert BaseExtractor.make_bbls(["1", 3, None], ["42", "1", "1"], ["7", "x", "1"]) == [
+        "1000420007",
+        None,
+        None,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_transform_workers_keep_batch_order():
+    """Test batches transformed in worker processes are passed on in arrival order."""
+    extractor = RegistrationContactsExtractor()
+    extractor.transform_workers = 2
+    batches = [
+        [{"registrationid": str(i), "corporationname": f"Owner {i} LLC"} for i in range(n, n + 3)]
+        for n in range(1, 16, 3)
+    ]
+    raw_queue, load_queue = asyncio.Queue(), asyncio.Queue()
+    for n, batch in enumerate(batches):
+        raw_queue.put_nowait((batch, 3 * (n + 1), f"cursor-{n}"))
+    raw_queue.put_nowait(None)
+
+    await extractor._transform_stage(raw_queue, load_queue)
+
+    results = []
+    while (item := load_queue.get_nowait()) is not None:
+        results.append(item)
+    assert [cursor for _, _, cursor in results] == [f"cursor-{n}" for n in range(5)]
+    assert [records for records, _, _ in results] == [extractor._transform_batch(b) for b in batches]
+    assert extractor.transform_stats.records == 15
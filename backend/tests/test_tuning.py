@@ -0,0 +1,88 @@
+"""Tests for adaptive batch sizing."""
+
+import pytest
+
+from pipeline.extractors.socrata import SocrataClient
+from pipeline.extractors.tuning import BatchTuner
+
+
+def make_tuner(**kwargs):
+    """A tuner starting at the extractors' default batch size and commit interval."""
+    options = {
+        "target_seconds": 1.0,
+        "max_batch_size": 50000,
+        "max_batch_bytes": 100_000_000,
+        "max_uncommitted_seconds": 30.0,
+    }
+    options.update(kwargs)
+    return BatchTuner(1000, 10, **options)
+
+
+def test_fast_writes_grow_batches_toward_target():
+    """Test batches grow, at most doubling each time, until a write takes the target time."""
+    tuner = make_tuner()
+    sizes = []
+    for _ in range(8):
+        tuner.observe_write(tuner.batch_size, tuner.batch_size * 0.0002, 0)
+        sizes.append(tuner.batch_size)
+
+    assert sizes[:3] == [2000, 4000, 5000]
+    assert sizes[-1] == 5000
+
+
+def test_slow_writes_shrink_batches():
+    """Test batches shrink when writes take longer than the target, down to the minimum."""
+    tuner = make_tuner()
+    tuner.observe_write(1000, 4.0, 0)
+    assert tuner.batch_size == 500
+
+    for _ in range(10):
+        tuner.observe_write(tuner.batch_size, tuner.batch_size * 1.0, 0)
+    assert tuner.batch_size == BatchTuner.MIN_BATCH_SIZE
+
+
+@pytest.mark.parametrize(
+    "kwargs, limit",
+    [
+        ({"columns": 25}, BatchTuner.MAX_PARAMS // 25),  # INSERT bind parameters
+        ({"max_batch_bytes": 2_000_000}, 2_000_000 // 500),  # 500 bytes per row
+        ({"max_batch_size": 3000}, 3000),
+    ],
+)
+def test_batch_size_stays_within_limits(kwargs, limit):
+    """Test fast writes never push a batch past the parameter, memory or size limit."""
+    tuner = make_tuner(**kwargs)
+    for _ in range(10):
+        tuner.observe_write(tuner.batch_size, tuner.batch_size * 0.00001, tuner.batch_size * 500)
+
+    assert tuner.batch_size == limit
+
+
+def test_commit_interval_follows_commit_cost():
+    """Test slow commits are spread over more batches, within the uncommitted time limit."""
+    tuner = make_tuner(max_uncommitted_seconds=5.0)
+    tuner.observe_write(1000, 1.0, 0)
+
+    tuner.observe_commit(0.3)
+    assert tuner.commit_interval == 3
+
+    for _ in range(10):
+        tuner.observe_commit(10.0)
+    assert tuner.commit_interval == 5
+
+
+@pytest.mark.asyncio
+async def test_fetch_batch_reads_callable_size(monkeypatch):
+    """Test a callable batch size is re-read for every batch."""
+    client = SocrataClient()
+
+    async def fetch_all(*args):
+        for n in range(10):
+            yield {"n": n}
+
+    monkeypatch.setattr(client, "fetch_all", fetch_all)
+    sizes = iter([2, 3, 5])
+
+    batches = [len(batch) async for batch in client.fetch_batch("abcd-1234", batch_size=lambda: next(sizes, 5))]
+
+    assert batches == [2, 3, 5]
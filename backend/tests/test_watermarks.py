@@ -0,0 +1,123 @@
+"""Tests for incremental extraction watermarks."""
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.pipeline import PipelineState
+from pipeline.extractors import base
+from pipeline.extractors.evictions import EvictionsExtractor
+
+
+@pytest.fixture
+def session_factory(async_engine, monkeypatch):
+    """Point the extractors' sessions at the test database."""
+    factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(base, "AsyncSessionLocal", factory)
+    return factory
+
+
+class FakeClient:
+    """Socrata client stand-in serving fixed batches and recording each fetch's $where."""
+
+    def __init__(self, batches):
+        self.batches = batches
+        self.wheres = []
+        self.bytes_downloaded = 0
+        self.pages_fetched = 0
+
+    async def project_select(self, dataset_id, select):
+        return select
+
+    include_fields = staticmethod(base.SocrataClient.include_fields)
+
+    async def fetch_batch(self, dataset_id, batch_size=1000, where=None, **kwargs):
+        self.wheres.append(where)
+        for batch in self.batches:
+            yield batch
+
+
+def make_extractor(batches, monkeypatch, fail=False):
+    """An evictions extractor over `batches` whose writes record the stored watermark."""
+    extractor = EvictionsExtractor()
+    extractor.client = FakeClient(batches)
+    extractor.stored_during_write = []
+    # Keep the full refresh in the live table, which SQLite can't shadow
+    monkeypatch.setattr(EvictionsExtractor, "replaces_table", False)
+
+    async def upsert_batch(session, records):
+        extractor.stored_during_write.append(await stored_watermark(session))
+        if fail:
+            raise RuntimeError("write failed")
+
+    monkeypatch.setattr(extractor, "_upsert_batch", upsert_batch)
+    return extractor
+
+
+async def store_watermark(session_factory, watermark):
+    """Record a watermark for the evictions extractor."""
+    async with session_factory() as session:
+        session.add(
+            PipelineState(
+                extractor="EvictionsExtractor",
+                dataset_id=EvictionsExtractor().dataset_id,
+                watermark_column=":updated_at",
+                watermark=watermark,
+            )
+        )
+        await session.commit()
+
+
+async def stored_watermark(session) -> str | None:
+    """The evictions extractor's stored watermark."""
+    result = await session.execute(
+        select(PipelineState.watermark).where(PipelineState.extractor == "EvictionsExtractor")
+    )
+    return result.scalar_one_or_none()
+
+
+def batch(*updated_at):
+    """A batch of eviction records last updated at the given times."""
+    return [
+        {"court_index_number": f"LT-{n}", ":updated_at": value}
+        for n, value in enumerate(updated_at)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_incremental_fetch_filters_on_stored_watermark(session_factory, monkeypatch):
+    """Test an incremental run only fetches rows at or after the stored watermark, then advances it."""
+    await store_watermark(session_factory, "2026-01-01T00:00:00.000Z")
+    extractor = make_extractor([batch("2026-01-02T00:00:00.000Z", "2026-01-03T00:00:00.000Z")], monkeypatch)
+
+    await base.extract_and_load_shared([extractor], incremental=True)
+
+    assert extractor.client.wheres == [":updated_at >= '2026-01-01T00:00:00.000Z'"]
+    async with session_factory() as session:
+        assert await stored_watermark(session) == "2026-01-03T00:00:00.000Z"
+
+
+@pytest.mark.asyncio
+async def test_watermark_advances_only_after_data_commits(session_factory, monkeypatch):
+    """Test the watermark is unchanged while batches are written and when a write fails."""
+    await store_watermark(session_factory, "2026-01-01T00:00:00.000Z")
+    extractor = make_extractor([batch("2026-01-05T00:00:00.000Z")], monkeypatch, fail=True)
+
+    with pytest.raises(RuntimeError, match="write failed"):
+        await base.extract_and_load_shared([extractor], incremental=True)
+
+    assert extractor.stored_during_write == ["2026-01-01T00:00:00.000Z"]
+    async with session_factory() as session:
+        assert await stored_watermark(session) == "2026-01-01T00:00:00.000Z"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("incremental, full_refresh", [(False, False), (True, True)])
+async def test_watermark_ignored_without_incremental(session_factory, monkeypatch, incremental, full_refresh):
+    """Test --no-incremental and full refreshes fetch everything despite a stored watermark."""
+    await store_watermark(session_factory, "2026-01-01T00:00:00.000Z")
+    extractor = make_extractor([batch("2026-02-01T00:00:00.000Z")], monkeypatch)
+
+    await base.extract_and_load_shared([extractor], incremental=incremental, full_refresh=full_refresh)
+
+    assert extractor.client.wheres == [None]